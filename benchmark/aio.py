@@ -0,0 +1,147 @@
+import sys
+import time
+import asyncio
+import threading
+import statistics
+import typing as ty
+from multiprocessing import Process, Queue
+
+IDLE_SECONDS = 3.
+LATENCY_SAMPLES = 200
+LATENCY_INTERVAL = .01
+
+
+def post_task_latencies(done: ty.Callable[[list[float]], None]):
+    '''
+    Posts `cef_task_t` from another thread every `LATENCY_INTERVAL` and measures the delay until it runs
+    on UI thread. Calls |done| with the delays on UI thread.
+    '''
+    from cef_capi import header, task_factory
+    delays: list[float] = []
+
+    @task_factory
+    def probe(posted_at: float):
+        delays.append(time.perf_counter() - posted_at)
+        if len(delays) == LATENCY_SAMPLES:
+            done(delays)
+
+    def poster():
+        for _ in range(LATENCY_SAMPLES):
+            header.cef_post_task(header.TID_UI, probe(time.perf_counter()))
+            time.sleep(LATENCY_INTERVAL)
+
+    threading.Thread(target=poster, daemon=True).start()
+
+
+def run_message_loop_main(result_queue: Queue):
+    '''
+    `cef_run_message_loop()` with a windowless browser.
+    '''
+    import ctypes
+    from cef_capi import header, struct, size_ctor, cef_string_ctor, task_factory
+    from cef_capi.app_client import client_ctor, app_ctor, settings_main_args_ctor
+    settings, main_args = settings_main_args_ctor()
+    settings.log_severity = struct.LOGSEVERITY_DISABLE
+    settings.no_sandbox = 1
+    settings.windowless_rendering_enabled = 1
+    header.cef_initialize(main_args, settings, app_ctor(), None)
+    client = client_ctor()  # Quits the message loop in `on_before_close`.
+    window_info = struct.cef_window_info_t()
+    window_info.windowless_rendering_enabled = 1
+    browser = header.cef_browser_host_create_browser_sync(
+        window_info, client, cef_string_ctor('about:blank'), size_ctor(struct.cef_browser_settings_t), None, None)
+    result: dict = {}
+
+    @task_factory
+    def close_browser():
+        b = browser.contents
+        host = ctypes.cast(b.get_host(b), ctypes.POINTER(struct.cef_browser_host_t))
+        host.contents.close_browser(host, 1)
+
+    @task_factory
+    def measure_latency():
+        def done(delays):
+            result['cef_post_task'] = delays
+            header.cef_post_task(header.TID_UI, close_browser())
+        post_task_latencies(done)
+
+    def idle():
+        t, cpu = time.perf_counter(), time.process_time()
+        time.sleep(IDLE_SECONDS)
+        result['idle_cpu'] = (time.process_time() - cpu) / (time.perf_counter() - t)
+        header.cef_post_task(header.TID_UI, measure_latency())
+
+    threading.Thread(target=idle, daemon=True).start()
+    header.cef_run_message_loop()
+    header.cef_shutdown()
+    result_queue.put(result)
+
+
+def asyncio_main(result_queue: Queue):
+    '''
+    `AsyncCef` with a windowless browser.
+    '''
+    from cef_capi import struct
+    from cef_capi.aio import AsyncCef
+
+    async def main():
+        result: dict = {}
+        loop = asyncio.get_running_loop()
+        async with AsyncCef(settings_hook=lambda s: setattr(s, 'log_severity', struct.LOGSEVERITY_DISABLE)) as cef:
+            await cef.create_browser()
+            t, cpu = time.perf_counter(), time.process_time()
+            pumps = cef.pump.pumps  # type: ignore
+            await asyncio.sleep(IDLE_SECONDS)
+            result['idle_cpu'] = (time.process_time() - cpu) / (time.perf_counter() - t)
+            result['pumps_per_s'] = (cef.pump.pumps - pumps) / IDLE_SECONDS  # type: ignore
+
+            done = loop.create_future()
+            post_task_latencies(done.set_result)
+            result['cef_post_task'] = await done
+
+            delays: list[float] = []
+
+            def probe(posted_at: float):
+                delays.append(time.perf_counter() - posted_at)
+
+            def poster():
+                for _ in range(LATENCY_SAMPLES):
+                    loop.call_soon_threadsafe(probe, time.perf_counter())
+                    time.sleep(LATENCY_INTERVAL)
+
+            await loop.run_in_executor(None, poster)
+            await asyncio.sleep(.1)
+            result['call_soon_threadsafe'] = delays
+        return result
+
+    result_queue.put(asyncio.run(main()))
+
+
+def main():
+    '''
+    Compares idle CPU usage and task latency of `cef_run_message_loop()` and `AsyncCef`.
+    Each mode runs in its own process, since CEF cannot initialize twice in a process.
+    '''
+    print(f'{"mode":<20}{"idle CPU":>10}{"latency":<24}{"p50 (ms)":>10}{"p99 (ms)":>10}')
+    for name, target in (('cef_run_message_loop', run_message_loop_main), ('AsyncCef', asyncio_main)):
+        result_queue: Queue = Queue()
+        p = Process(target=target, args=(result_queue,))
+        p.start()
+        result = result_queue.get()
+        p.join()
+        if p.exitcode != 0:
+            print(f'{name} failed: exit code {p.exitcode}')
+            sys.exit(1)
+        for kind in ('cef_post_task', 'call_soon_threadsafe'):
+            if kind not in result:
+                continue
+            delays = sorted(result[kind])
+            p50 = statistics.median(delays) * 1e3
+            p99 = delays[int(len(delays) * .99)] * 1e3
+            print(f'{name:<20}{result["idle_cpu"] * 100:>9.1f}%  {kind:<22}{p50:>10.3f}{p99:>10.3f}')
+        if 'pumps_per_s' in result:
+            print(f'{"":<20}{result["pumps_per_s"]:>9.1f} pumps/s while idle')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import gc
+import os
+import time
+import ctypes
+from cef_capi import base_ctor, handler, struct
+
+N = 20_000
+
+
+def closure_base_ctor(struct_t: type):
+    '''
+    The former `base_ctor()`: four ref count closures and thunks per object.
+    '''
+    o = struct_t()
+    o.base.size = ctypes.sizeof(struct_t)
+    ref_count = 1
+
+    @handler(o.base)
+    def add_ref():
+        nonlocal ref_count
+        ref_count += 1
+
+    @handler(o.base)
+    def release():
+        nonlocal ref_count
+        ref_count -= 1
+        return 1 if ref_count == 0 else 0
+
+    @handler(o.base)
+    def has_one_ref():
+        return 1 if ref_count == 1 else 0
+
+    @handler(o.base)
+    def has_at_least_one_ref():
+        return 1 if ref_count > 1 else 0
+
+    return o
+
+
+def rss() -> int | None:
+    '''
+    Returns resident set size in bytes, or None if the platform is not supported.
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil  # type: ignore
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def measure(ctor) -> tuple[float, float | None]:
+    '''
+    Returns (objects per second, resident bytes per object) of |ctor|.
+    '''
+    gc.collect()
+    before = rss()
+    t = time.perf_counter()
+    objects = [ctor(struct.cef_client_t) for _ in range(N)]
+    t = time.perf_counter() - t
+    after = rss()
+    per_object = None if before is None or after is None else (after - before) / N
+    del objects
+    return N / t, per_object
+
+
+def main():
+    '''
+    Measures `base_ctor()` throughput and resident memory per object,
+    compared with per-object ref count closures.
+    '''
+    print(f'{"ctor":<20}{"objects/s":>12}{"bytes/object":>14}')
+    for name, ctor in (
+            ('closure (former)', closure_base_ctor),
+            ('base_ctor', base_ctor)):
+        ops, per_object = measure(ctor)
+        po = 'n/a' if per_object is None else f'{per_object:.0f}'
+        print(f'{name:<20}{ops:>12.0f}{po:>14}')
+
+
+if __name__ == '__main__':
+    main()
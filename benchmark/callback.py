@@ -0,0 +1,94 @@
+import ctypes
+import timeit
+from cef_capi import base_ctor, handler, struct
+
+N = 200_000
+
+
+def on_paint_pair(trampoline: bool):
+    '''
+    Returns `cef_render_handler_t.on_paint` and its args.
+    '''
+    render_handler = base_ctor(struct.cef_render_handler_t)
+
+    @handler(render_handler, trampoline=trampoline)
+    def on_paint(browser, element_type, dirty_rects_count, dirty_rects, buffer, width, height):
+        pass
+
+    browser = struct.cef_browser_t()
+    rect = struct.cef_rect_t()
+    buffer = ctypes.create_string_buffer(16)
+    args = (
+        ctypes.pointer(render_handler),
+        ctypes.pointer(browser),
+        0,
+        1,
+        ctypes.pointer(rect),
+        ctypes.addressof(buffer),
+        800,
+        600)
+    return render_handler.on_paint, args, (render_handler, browser, rect, buffer)
+
+
+def get_view_rect_pair(trampoline: bool):
+    '''
+    Returns `cef_render_handler_t.get_view_rect` and its args.
+    '''
+    render_handler = base_ctor(struct.cef_render_handler_t)
+
+    @handler(render_handler, trampoline=trampoline)
+    def get_view_rect(browser, rect):
+        rect.width = 800
+        rect.height = 600
+
+    browser = struct.cef_browser_t()
+    rect = struct.cef_rect_t()
+    args = (
+        ctypes.pointer(render_handler),
+        ctypes.pointer(browser),
+        ctypes.pointer(rect))
+    return render_handler.get_view_rect, args, (render_handler, browser, rect)
+
+
+def read_pair(trampoline: bool):
+    '''
+    Returns `cef_resource_handler_t.read` and its args.
+    '''
+    resource_handler = base_ctor(struct.cef_resource_handler_t)
+
+    @handler(resource_handler, trampoline=trampoline, raw_arg_indices={3})
+    def read(data_out, bytes_to_read, bytes_read, callback):
+        bytes_read[0] = 0
+        return 0
+
+    buffer = ctypes.create_string_buffer(16)
+    bytes_read = ctypes.c_int32()
+    args = (
+        ctypes.pointer(resource_handler),
+        ctypes.addressof(buffer),
+        16,
+        ctypes.pointer(bytes_read),
+        None)
+    return resource_handler.read, args, (resource_handler, buffer, bytes_read)
+
+
+def main():
+    '''
+    Compares the generic `*args` dispatcher and the specialized trampoline of `_register_callback()`.
+    The callbacks are called through ctypes, so the numbers include libffi overhead.
+    '''
+    print(f'{"callback":<16}{"generic (us)":>14}{"trampoline (us)":>17}{"speedup":>9}')
+    for name, pair in (
+            ('on_paint', on_paint_pair),
+            ('get_view_rect', get_view_rect_pair),
+            ('read', read_pair)):
+        results = []
+        for trampoline in (False, True):
+            f, args, _keep = pair(trampoline)
+            t = min(timeit.repeat(lambda: f(*args), number=N, repeat=5))
+            results.append(t / N * 1e6)
+        print(f'{name:<16}{results[0]:>14.3f}{results[1]:>17.3f}{results[0] / results[1]:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import ctypes
+import timeit
+import numpy as np
+from cef_capi import struct
+from cef_capi.frame import FrameRing, FrameCompositor
+
+VIEWPORT_SIZE = (1920, 1080)
+
+PATTERNS = {
+    'cursor blink': [(640, 480, 2, 20)],
+    'ticker': [(0, 1040, 1920, 40)],
+    'four widgets': [(100, 100, 200, 200), (1500, 100, 200, 200), (100, 800, 200, 200), (1500, 800, 200, 200)],
+    'half scroll': [(0, 0, 1920, 540)],
+    'full frame': [(0, 0, 1920, 1080)],
+}
+
+
+def main():
+    '''
+    Compares full frame copy (`FrameRing.copy()`) with dirty rect copy (`FrameCompositor.paint()`)
+    of a 1920x1080 `on_paint` buffer, for typical dirty rect patterns.
+    '''
+    w, h = VIEWPORT_SIZE
+    src = np.random.default_rng(0).integers(0, 256, (h, w, 4), np.uint8)
+    buffer = src.ctypes.data
+    ring = FrameRing(w, h)
+    compositor = FrameCompositor()
+    compositor.paint(1, buffer, w, h, 1, [(0, 0, w, h)])
+
+    n = 200
+    full = min(timeit.repeat(lambda: ring.copy(buffer, w, h), number=n, repeat=5)) / n
+    print(f'{"pattern":<14}{"dirty bytes":>13}{"full (us)":>11}{"dirty (us)":>12}{"speedup":>9}')
+    for name, rects in PATTERNS.items():
+        rect_array = (struct.cef_rect_t * len(rects))(*(struct.cef_rect_t(*r) for r in rects))
+        rect_p = ctypes.cast(rect_array, ctypes.POINTER(struct.cef_rect_t))
+        dirty_bytes = sum(r[2] * r[3] * 4 for r in rects)
+
+        def paint():
+            compositor.paint(1, buffer, w, h, len(rects), rect_p)
+
+        dirty = min(timeit.repeat(paint, number=n, repeat=5)) / n
+        print(f'{name:<14}{dirty_bytes:>13,}{full * 1e6:>11.1f}{dirty * 1e6:>12.1f}{full / dirty:>8.1f}x')
+    assert (compositor.frame(1) == src).all()
+
+
+if __name__ == '__main__':
+    main()
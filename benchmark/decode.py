@@ -0,0 +1,31 @@
+import ctypes
+import timeit
+from cef_capi import cef_string_ctor, decode_cef_string, cef_string_t, UTF16_ENCODING
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)  # bytes of UTF-16
+
+
+def former_decode_cef_string(cef_string: cef_string_t) -> str:
+    '''
+    The former `decode_cef_string()`: a new array type per call, recast and copy.
+    '''
+    buf_p = ctypes.cast(cef_string.str, ctypes.POINTER(ctypes.c_byte * cef_string.length * 2))
+    return bytes(buf_p.contents).decode(UTF16_ENCODING)
+
+
+def main():
+    '''
+    Compares the former and the current `decode_cef_string()` by UTF-16 buffer size.
+    '''
+    print(f'{"bytes":>10}{"former (us)":>14}{"current (us)":>14}{"speedup":>9}')
+    for size in SIZES:
+        u = cef_string_ctor('x' * (size // 2))
+        assert decode_cef_string(u) == former_decode_cef_string(u)
+        n = max(10, 200_000 // (1 + size // 1_000))
+        former = min(timeit.repeat(lambda: former_decode_cef_string(u), number=n, repeat=5)) / n
+        current = min(timeit.repeat(lambda: decode_cef_string(u), number=n, repeat=5)) / n
+        print(f'{size:>10}{former * 1e6:>14.3f}{current * 1e6:>14.3f}{former / current:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import ctypes
+import timeit
+from itertools import product
+from cef_capi.frame import frame_view, FrameRing
+
+VIEWPORT_SIZE = (800, 600)
+COLOR = (0, 0x80, 0, 0xff)  # BGRA green
+
+
+def former_check(buffer: int) -> bool:
+    '''
+    The former smoke test check: `ctypes.string_at()` copy and pixel by pixel comparison.
+    '''
+    bstr = ctypes.string_at(buffer, VIEWPORT_SIZE[0] * VIEWPORT_SIZE[1] * 4)
+    for x, y, bgra in product(range(VIEWPORT_SIZE[0]), range(VIEWPORT_SIZE[1]), range(4)):
+        if bstr[(x + y * VIEWPORT_SIZE[0]) * 4 + bgra] != COLOR[bgra]:
+            return False
+    return True
+
+
+def main():
+    '''
+    Compares access to a 800x600 `on_paint` buffer: `ctypes.string_at()`, `frame_view()` and `FrameRing.copy()`,
+    and the former and vectorized solid color checks.
+    '''
+    w, h = VIEWPORT_SIZE
+    src = (ctypes.c_uint8 * (w * h * 4)).from_buffer_copy(bytes(COLOR) * (w * h))
+    buffer = ctypes.addressof(src)
+    ring = FrameRing(w, h)
+
+    n = 1_000
+    for name, f in (
+            ('ctypes.string_at()', lambda: ctypes.string_at(buffer, w * h * 4)),
+            ('frame_view()', lambda: frame_view(buffer, w, h)),
+            ('FrameRing.copy()', lambda: ring.copy(buffer, w, h))):
+        t = min(timeit.repeat(f, number=n, repeat=5)) / n
+        print(f'{name:<20}{t * 1e6:>10.1f} us')
+
+    assert former_check(buffer)
+    former = min(timeit.repeat(lambda: former_check(buffer), number=1, repeat=3))
+    vectorized = min(timeit.repeat(lambda: (frame_view(buffer, w, h) == COLOR).all(), number=n, repeat=5)) / n
+    print(f'solid color check: former {former * 1e3:.1f} ms, vectorized {vectorized * 1e3:.3f} ms '
+          f'({former / vectorized:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import statistics
+import subprocess
+
+REPEAT = 10
+
+IMPORT_ONLY = '''
+import time
+t = time.perf_counter()
+import cef_capi
+print(time.perf_counter() - t)
+'''
+
+TYPICAL_USE = '''
+import time
+t = time.perf_counter()
+import cef_capi
+from cef_capi import struct, header, base_ctor, size_ctor
+from cef_capi.app_client import client_ctor, app_ctor, settings_main_args_ctor
+client_ctor()
+app_ctor()
+settings_main_args_ctor()
+size_ctor(struct.cef_browser_settings_t)
+struct.cef_window_info_t()
+header.cef_initialize, header.cef_browser_host_create_browser, header.cef_run_message_loop
+print(time.perf_counter() - t)
+'''
+
+
+MODES = {
+    'eager': {'CEF_CAPI_LAZY_HEADER': '0'},
+    'lazy': {'CEF_CAPI_LAZY_HEADER': '1'},
+}
+
+
+def run(source: str, mode: str) -> float:
+    '''
+    Returns the median seconds of |source| in fresh processes, after a warm-up process.
+    '''
+    env = dict(os.environ, **MODES[mode])
+    subprocess.run([sys.executable, '-c', source], env=env, check=True, capture_output=True)
+    ts = []
+    for _ in range(REPEAT):
+        out = subprocess.run(
+            [sys.executable, '-c', source], env=env, check=True, capture_output=True, text=True).stdout
+        ts.append(float(out.strip().splitlines()[-1]))
+    return statistics.median(ts)
+
+
+def main():
+    '''
+    Compares import time of eager and lazy (`CEF_CAPI_LAZY_HEADER`) header modes.
+    Run it with and without `PYTHONDONTWRITEBYTECODE=1` to see the cost of compiling `header.py`.
+    '''
+    print(f'{"scenario":<14}' + ''.join(f'{m + " (ms)":>13}' for m in MODES))
+    for name, source in (('import only', IMPORT_ONLY), ('typical use', TYPICAL_USE)):
+        print(f'{name:<14}' + ''.join(f'{run(source, m) * 1e3:>13.1f}' for m in MODES))
+
+
+if __name__ == '__main__':
+    main()
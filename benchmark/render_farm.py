@@ -0,0 +1,70 @@
+import sys
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from multiprocessing import Process, Queue
+
+PAGES = 64
+CONCURRENCIES = (1, 2, 4, 8)
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    '''
+    Serves a small page per path, with a distinct background color.
+    '''
+    def do_GET(self):
+        n = sum(self.path.encode())
+        body = (
+            '<!DOCTYPE html><html><body style="margin:0;background:#%06x">'
+            '<h1>%s</h1><p>%s</p></body></html>' % (n * 2654435761 % 0xffffff, self.path, 'lorem ipsum ' * 200)
+        ).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def farm_process_main(port: int, concurrency: int, result_queue: Queue):
+    '''
+    CEF cannot initialize twice in a process. Each concurrency runs in its own process.
+    '''
+    from cef_capi.render_farm import RenderFarm
+    farm = RenderFarm(concurrency=concurrency, settle_time=.1)
+    futures = farm.map(f'http://127.0.0.1:{port}/page/{i}' for i in range(PAGES))
+    t = time.perf_counter()
+    farm.serve()
+    elapsed = time.perf_counter() - t
+    failed = sum(1 for f in futures if f.exception() is not None)
+    result_queue.put((elapsed, failed))
+
+
+def main():
+    '''
+    Renders `PAGES` pages of a local HTTP server by `RenderFarm` at several concurrencies,
+    and prints the throughput. The elapsed time includes CEF initialization.
+    '''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    print(f'{"concurrency":>11}{"elapsed (s)":>13}{"pages/s":>9}{"pages/h":>10}{"failed":>8}')
+    try:
+        for concurrency in CONCURRENCIES:
+            result_queue: Queue = Queue()
+            p = Process(target=farm_process_main, args=(port, concurrency, result_queue))
+            p.start()
+            p.join()
+            if p.exitcode != 0:
+                print(f'{concurrency:>11} failed: exit code {p.exitcode}')
+                sys.exit(1)
+            elapsed, failed = result_queue.get()
+            print(f'{concurrency:>11}{elapsed:>13.2f}{PAGES / elapsed:>9.1f}{PAGES / elapsed * 3600:>10.0f}{failed:>8}')
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
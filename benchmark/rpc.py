@@ -0,0 +1,135 @@
+import ctypes
+from cef_capi import base_ctor, struct, header, handler, size_ctor, task_factory, cef_string_ctor, cef_string_t, \
+    decode_cef_string, cef_pointer_to_struct
+from cef_capi.app_client import client_ctor, app_ctor, settings_main_args_ctor
+from cef_capi.rpc import RpcRegistry
+
+CALLS = 20_000
+DRIVER = '''
+(function(){
+    const N = %d;
+    const r = {};
+    function time(label, f) {
+        f();
+        const t = performance.now();
+        for (let i = 0; i < N; i++) f();
+        r[label] = (performance.now() - t) * 1000 / N;
+    }
+    const js = {noop: function(){ return null; }, add: function(a, b){ return a + b; }, echo: function(o){ return o; }};
+    const payload = {id: 1, name: 'item', tags: ['a', 'b', 'c'], score: 0.5};
+    time('noop() JS', () => js.noop());
+    time('noop() hand-written', () => manual.noop());
+    time('noop() RpcRegistry', () => py.noop());
+    time('add(1, 2) JS', () => js.add(1, 2));
+    time('add(1, 2) hand-written', () => manual.add(1, 2));
+    time('add(1, 2) RpcRegistry', () => py.add(1, 2));
+    time('echo({...}) JS', () => js.echo(payload));
+    time('echo({...}) RpcRegistry', () => py.echo(payload));
+    py.report(r);
+})();
+''' % CALLS
+
+
+def main():
+    '''
+    Measures the per-call overhead of JS-to-Python calls from JS: a hand-written `match` dispatcher
+    as `examples/javascript.py` does, and `RpcRegistry`, against plain JS functions.
+    '''
+    app = app_ctor(single_process=True)
+    settings, main_args = settings_main_args_ctor()
+    settings.log_severity = struct.LOGSEVERITY_DISABLE
+    settings.no_sandbox = 1
+    settings.windowless_rendering_enabled = 1
+
+    results: dict[str, float] = {}
+    saved_browser: struct.cef_browser_t | None = None
+
+    @task_factory
+    def close_browser():
+        assert saved_browser is not None
+        host = cef_pointer_to_struct(saved_browser.get_host(saved_browser), struct.cef_browser_host_t)
+        host.close_browser(host, 1)
+
+    rpc = RpcRegistry('py')
+    rpc.register(lambda: None, 'noop')
+    rpc.register(lambda a, b: a + b, 'add')
+    rpc.register(lambda o: o, 'echo')
+
+    @rpc.expose()
+    def report(r: dict):
+        results.update(r)
+        header.cef_post_task(header.TID_UI, close_browser())
+
+    manual_handler = base_ctor(struct.cef_v8handler_t)
+
+    @handler(manual_handler, raw_arg_indices={4, 5})
+    def execute(
+            name: cef_string_t,
+            object: struct.cef_v8value_t,
+            arguments_count: int,
+            arguments: ctypes._Pointer,
+            retval: ctypes._Pointer,
+            exception: cef_string_t):
+        match decode_cef_string(name):
+            case 'ManualNoop':
+                retval[0] = header.cef_v8value_create_null()
+            case 'ManualAdd':
+                a = arguments[0].contents
+                b = arguments[1].contents
+                retval[0] = header.cef_v8value_create_int(a.get_int_value(a) + b.get_int_value(b))
+            case _:
+                cef_string_ctor('Unknown function called.', exception)
+        return 1
+
+    render_process_handler = base_ctor(struct.cef_render_process_handler_t)
+
+    @handler(render_process_handler)
+    def on_web_kit_initialized(*_):
+        header.cef_register_extension(
+            cef_string_ctor('v8/benchmark_manual'),
+            cef_string_ctor('''
+                var manual = {};
+                (function(){
+                    manual.noop = function(){ native function ManualNoop(); return ManualNoop(); };
+                    manual.add = function(a, b){ native function ManualAdd(a, b); return ManualAdd(a, b); };
+                })();
+            '''), manual_handler)
+        rpc.register_extension()
+
+    @handler(app)
+    def get_render_process_handler(*_):
+        return render_process_handler
+
+    header.cef_initialize(main_args, settings, app, None)
+    client = client_ctor()  # Quits the message loop in `on_before_close`.
+
+    @handler(client)
+    def get_load_handler(*_):
+        load_handler = base_ctor(struct.cef_load_handler_t)
+
+        @handler(load_handler)
+        def on_loading_state_change(browser: struct.cef_browser_t, is_loading: int, *_):
+            nonlocal saved_browser
+            if is_loading:
+                return
+            saved_browser = browser
+            frame = cef_pointer_to_struct(browser.get_main_frame(browser), struct.cef_frame_t)
+            frame.execute_java_script(frame, cef_string_ctor(DRIVER), None, 0)
+
+        return load_handler
+
+    window_info = struct.cef_window_info_t()
+    window_info.windowless_rendering_enabled = 1
+    header.cef_browser_host_create_browser(
+        window_info, client, cef_string_ctor('about:blank'), size_ctor(struct.cef_browser_settings_t), None, None)
+    header.cef_run_message_loop()
+    header.cef_shutdown()
+
+    print(f'{"call":<28}{"us/call":>10}')
+    for label, us in results.items():
+        print(f'{label:<28}{us:>10.2f}')
+    print(f'{rpc.calls} RpcRegistry calls dispatched.')
+
+
+if __name__ == '__main__':
+    main()
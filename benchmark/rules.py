@@ -0,0 +1,44 @@
+import re
+import time
+from cef_capi.rules import RuleEngine
+
+RULES = 1000
+URLS = 5000
+
+
+def main():
+    '''
+    Evaluates `RULES` block rules (half host, half path substring) for `URLS` URLs,
+    by a loop over one regex per rule and by `RuleEngine`, and prints the time per request.
+    '''
+    engine = RuleEngine()
+    regexes = []
+    for i in range(RULES // 2):
+        host = f'tracker{i}.example'
+        engine.block(host=host)
+        regexes.append(re.compile(r'^[a-z]+://([^/?#]*\.)?' + re.escape(host) + r'(?=[/:?#]|$)'))
+        path = f'/pixel{i}/'
+        engine.block(contains=path)
+        regexes.append(re.compile(re.escape(path)))
+    urls = [f'https://www.site{i % 97}.com/static/js/app{i}.js?v={i}' for i in range(URLS)]
+    urls += [f'https://cdn.tracker{i % (RULES // 2)}.example/p.gif' for i in range(URLS // 10)]
+    urls += [f'https://www.site{i}.com/pixel{i % (RULES // 2)}/1.gif' for i in range(URLS // 10)]
+
+    t = time.perf_counter()
+    regex_blocked = sum(1 for url in urls if any(r.search(url) for r in regexes))
+    regex_time = time.perf_counter() - t
+
+    engine.evaluate(urls[0])  # Compiles.
+    t = time.perf_counter()
+    engine_blocked = sum(1 for url in urls if engine.evaluate(url).action == 'block')
+    engine_time = time.perf_counter() - t
+
+    assert regex_blocked == engine_blocked, (regex_blocked, engine_blocked)
+    print(f'{len(urls)} URLs, {RULES} rules, {engine_blocked} blocked')
+    print(f'{"matcher":<14}{"us/request":>12}')
+    print(f'{"regex loop":<14}{regex_time / len(urls) * 1e6:>12.1f}')
+    print(f'{"RuleEngine":<14}{engine_time / len(urls) * 1e6:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
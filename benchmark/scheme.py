@@ -0,0 +1,152 @@
+import sys
+import time
+import statistics
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from multiprocessing import Process, Queue
+
+REPEAT = 10
+SMALL_ASSETS = 20
+LARGE_SIZE = 16 * 1024 * 1024
+
+
+def assets() -> dict[str, bytes]:
+    '''
+    A small page with `SMALL_ASSETS` render-blocking stylesheets, and a large page with one `LARGE_SIZE` stylesheet.
+    '''
+    ret = {}
+    links = ''
+    for i in range(SMALL_ASSETS):
+        ret[f'/small/{i}.css'] = (f'.c{i} {{ color: #{i:06x}; }}\n' * 100).encode()
+        links += f'<link rel="stylesheet" href="{i}.css">'
+    ret['/small/index.html'] = f'<!DOCTYPE html><html><head>{links}</head><body>small</body></html>'.encode()
+    ret['/large/big.css'] = b'/*' + b'x' * (LARGE_SIZE - 4) + b'*/'
+    ret['/large/index.html'] = b'<!DOCTYPE html><html><head><link rel="stylesheet" href="big.css"></head><body>large</body></html>'
+    return ret
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    '''
+    Serves `assets()` as the examples serve files by `ThreadingHTTPServer`.
+    '''
+    ASSETS = assets()
+
+    def do_GET(self):
+        body = self.ASSETS.get(self.path.split('?')[0])
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html' if self.path.endswith('.html') else 'text/css')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_process_main(mode: str, result_queue: Queue):
+    '''
+    CEF cannot initialize twice in a process. Each mode runs in its own process.
+    Loads each page `REPEAT` times in one windowless browser, after one warm-up load.
+    '''
+    from cef_capi import base_ctor, struct, header, handler, size_ctor, task_factory, cef_string_ctor, \
+        cef_pointer_to_struct
+    from cef_capi.app_client import client_ctor, app_ctor, settings_main_args_ctor
+    from cef_capi.scheme import SchemeServer
+
+    app = app_ctor()
+    settings, main_args = settings_main_args_ctor()
+    settings.log_severity = struct.LOGSEVERITY_DISABLE
+    settings.no_sandbox = 1
+    settings.windowless_rendering_enabled = 1
+
+    if mode == 'http':
+        server = ThreadingHTTPServer(('127.0.0.1', 0), AssetHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    else:
+        scheme_server = SchemeServer('https', 'app.local')
+        scheme_server.headers['Cache-Control'] = 'no-store'
+        for path, body in AssetHandler.ASSETS.items():
+            scheme_server.add_blob(path, body)
+        scheme_server.attach(app)
+        base_url = 'https://app.local'
+
+    loads = [(page, i) for page in ('small', 'large') for i in range(REPEAT + 1)]
+    timings: dict[str, list[float]] = {'small': [], 'large': []}
+    started = 0.
+    saved_browser: struct.cef_browser_t | None = None
+
+    @task_factory
+    def load_next():
+        nonlocal started
+        assert saved_browser is not None
+        if not loads:
+            host = cef_pointer_to_struct(saved_browser.get_host(saved_browser), struct.cef_browser_host_t)
+            host.close_browser(host, 1)
+            return
+        page, i = loads[0]
+        frame = cef_pointer_to_struct(saved_browser.get_main_frame(saved_browser), struct.cef_frame_t)
+        started = time.perf_counter()
+        frame.load_url(frame, cef_string_ctor(f'{base_url}/{page}/index.html?{i}'))
+
+    header.cef_initialize(main_args, settings, app, None)
+    if mode == 'scheme':
+        scheme_server.register_handler_factory()
+    client = client_ctor()  # Quits the message loop in `on_before_close`.
+
+    @handler(client)
+    def get_load_handler(*_):
+        load_handler = base_ctor(struct.cef_load_handler_t)
+
+        @handler(load_handler)
+        def on_loading_state_change(browser: struct.cef_browser_t, is_loading: int, *_):
+            nonlocal saved_browser
+            if is_loading:
+                return
+            if saved_browser is not None:
+                page, i = loads.pop(0)
+                if i:  # 0 is warm-up.
+                    timings[page].append(time.perf_counter() - started)
+            saved_browser = browser
+            header.cef_post_task(header.TID_UI, load_next())
+
+        return load_handler
+
+    window_info = struct.cef_window_info_t()
+    window_info.windowless_rendering_enabled = 1
+    header.cef_browser_host_create_browser(
+        window_info, client, cef_string_ctor('about:blank'), size_ctor(struct.cef_browser_settings_t), None, None)
+    header.cef_run_message_loop()
+    header.cef_shutdown()
+    result_queue.put(timings)
+
+
+def main():
+    '''
+    Loads a page of many small assets and a page of one large asset, served by a localhost `ThreadingHTTPServer`
+    and by `cef_capi.scheme.SchemeServer`, and prints the median load latency and the throughput of the large asset.
+    '''
+    results = {}
+    for mode in ('http', 'scheme'):
+        result_queue: Queue = Queue()
+        p = Process(target=load_process_main, args=(mode, result_queue))
+        p.start()
+        p.join()
+        if p.exitcode != 0:
+            print(f'{mode} failed: exit code {p.exitcode}')
+            sys.exit(1)
+        results[mode] = result_queue.get()
+
+    print(f'{"server":<8}{"small page (ms)":>17}{"large page (ms)":>17}{"large MB/s":>12}')
+    for mode, timings in results.items():
+        small = statistics.median(timings['small'])
+        large = statistics.median(timings['large'])
+        print(f'{mode:<8}{small * 1e3:>17.1f}{large * 1e3:>17.1f}{LARGE_SIZE / large / 1e6:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
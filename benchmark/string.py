@@ -0,0 +1,34 @@
+import timeit
+from cef_capi import cef_string_ctor, cef_string_array_ctor, cef_string_t, CefStringCache
+
+N = 100_000
+
+STRINGS = {
+    'short (16 chars)': 'disable-gpu-comp',
+    'long (64K chars)': 'document.body.style.background = "green";' * 1600,
+}
+
+
+def main():
+    '''
+    Compares `cef_string_ctor()` with and without `CefStringCache`, and `cef_string_array_ctor()`.
+    '''
+    print(f'{"string":<18}{"no cache (us)":>15}{"cache (us)":>12}{"reuse u (us)":>14}')
+    for name, s in STRINGS.items():
+        n = N if len(s) < 1024 else N // 100
+        cache = CefStringCache()
+        u = cef_string_t()
+        no_cache = min(timeit.repeat(lambda: cef_string_ctor(s, cache=None), number=n, repeat=5)) / n
+        cached = min(timeit.repeat(lambda: cef_string_ctor(s, cache=cache), number=n, repeat=5)) / n
+        reuse = min(timeit.repeat(lambda: cef_string_ctor(s, u, cache=cache), number=n, repeat=5)) / n
+        print(f'{name:<18}{no_cache * 1e6:>15.3f}{cached * 1e6:>12.3f}{reuse * 1e6:>14.3f}')
+
+    switches = ['single-process', 'disable-gpu', 'disable-gpu-compositing', 'in-process-gpu', 'use-mock-keychain'] * 20
+    n = N // 100
+    one_by_one = min(timeit.repeat(lambda: [cef_string_ctor(s) for s in switches], number=n, repeat=5)) / n
+    bulk = min(timeit.repeat(lambda: cef_string_array_ctor(switches), number=n, repeat=5)) / n
+    print(f'{len(switches)} strings: one by one {one_by_one * 1e6:.1f} us, cef_string_array_ctor() {bulk * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import ctypes
+import timeit
+from cef_capi import task_factory, pooled_task_factory
+
+N = 20_000
+
+
+def simulate_post(factory):
+    '''
+    Does what CEF does for a posted task: `execute()` then `release()`.
+    '''
+    task = factory(1, kw=2)
+    task.execute(ctypes.pointer(task))
+    task.base.release(ctypes.pointer(task.base))
+
+
+def main():
+    '''
+    Compares `task_factory` and `pooled_task_factory` by ctor + execute + release cycles.
+    '''
+    def func(arg, kw=0):
+        pass
+
+    print(f'{"factory":<22}{"us per task":>12}')
+    for name, factory in (
+            ('task_factory', task_factory(func)),
+            ('pooled_task_factory', pooled_task_factory()(func))):
+        t = min(timeit.repeat(lambda: simulate_post(factory), number=N, repeat=5))
+        print(f'{name:<22}{t / N * 1e6:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
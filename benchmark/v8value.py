@@ -0,0 +1,208 @@
+import time
+import ctypes
+import typing as ty
+from cef_capi import base_ctor, struct, header, handler, size_ctor, task_factory, cef_string_ctor, cef_string_t, \
+    decode_cef_string, decode_cef_string_list, cef_pointer_to_struct
+from cef_capi.app_client import client_ctor, app_ctor, settings_main_args_ctor
+from cef_capi.v8value import v8value_ctor, decode_v8value, decode_v8_arguments
+
+REPEAT = 5
+PAYLOADS: dict[str, ty.Callable[[], ty.Any]] = {
+    'rows 10k': lambda: [
+        {'id': i, 'name': f'item-{i}', 'score': i * .5, 'active': i % 2 == 0, 'tags': ['a', 'b'], 'parent': None}
+        for i in range(10_000)],
+    'ints 100k': lambda: list(range(100_000)),
+    'strs 10k': lambda: [f'string number {i}' for i in range(10_000)],
+    'tree depth 12': lambda: _tree(12),
+}
+
+
+def _tree(depth: int):
+    return {'value': depth, 'children': [_tree(depth - 1), _tree(depth - 1)] if depth else []}
+
+
+def naive_v8value_ctor(o) -> ctypes._Pointer:
+    '''
+    One FFI call at a time through the struct members, as `examples/javascript.py` does.
+    '''
+    if o is None:
+        return header.cef_v8value_create_null()
+    if isinstance(o, bool):
+        return header.cef_v8value_create_bool(int(o))
+    if isinstance(o, int):
+        return header.cef_v8value_create_int(o)
+    if isinstance(o, float):
+        return header.cef_v8value_create_double(o)
+    if isinstance(o, str):
+        return header.cef_v8value_create_string(cef_string_ctor(o))
+    if isinstance(o, dict):
+        p = header.cef_v8value_create_object(None, None)
+        v = p.contents
+        for k, c in o.items():
+            v.set_value_bykey(v, cef_string_ctor(k), naive_v8value_ctor(c), header.V8_PROPERTY_ATTRIBUTE_NONE)
+        return p
+    if isinstance(o, list):
+        p = header.cef_v8value_create_array(len(o))
+        v = p.contents
+        for i, c in enumerate(o):
+            v.set_value_byindex(v, i, naive_v8value_ctor(c))
+        return p
+    raise Exception(f'Unsupported: {type(o)}')
+
+
+def naive_decode_v8value(v: struct.cef_v8value_t):
+    '''
+    One FFI call at a time through the struct members, as `examples/javascript.py` does.
+    '''
+    def child(addr: int):
+        c = cef_pointer_to_struct(addr, struct.cef_v8value_t)
+        try:
+            return naive_decode_v8value(c)
+        finally:
+            c.base.release(ctypes.byref(c.base))
+
+    if v.is_string(v):
+        addr = v.get_string_value(v)
+        return decode_cef_string(addr, free_after_decode=True) if addr else ''
+    if v.is_int(v):
+        return v.get_int_value(v)
+    if v.is_double(v):
+        return v.get_double_value(v)
+    if v.is_bool(v):
+        return bool(v.get_bool_value(v))
+    if v.is_null(v) or v.is_undefined(v):
+        return None
+    if v.is_array(v):
+        return [child(v.get_value_byindex(v, i)) for i in range(v.get_array_length(v))]
+    if v.is_object(v):
+        lst = header.cef_string_list_alloc()
+        try:
+            v.get_keys(v, lst)
+            return {k: child(v.get_value_bykey(v, cef_string_ctor(k))) for k in decode_cef_string_list(lst)}
+        finally:
+            header.cef_string_list_free(lst)
+    raise Exception('Unsupported V8 value.')
+
+
+def main():
+    '''
+    Builds each payload as JS return value, and reads it back as JS argument, with the naive one-call-at-a-time
+    converters and `cef_capi.v8value`. JS drives the calls in a single process windowless browser.
+    '''
+    app = app_ctor(single_process=True)
+    settings, main_args = settings_main_args_ctor()
+    settings.log_severity = struct.LOGSEVERITY_DISABLE
+    settings.no_sandbox = 1
+    settings.windowless_rendering_enabled = 1
+
+    payloads = {name: f() for name, f in PAYLOADS.items()}
+    timings: dict[tuple[str, str, str], float] = {}
+    saved_browser: struct.cef_browser_t | None = None
+
+    @task_factory
+    def close_browser():
+        assert saved_browser is not None
+        host = cef_pointer_to_struct(saved_browser.get_host(saved_browser), struct.cef_browser_host_t)
+        host.close_browser(host, 1)
+
+    v8handler = base_ctor(struct.cef_v8handler_t)
+
+    @handler(v8handler, raw_arg_indices={4, 5})
+    def execute(
+            name: cef_string_t,
+            object: struct.cef_v8value_t,
+            arguments_count: int,
+            arguments: ctypes._Pointer,
+            retval: ctypes._Pointer,
+            exception: cef_string_t):
+        fn = decode_cef_string(name)
+        if fn == 'Done':
+            header.cef_post_task(header.TID_UI, close_browser())
+            return 1
+        args = [arguments[i].contents for i in range(arguments_count)]
+        payload = decode_v8value(args[0])
+        mode = decode_v8value(args[1])
+        t = time.perf_counter()
+        match fn, mode:
+            case 'Make', 'naive':
+                retval[0] = naive_v8value_ctor(payloads[payload])
+            case 'Make', 'batched':
+                retval[0] = v8value_ctor(payloads[payload])
+            case 'Take', 'naive':
+                value = naive_decode_v8value(args[2])
+            case 'Take', 'batched':
+                value = decode_v8_arguments(arguments_count, arguments)[2]
+        elapsed = time.perf_counter() - t
+        if fn == 'Take':
+            assert value == payloads[payload], f'{payload} {mode}'
+        key = (payload, fn, mode)
+        timings[key] = min(timings.get(key, elapsed), elapsed)
+        return 1
+
+    @handler(app)
+    def get_render_process_handler():
+        render_process_handler = base_ctor(struct.cef_render_process_handler_t)
+
+        @handler(render_process_handler)
+        def on_web_kit_initialized(*_):
+            header.cef_register_extension(
+                cef_string_ctor('v8/benchmark'),
+                cef_string_ctor('''
+                    var bench = {};
+                    (function(){
+                        native function Make(payload, mode);
+                        native function Take(payload, mode, value);
+                        native function Done();
+                        bench.run = function(payloads, modes, repeat){
+                            for (const p of payloads) {
+                                for (const m of modes) {
+                                    for (let i = 0; i < repeat; i++) {
+                                        Take(p, m, Make(p, m));
+                                    }
+                                }
+                            }
+                            Done();
+                        };
+                    })();
+                '''), v8handler)
+            return 0
+
+        return render_process_handler
+
+    header.cef_initialize(main_args, settings, app, None)
+    client = client_ctor()  # Quits the message loop in `on_before_close`.
+
+    @handler(client)
+    def get_load_handler(*_):
+        load_handler = base_ctor(struct.cef_load_handler_t)
+
+        @handler(load_handler)
+        def on_loading_state_change(browser: struct.cef_browser_t, is_loading: int, *_):
+            nonlocal saved_browser
+            if is_loading:
+                return
+            saved_browser = browser
+            frame = cef_pointer_to_struct(browser.get_main_frame(browser), struct.cef_frame_t)
+            names = ', '.join(f"'{name}'" for name in PAYLOADS)
+            frame.execute_java_script(
+                frame, cef_string_ctor(f"bench.run([{names}], ['naive', 'batched'], {REPEAT});"), None, 0)
+
+        return load_handler
+
+    window_info = struct.cef_window_info_t()
+    window_info.windowless_rendering_enabled = 1
+    header.cef_browser_host_create_browser(
+        window_info, client, cef_string_ctor('about:blank'), size_ctor(struct.cef_browser_settings_t), None, None)
+    header.cef_run_message_loop()
+    header.cef_shutdown()
+
+    print(f'{"payload":<16}{"direction":<12}{"naive (ms)":>12}{"batched (ms)":>14}{"speedup":>9}')
+    for payload in PAYLOADS:
+        for fn, direction in (('Make', 'Python->JS'), ('Take', 'JS->Python')):
+            naive = timings[(payload, fn, 'naive')]
+            batched = timings[(payload, fn, 'batched')]
+            print(f'{payload:<16}{direction:<12}{naive * 1e3:>12.2f}{batched * 1e3:>14.2f}{naive / batched:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
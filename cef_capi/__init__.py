@@ -1,10 +1,18 @@
 import typing as ty
+import os
+import codecs
 import sys
 import ctypes
+import threading
 import sysconfig
 from pathlib import Path
+from cef_capi.depot import ObjectDepot
 
-NON_GC_DEPOT = {}
+NON_GC_DEPOT = ObjectDepot()
+'''
+Keeps `base_ctor()`-ed objects until CEF releases them.
+Use `NON_GC_DEPOT.stats()` and `NON_GC_DEPOT.snapshot()` to find leaks.
+'''
 
 match sys.byteorder:
     case 'little':
@@ -15,6 +23,21 @@ match sys.byteorder:
         raise Exception('unknown byteorder')
 
 
+LAZY_HEADER = os.environ.get('CEF_CAPI_LAZY_HEADER', '0') not in ('', '0')
+'''
+If environment variable `CEF_CAPI_LAZY_HEADER=1`, `header` / `struct` are loaded lazily
+by `cef_capi.lazy_header`. Structs, enums and functions are materialized on first access.
+'''
+
+
+def _load_header(package: str):
+    '''
+    Loads `header` / `struct` of |package| by `LAZY_HEADER` mode.
+    '''
+    from cef_capi import lazy_header
+    return lazy_header.load(package)
+
+
 RUNTIME_DIR = (Path(__file__).parent / 'runtime').absolute()
 if not RUNTIME_DIR.exists():
     RUNTIME_DIR = (Path(__file__).parent.parent / 'cef_binary/client/Release').absolute()
@@ -25,18 +48,27 @@ match sysconfig.get_platform():
     case 'win-amd64':
         if sys.platform == 'win32':  # Helps Pylance
             LIBCEF_PATH = RUNTIME_DIR / 'libcef.dll'
-            import cef_capi.win_amd64.header as header  # noqa
-            import cef_capi.win_amd64.struct as struct  # noqa
+            if LAZY_HEADER:
+                header, struct = _load_header('cef_capi.win_amd64')
+            else:
+                import cef_capi.win_amd64.header as header  # noqa
+                import cef_capi.win_amd64.struct as struct  # noqa
     case 'linux-aarch64':
         if sys.platform == 'linux':  # Helps Pylance
             LIBCEF_PATH = RUNTIME_DIR / 'libcef.so'
-            import cef_capi.linux_aarch64.header as header  # noqa
-            import cef_capi.linux_aarch64.struct as struct  # noqa
+            if LAZY_HEADER:
+                header, struct = _load_header('cef_capi.linux_aarch64')
+            else:
+                import cef_capi.linux_aarch64.header as header  # noqa
+                import cef_capi.linux_aarch64.struct as struct  # noqa
     case 'linux-x86_64':
         if sys.platform == 'linux':  # Helps Pylance
             LIBCEF_PATH = RUNTIME_DIR / 'libcef.so'
-            import cef_capi.linux_x86_64.header as header  # noqa
-            import cef_capi.linux_x86_64.struct as struct  # noqa
+            if LAZY_HEADER:
+                header, struct = _load_header('cef_capi.linux_x86_64')
+            else:
+                import cef_capi.linux_x86_64.header as header  # noqa
+                import cef_capi.linux_x86_64.struct as struct  # noqa
     case _:
         es = sysconfig.get_platform().split('-')
         if es[0] == 'macosx':
@@ -44,11 +76,17 @@ match sysconfig.get_platform():
                 LIBCEF_PATH = RUNTIME_DIR / 'cefclient.app/Contents/Frameworks/Chromium Embedded Framework.framework/Chromium Embedded Framework'
                 match es[2]:
                     case 'x86_64':
-                        import cef_capi.macosx_x86_64.header as header  # noqa
-                        import cef_capi.macosx_x86_64.struct as struct  # noqa
+                        if LAZY_HEADER:
+                            header, struct = _load_header('cef_capi.macosx_x86_64')
+                        else:
+                            import cef_capi.macosx_x86_64.header as header  # noqa
+                            import cef_capi.macosx_x86_64.struct as struct  # noqa
                     case 'arm64':
-                        import cef_capi.macosx_arm64.header as header  # noqa
-                        import cef_capi.macosx_arm64.struct as struct  # noqa
+                        if LAZY_HEADER:
+                            header, struct = _load_header('cef_capi.macosx_arm64')
+                        else:
+                            import cef_capi.macosx_arm64.header as header  # noqa
+                            import cef_capi.macosx_arm64.struct as struct  # noqa
                     case _:
                         raise Exception(f'unknown architecture: {es[2]}')
         else:
@@ -74,21 +112,106 @@ _init()
 cef_string_t = struct.cef_string_utf16_t
 
 
-def cef_string_ctor(s: str, u: cef_string_t | None = None):
+class CefStringCache:
     '''
-    Converts str to cef_string_utf16_t.
+    LRU cache of UTF-16 encoded str for `cef_string_ctor()`.
+
+    Each cached buffer is kept alive while it is in the cache, so `cef_string_t` pointing to it
+    stays valid even if the `cef_string_t` itself does not own the buffer
+    (e.g. `exception` arg of `cef_v8handler_t.execute`).
+    Bounded by the number of entries and the total bytes. Longer str than |max_bytes| bypasses the cache.
     '''
-    if u is None:
-        u = cef_string_t()
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        from collections import OrderedDict
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[bytes, ctypes._Pointer, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, s: str) -> tuple[bytes, ctypes._Pointer, int]:
+        '''
+        Returns `(buffer, pointer to buffer, length in UTF-16 code units)` of |s|.
+        '''
+        with self._lock:
+            e = self._entries.get(s)
+            if e is not None:
+                self._entries.move_to_end(s)
+                self.hits += 1
+                return e
+            self.misses += 1
+        e = _encode_utf16(s)
+        size = len(e[0])
+        if size > self.max_bytes:
+            return e
+        with self._lock:
+            if s not in self._entries:
+                self._entries[s] = e
+                self.total_bytes += size
+                while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                    _, (b, _, _) = self._entries.popitem(last=False)
+                    self.total_bytes -= len(b)
+        return e
+
+    def clear(self):
+        '''
+        Drops all cached buffers. `cef_string_t` owning a buffer still keeps it.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
+
+def _encode_utf16(s: str) -> tuple[bytes, ctypes._Pointer, int]:
     # Why don't use ctypes.create_unicode_buffer()? In macOS, ctypes.sizeof(ctypes.c_wchar) == 4.
     # CEF requires 2-byte UTF-16.
     buf = s.encode(UTF16_ENCODING)
-    u.str = ctypes.cast(ctypes.c_char_p(buf), type(u.str))
-    u.length = len(buf) // 2
+    # No copy: the pointer refers to the internal buffer of |buf|, and keeps |buf| alive.
+    return buf, ctypes.cast(ctypes.c_char_p(buf), _CEF_STRING_STR_T), len(buf) // 2
+
+
+_CEF_STRING_STR_T = dict(cef_string_t._fields_)['str']
+
+STRING_CACHE = CefStringCache()
+'''
+Shared cache for `cef_string_ctor(..., cache=STRING_CACHE)`.
+'''
+
+
+def cef_string_ctor(s: str, u: cef_string_t | None = None, cache: CefStringCache | None = None):
+    '''
+    Converts str to cef_string_utf16_t.
+
+    The buffer is owned by |u| (its pointer member keeps the buffer), and by |cache| while cached.
+    Pass `STRING_CACHE` as |cache| for str used again and again, e.g. header names.
+    '''
+    if u is None:
+        u = cef_string_t()
+
+    _, p, length = _encode_utf16(s) if cache is None else cache.encode(s)
+    u.str = p
+    u.length = length
     return u
 
 
+def cef_string_array_ctor(strings: ty.Sequence[str], cache: CefStringCache | None = None) -> ctypes.Array:
+    '''
+    Converts str sequence to `cef_string_utf16_t` array at once. The array owns the buffers.
+    '''
+    arr = (cef_string_t * len(strings))()
+    encode = _encode_utf16 if cache is None else cache.encode
+    for u, s in zip(arr, strings):
+        _, p, length = encode(s)
+        u.str = p
+        u.length = length
+    return arr
+
+
 def cef_pointer_to_struct(v, cef_struct_t: type):
     '''
     Converts pointer to struct. If |v| is struct itself, checks the type.
@@ -107,17 +230,132 @@ def cef_pointer_to_struct(v, cef_struct_t: type):
     return ret
 
 
+class _CefStringRaw(ctypes.Structure):
+    '''
+    Same layout as `cef_string_utf16_t`, but members are plain ints to read without pointer objects.
+    '''
+    _pack_ = 1
+    _fields_ = [
+        ('str', ctypes.c_void_p),
+        ('length', ctypes.c_uint64),
+        ('dtor', ctypes.c_void_p),
+    ]
+
+
+_CEF_STRING_P = ctypes.POINTER(cef_string_t)
+_PyMemoryView_FromMemory = ctypes.pythonapi.PyMemoryView_FromMemory
+_PyMemoryView_FromMemory.restype = ctypes.py_object
+_PyMemoryView_FromMemory.argtypes = [ctypes.c_void_p, ctypes.c_ssize_t, ctypes.c_int]
+_PyBUF_READ = 0x100
+_PyBUF_WRITE = 0x200
+_UTF16_DECODE = codecs.utf_16_le_decode if UTF16_ENCODING == 'utf-16-le' else codecs.utf_16_be_decode
+
+
+class _PyBuffer(ctypes.Structure):
+    '''
+    `Py_buffer` of the C API.
+    '''
+    _fields_ = [
+        ('buf', ctypes.c_void_p),
+        ('obj', ctypes.c_void_p),
+        ('len', ctypes.c_ssize_t),
+        ('itemsize', ctypes.c_ssize_t),
+        ('readonly', ctypes.c_int),
+        ('ndim', ctypes.c_int),
+        ('format', ctypes.c_char_p),
+        ('shape', ctypes.c_void_p),
+        ('strides', ctypes.c_void_p),
+        ('suboffsets', ctypes.c_void_p),
+        ('internal', ctypes.c_void_p),
+    ]
+
+
+_PyObject_GetBuffer = ctypes.pythonapi.PyObject_GetBuffer
+_PyObject_GetBuffer.restype = ctypes.c_int
+_PyObject_GetBuffer.argtypes = [ctypes.py_object, ctypes.POINTER(_PyBuffer), ctypes.c_int]
+_PyBuffer_Release = ctypes.pythonapi.PyBuffer_Release
+_PyBuffer_Release.restype = None
+_PyBuffer_Release.argtypes = [ctypes.POINTER(_PyBuffer)]
+_PyBUF_SIMPLE = 0
+_PyBUF_WRITABLE = 0x1
+
+
+class _BufferExport:
+    '''
+    Exported contiguous buffer of an object. While exported, the memory cannot move
+    (e.g. `bytearray` refuses to resize). `release()` ends the export.
+    |flags| `_PyBUF_WRITABLE` raises `BufferError` for a read-only object.
+    '''
+    __slots__ = ('view', 'exported')
+
+    def __init__(self, o, flags: int = _PyBUF_SIMPLE):
+        self.view = _PyBuffer()
+        _PyObject_GetBuffer(o, ctypes.byref(self.view), flags)  # Raises if not C-contiguous.
+        self.exported = True
+
+    def release(self):
+        if self.exported:
+            self.exported = False
+            _PyBuffer_Release(ctypes.byref(self.view))
+
+
+class _Pin:
+    '''
+    Exported buffer of |data|. While the pin lives, the address stays valid, e.g. for `read()` of a resource handler.
+    '''
+    __slots__ = ('data', 'export', 'address', 'size')
+
+    def __init__(self, data):
+        self.data = data
+        self.export = _BufferExport(data)
+        self.address = self.export.view.buf or 0
+        self.size = self.export.view.len
+
+    def __del__(self):
+        if hasattr(self, 'export'):
+            self.export.release()
+
+
+_INT32_MIN = -2 ** 31
+_INT32_MAX = 2 ** 31 - 1
+
+
+def _cef_string_address(cs: cef_string_t | ctypes._Pointer | int) -> int:
+    '''
+    Returns the address of `cef_string_utf16_t` |cs|.
+    '''
+    if isinstance(cs, int):
+        return cs
+    if isinstance(cs, _CEF_STRING_P):
+        return ctypes.cast(cs, ctypes.c_void_p).value or 0
+    if isinstance(cs, cef_string_t):
+        return ctypes.addressof(cs)
+    raise Exception(f'decode_cef_string() got wrong arg: {cs}')
+
+
+def _decode_cef_string_at(addr: int) -> str | None:
+    '''
+    Decodes `cef_string_utf16_t` at |addr| straight from its UTF-16 buffer. Returns None if NULL.
+    '''
+    raw = _CefStringRaw.from_address(addr)
+    p = raw.str
+    if p is None:
+        return None
+    return _UTF16_DECODE(_PyMemoryView_FromMemory(p, raw.length * 2, _PyBUF_READ))[0]
+
+
 def decode_cef_string(
         cs: cef_string_t | ctypes._Pointer | int,
         free_after_decode=False):
     '''
     Converts `cef_string_utf16_t` instance to str. |free_after_decode| is good for userfree instance.
     '''
-    cef_string: cef_string_t = cef_pointer_to_struct(cs, cef_string_t)
-    buf_p = ctypes.cast(cef_string.str, ctypes.POINTER(ctypes.c_byte * cef_string.length * 2))
-    if not bool(buf_p):
+    addr = _cef_string_address(cs)
+    if addr == 0:
+        raise Exception('NULL pointer.')
+    ret = _decode_cef_string_at(addr)
+    if ret is None:
         raise Exception('NULL pointer.')
-    ret = bytes(buf_p.contents).decode(UTF16_ENCODING)
 
     if free_after_decode:
         if isinstance(cs, int):
@@ -132,6 +370,156 @@ def decode_cef_string(
     return ret
 
 
+def _decode_userfree(addr: int) -> str:
+    '''
+    Decodes and frees userfree `cef_string_t` at |addr|, e.g. of `cef_request_t.get_url`. '' if NULL.
+    '''
+    return decode_cef_string(addr, free_after_decode=True) if addr else ''
+
+
+def _decode_or_empty(cs: cef_string_t | ctypes._Pointer | int | None) -> str:
+    '''
+    Decodes `cef_string_t` |cs| of a callback arg. '' if the pointer or the buffer is NULL, as of an empty string.
+    '''
+    addr = 0 if cs is None else _cef_string_address(cs)
+    return (_decode_cef_string_at(addr) or '') if addr else ''
+
+
+def _request_header(request, name: str) -> str:
+    '''
+    Returns the value of header |name| of `cef_request_t` |request|, or ''.
+    '''
+    return _decode_userfree(request.get_header_by_name(request, cef_string_ctor(name, cache=STRING_CACHE)))
+
+
+def decode_cef_string_list(lst) -> list[str]:
+    '''
+    Converts `cef_string_list_t` to list of str in one pass, with a scratch `cef_string_t`.
+    '''
+    value = header.cef_string_list_value
+    scratch = cef_string_t()
+    scratch_p = ctypes.pointer(scratch)
+    addr = ctypes.addressof(scratch)
+    ret = []
+    try:
+        for i in range(header.cef_string_list_size(lst)):
+            value(lst, i, scratch_p)  # CEF frees the previous value of |scratch|.
+            ret.append(_decode_cef_string_at(addr) or '')
+    finally:
+        header.cef_string_utf16_clear(scratch_p)
+    return ret
+
+
+def decode_cef_string_map(m) -> dict[str, str]:
+    '''
+    Converts `cef_string_map_t` to dict of str in one pass, with scratch `cef_string_t`.
+    '''
+    map_key = header.cef_string_map_key
+    map_value = header.cef_string_map_value
+    k = cef_string_t()
+    v = cef_string_t()
+    k_p = ctypes.pointer(k)
+    v_p = ctypes.pointer(v)
+    k_addr = ctypes.addressof(k)
+    v_addr = ctypes.addressof(v)
+    ret = {}
+    try:
+        for i in range(header.cef_string_map_size(m)):
+            map_key(m, i, k_p)
+            map_value(m, i, v_p)
+            ret[_decode_cef_string_at(k_addr) or ''] = _decode_cef_string_at(v_addr) or ''
+    finally:
+        header.cef_string_utf16_clear(k_p)
+        header.cef_string_utf16_clear(v_p)
+    return ret
+
+
+CALLBACK_TRAMPOLINE = os.environ.get('CEF_CAPI_CALLBACK_TRAMPOLINE', '0') not in ('', '0')
+'''
+If True, `_register_callback()` builds a trampoline specialized for the CFUNCTYPE signature
+of the member function, instead of the generic `*args` dispatcher. Off by default.
+Opt in by environment variable `CEF_CAPI_CALLBACK_TRAMPOLINE=1`, by setting it True before registering handlers,
+or per handler by `@handler(..., trampoline=True)`.
+'''
+
+_TRAMPOLINE_FACTORIES: dict[tuple, ty.Callable] = {}
+
+
+def _callback_return_value(ret):
+    '''
+    Converts the return value of a handler function to the value for ctypes callback.
+    '''
+    if ret is None or isinstance(ret, int):
+        return ret
+    if isinstance(ret, ctypes.Structure):
+        to_check = ret
+    elif isinstance(ret, ctypes._Pointer):
+        to_check = ret.contents
+    else:
+        raise Exception(f'Callback should return only None, int, or cef_base_ref_counted_t-ed struct. The return value {ret} looks wrong.')
+    if hasattr(to_check, 'base') and isinstance(to_check.base, struct.cef_base_ref_counted_t):
+        return ctypes.addressof(ret)  # automatic int conversion. See ReadMe.md.
+    raise Exception('Python GC may remove the return value!')
+
+
+def _empty_callback_return_value(restype):
+    '''
+    The return value of a member function without handler.
+    '''
+    if restype is None or restype is ctypes.c_void_p:
+        return None
+    return 0
+
+
+def _trampoline_factory(
+        cfunc_t: type,
+        ignore_arg_indices: set[int],
+        raw_arg_indices: set[int],
+        has_additional_args: bool,
+        has_additional_kwargs: bool):
+    '''
+    Returns a factory of trampolines for |cfunc_t| signature.
+
+    The factory is generated from the argtypes of |cfunc_t| once and cached.
+    Auto dereferencing is decided here, not in every call.
+    '''
+    key = (cfunc_t, frozenset(ignore_arg_indices), frozenset(raw_arg_indices), has_additional_args, has_additional_kwargs)
+    factory = _TRAMPOLINE_FACTORIES.get(key)
+    if factory is not None:
+        return factory
+
+    params = []
+    call_args = []
+    for i, t in enumerate(cfunc_t._argtypes_):
+        a = f'a{i}'
+        params.append(a)
+        if i in ignore_arg_indices:
+            continue
+        if i not in raw_arg_indices and issubclass(t, ctypes._Pointer):
+            call_args.append(f'({a}.contents if {a} else None)')  # Auto dereferencing
+        else:
+            call_args.append(a)
+    if has_additional_args:
+        call_args.append('*additional_args')
+    if has_additional_kwargs:
+        call_args.append('**additional_kwargs')
+
+    src = (
+        'def factory(handler_func, additional_args, additional_kwargs):\n'
+        f'    def trampoline({", ".join(params)}):\n'
+        f'        ret = handler_func({", ".join(call_args)})\n'
+        '        if ret is None or ret.__class__ is int:\n'
+        '            return ret\n'
+        '        return _callback_return_value(ret)\n'
+        '    return trampoline\n'
+    )
+    ns = {'_callback_return_value': _callback_return_value}
+    exec(compile(src, '<cef_capi trampoline>', 'exec'), ns)
+    factory = ns['factory']
+    _TRAMPOLINE_FACTORIES[key] = factory
+    return factory
+
+
 def _register_callback(
         struct_obj: ctypes.Structure,
         name: str,
@@ -139,7 +527,8 @@ def _register_callback(
         ignore_arg_indices: set[int] = {0},
         raw_arg_indices: set[int] = set(),
         additional_args: tuple = tuple(),
-        additional_kwargs: dict = dict()):
+        additional_kwargs: dict = dict(),
+        trampoline: bool | None = None):
     '''
     Registers event handler to |struct_obj|.
 
@@ -150,8 +539,28 @@ def _register_callback(
     To disable auto dereferencing, use |raw_arg_indices|.
 
     |additional_args| and |additional_kwargs| are for cef_task_t.
+
+    |trampoline| overrides `CALLBACK_TRAMPOLINE`.
     '''
     p = getattr(struct_obj, name)
+    cfunc_t = p.__class__
+    if trampoline is None:
+        trampoline = CALLBACK_TRAMPOLINE
+
+    if trampoline:
+        if handler_func is None:
+            empty_ret = _empty_callback_return_value(cfunc_t._restype_)
+
+            def empty(*_):
+                return empty_ret
+            setattr(struct_obj, name, cfunc_t(empty))
+        else:
+            factory = _trampoline_factory(
+                cfunc_t, ignore_arg_indices, raw_arg_indices,
+                len(additional_args) > 0, len(additional_kwargs) > 0)
+            setattr(struct_obj, name, cfunc_t(factory(handler_func, additional_args, additional_kwargs)))
+        return
+
     is_first_call = True
 
     # print(f'{str(struct_obj)}.{name} registered.')
@@ -163,11 +572,7 @@ def _register_callback(
             # print(f'{str(struct_obj)}.{name} called.')
 
         if handler_func is None:
-            if p.restype is not None:
-                if p.restype is ctypes.c_void_p:
-                    return None
-                else:
-                    return 0
+            return _empty_callback_return_value(p.restype)
         else:
             call_args = [
                 # Auto dereferencing
@@ -175,80 +580,126 @@ def _register_callback(
                 for i, a in enumerate(args) if i not in ignore_arg_indices
             ]
             ret = handler_func(*call_args, *additional_args, **additional_kwargs)
+            return _callback_return_value(ret)
 
-            if ret is None or isinstance(ret, int):
-                return ret
-            if isinstance(ret, ctypes.Structure):
-                to_check = ret
-            elif isinstance(ret, ctypes._Pointer):
-                to_check = ret.contents
-            else:
-                raise Exception(f'Callback should return only None, int, or cef_base_ref_counted_t-ed struct. The return value {ret} looks wrong.')
-            if hasattr(to_check, 'base') and isinstance(to_check.base, struct.cef_base_ref_counted_t):
-                return ctypes.addressof(ret)  # automatic int conversion. See ReadMe.md.
-            raise Exception('Python GC may remove the return value!')
-
-    cf = p.__class__(cb)
+    cf = cfunc_t(cb)
     setattr(struct_obj, name, cf)
 
 
-def _init_cef_base_ref_counted(o):
+_REF_LOCK = threading.Lock()
+_REF_COUNTS: dict[int, int] = {}
+'''
+Ref counts of `base_ctor()`-ed objects, keyed by the address of `base`.
+'''
+_REF_OWNERS: dict[int, tuple[ty.Any, ty.Callable | None]] = {}
+'''
+`(object, on_released)` of `base_ctor()`-ed objects, keyed by the address of `base`.
+'''
+
+
+def _shared_add_ref(addr: int):
     '''
-    CEF ref count and Python GC are a bit esoteric both.
+    Increment the reference count.
     '''
-    ref_count = 1
-    base: struct.cef_base_ref_counted_t = o.base
-
-    @handler(base)
-    def add_ref():
-        '''
-        Increment the reference count.
-        '''
-        nonlocal ref_count
+    with _REF_LOCK:
+        ref_count = _REF_COUNTS.get(addr, 0)
         if ref_count == 0:
-            print(f'cef-capi-py ERROR: cef_base_ref_counted_t access to released instance. o: {o}')
-        ref_count += 1
+            print(f'cef-capi-py ERROR: cef_base_ref_counted_t access to released instance. address: {addr:#x}')
+        _REF_COUNTS[addr] = ref_count + 1
 
-    @handler(base)
-    def release():
-        '''
-        Decrement the reference count.  Delete this object when no references
-        remain.
-        '''
-        nonlocal ref_count
+
+def _shared_release(addr: int):
+    '''
+    Decrement the reference count.  Delete this object when no references
+    remain.
+    '''
+    with _REF_LOCK:
+        ref_count = _REF_COUNTS.get(addr, 0)
         if ref_count == 0:
-            print(f'cef-capi-py ERROR: cef_base_ref_counted_t underrun. o: {o}')
-        else:
-            ref_count -= 1
-            if ref_count == 0:
-                # print(f'delete {o}')
-                del NON_GC_DEPOT[id(o)]
-        return 1 if ref_count == 0 else 0
-
-    @handler(base)
-    def has_one_ref():
-        '''
-        Returns the current number of references.
-        '''
-        return 1 if ref_count == 1 else 0
+            print(f'cef-capi-py ERROR: cef_base_ref_counted_t underrun. address: {addr:#x}')
+            return 0
+        ref_count -= 1
+        if ref_count > 0:
+            _REF_COUNTS[addr] = ref_count
+            return 0
+        del _REF_COUNTS[addr]
+        owner = _REF_OWNERS.pop(addr, None)
+    if owner is None:  # Revived by `add_ref()` after the release. Already out of the depot.
+        return 1
+    o, on_released = owner
+    # print(f'delete {o}')
+    NON_GC_DEPOT.remove(o)
+    if on_released is not None:
+        on_released(o)
+    return 1
+
+
+def _shared_has_one_ref(addr: int):
+    '''
+    Returns the current number of references.
+    '''
+    return 1 if _REF_COUNTS.get(addr, 0) == 1 else 0
 
-    @handler(base)
-    def has_at_least_one_ref():
-        '''
-        Returns the current number of references.
-        '''
-        return 1 if ref_count > 1 else 0
 
-    NON_GC_DEPOT[id(o)] = o
+def _shared_has_at_least_one_ref(addr: int):
+    '''
+    Returns the current number of references.
+    '''
+    return 1 if _REF_COUNTS.get(addr, 0) > 1 else 0
+
+
+def _shared_ref_count_thunks():
+    '''
+    Makes one set of C-callable ref count functions shared by every `base_ctor()`-ed object.
+    The thunks take `self` as `c_void_p`, so they get the address as int without dereferencing,
+    and are cast to the member function types.
+    '''
+    fields = dict(struct.cef_base_ref_counted_t._fields_)
+    thunks = {}
+    for name, f in (
+            ('add_ref', _shared_add_ref),
+            ('release', _shared_release),
+            ('has_one_ref', _shared_has_one_ref),
+            ('has_at_least_one_ref', _shared_has_at_least_one_ref)):
+        cfunc_t = fields[name]
+        thunk = ctypes.CFUNCTYPE(cfunc_t._restype_, ctypes.c_void_p)(f)
+        thunks[name] = (thunk, ctypes.cast(thunk, cfunc_t))
+    return thunks
+
+
+_REF_COUNT_THUNKS = _shared_ref_count_thunks()
+
+
+def _init_cef_base_ref_counted(o, on_released: ty.Callable | None = None):
+    '''
+    CEF ref count and Python GC are a bit esoteric both.
+
+    |on_released| is called with |o| when the ref count reaches zero.
+    Returns `revive()` which sets the ref count to one again for recycling.
+    '''
+    base: struct.cef_base_ref_counted_t = o.base
+    for name, (_, member) in _REF_COUNT_THUNKS.items():
+        setattr(base, name, member)
+    addr = ctypes.addressof(base)
+
+    def revive():
+        with _REF_LOCK:
+            _REF_COUNTS[addr] = 1
+            _REF_OWNERS[addr] = (o, on_released)
+        NON_GC_DEPOT.add(o)
+
+    revive()
+    return revive
 
 
-def base_ctor(struct_t: type):
+def base_ctor(struct_t: type, on_released: ty.Callable | None = None):
     '''
     Many structs have "base" member. It requires initialization.
+    |on_released| is called with the instance when the ref count reaches zero.
     '''
     o = struct_t()
     o.base.size = ctypes.sizeof(struct_t)
-    _init_cef_base_ref_counted(o)
+    _init_cef_base_ref_counted(o, on_released)
     return o
 
 
@@ -261,6 +712,19 @@ def size_ctor(struct_t: type):
     return _size
 
 
+def _task_ctor(
+        func: ty.Callable, additional_args: tuple = tuple(), additional_kwargs: dict = dict(),
+        on_released: ty.Callable | None = None) -> struct.cef_task_t:
+    '''
+    Constructs `cef_task_t` running |func| with the args. |on_released| is called with the instance
+    when CEF releases it, even without `execute()`.
+    '''
+    task = base_ctor(struct.cef_task_t, on_released)
+    _register_callback(task, 'execute', func,
+                       additional_args=additional_args, additional_kwargs=additional_kwargs)
+    return task
+
+
 def task_factory(func: ty.Callable) -> ty.Callable[..., struct.cef_task_t]:
     '''
     Decorator to make `cef_task_t` ctor.
@@ -271,14 +735,75 @@ def task_factory(func: ty.Callable) -> ty.Callable[..., struct.cef_task_t]:
     You can pass kwargs from ctor to `execute()`.
     '''
     def factory(*additional_args, **additional_kwargs) -> struct.cef_task_t:
-        task = base_ctor(struct.cef_task_t)
-        _register_callback(task, 'execute', func,
-                           additional_args=additional_args, additional_kwargs=additional_kwargs)
-        return task
+        return _task_ctor(func, additional_args, additional_kwargs)
 
     return factory
 
 
+TASK_POOL_SIZE = 64
+'''
+Default upper bound of free `cef_task_t` instances kept by `pooled_task_factory()`.
+'''
+
+
+class _PooledTask:
+    __slots__ = ('func', 'task', 'revive', 'args', 'kwargs')
+
+    def execute(self):
+        args, kwargs = self.args, self.kwargs
+        self.args, self.kwargs = tuple(), dict()
+        self.func(*args, **kwargs)
+
+
+def pooled_task_factory(pool_size: int | None = None):
+    '''
+    Decorator to make `cef_task_t` ctor like `task_factory`, but recycling instances.
+
+    When CEF releases a `cef_task_t` instance, the instance and its thunks go back to a free list,
+    and the next ctor call reuses them with new args. At most |pool_size| free instances are kept
+    (`TASK_POOL_SIZE` by default). Extra instances are left to Python GC.
+
+    Do not touch the instance after posting it.
+    '''
+    size = TASK_POOL_SIZE if pool_size is None else pool_size
+
+    def decorator(func: ty.Callable) -> ty.Callable[..., struct.cef_task_t]:
+        free: list[_PooledTask] = []
+        lock = threading.Lock()
+
+        def new_pooled_task() -> _PooledTask:
+            pt = _PooledTask()
+            pt.func = func
+            task = struct.cef_task_t()
+            task.base.size = ctypes.sizeof(struct.cef_task_t)
+
+            def recycle(_):
+                pt.args, pt.kwargs = tuple(), dict()
+                with lock:
+                    if len(free) < size:
+                        free.append(pt)
+
+            pt.task = task
+            pt.revive = _init_cef_base_ref_counted(task, on_released=recycle)
+            _register_callback(task, 'execute', pt.execute)
+            return pt
+
+        def factory(*additional_args, **additional_kwargs) -> struct.cef_task_t:
+            with lock:
+                pt = free.pop() if len(free) > 0 else None
+            if pt is None:
+                pt = new_pooled_task()
+            else:
+                pt.revive()
+            pt.args = additional_args
+            pt.kwargs = additional_kwargs
+            return pt.task
+
+        return factory
+
+    return decorator
+
+
 def handler(struct_obj: ctypes.Structure, **kwargs):
     '''
     Decorator to register event handler.
@@ -289,9 +814,34 @@ def handler(struct_obj: ctypes.Structure, **kwargs):
 
     Be careful of auto dereferencing of decorated function args.
     To disable auto dereferencing, use |raw_arg_indices|.
+
+    kwarg |trampoline| selects the dispatcher. See `CALLBACK_TRAMPOLINE`.
     '''
     def decorator(func: ty.Callable) -> None:
         _register_callback(struct_obj, func.__name__, func, **kwargs)
         return
 
     return decorator
+
+
+def _attach_resource_request_handler(client: struct.cef_client_t, registers: ty.Sequence[ty.Callable]):
+    '''
+    Registers `get_request_handler` to |client|. CEF takes a ref of every returned handler,
+    so each `get_request_handler` and `get_resource_request_handler` call builds a new one.
+    Each of |registers| registers its callbacks to every `cef_resource_request_handler_t`.
+    '''
+    def resource_request_handler_ctor() -> struct.cef_resource_request_handler_t:
+        resource_request_handler = base_ctor(struct.cef_resource_request_handler_t)
+        for register in registers:
+            register(resource_request_handler)
+        return resource_request_handler
+
+    @handler(client)
+    def get_request_handler(*_):
+        request_handler = base_ctor(struct.cef_request_handler_t)
+
+        @handler(request_handler)
+        def get_resource_request_handler(*_):
+            return resource_request_handler_ctor()
+
+        return request_handler
@@ -0,0 +1,390 @@
+'''
+asyncio integration of CEF.
+
+`cef_run_message_loop()` blocks the thread. With `cef_settings_t.external_message_pump`, CEF instead
+asks for `cef_do_message_loop_work()` calls by `cef_browser_process_handler_t.on_schedule_message_pump_work`,
+and `AsyncMessagePump` schedules them on the asyncio loop at the requested delay. CEF callbacks run
+on the loop thread, so they can resolve futures directly.
+
+    async def main():
+        async with AsyncCef() as cef:
+            browser = await cef.create_browser('https://example.com/')
+            title = await browser.evaluate('document.title')
+            png = await browser.screenshot()
+            await browser.navigate('https://example.org/')
+
+    asyncio.run(main())
+'''
+import asyncio
+import ctypes
+import json
+import math
+import threading
+import typing as ty
+from cef_capi import (
+    base_ctor, struct, header, handler, size_ctor, cef_string_ctor, cef_string_t, decode_cef_string,
+    cef_pointer_to_struct, _decode_or_empty)
+from cef_capi.app_client import app_ctor, settings_main_args_ctor
+from cef_capi.render_farm import encode_png
+
+MAX_PUMP_DELAY_MS = 1000 // 30
+'''
+Upper bound of the delay between `cef_do_message_loop_work()` calls. CEF may not request work for
+some internal tasks, so the pump falls back to this interval, as `cefclient` does.
+'''
+
+
+class AsyncMessagePump:
+    '''
+    Calls `cef_do_message_loop_work()` on asyncio |loop| at the delays requested by CEF.
+    At most one call is pending. An earlier request replaces a later one.
+    '''
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_delay_ms: int = MAX_PUMP_DELAY_MS):
+        self.loop = loop
+        self.max_delay_ms = max_delay_ms
+        self.pumps = 0
+        '''
+        The number of `cef_do_message_loop_work()` calls.
+        '''
+        self._thread_id = threading.get_ident()
+        self._handle: asyncio.TimerHandle | None = None
+        self._due = math.inf
+        self._stopped = False
+
+    def schedule(self, delay_ms: int):
+        '''
+        Requests `cef_do_message_loop_work()` after |delay_ms|. Thread-safe.
+        '''
+        if threading.get_ident() == self._thread_id:
+            self._schedule(delay_ms)
+        else:
+            self.loop.call_soon_threadsafe(self._schedule, delay_ms)
+
+    def stop(self):
+        '''
+        Cancels the pending call. Call it on the loop thread before `cef_shutdown()`.
+        '''
+        self._stopped = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self, delay_ms: int):
+        if self._stopped:
+            return
+        due = self.loop.time() + min(max(delay_ms, 0), self.max_delay_ms) / 1000
+        if self._handle is not None:
+            if self._due <= due:
+                return
+            self._handle.cancel()
+        self._due = due
+        self._handle = self.loop.call_at(due, self._work)
+
+    def _work(self):
+        self._handle = None
+        self._due = math.inf
+        if self._stopped:
+            return
+        header.cef_do_message_loop_work()
+        self.pumps += 1
+        if self._handle is None:
+            self._schedule(self.max_delay_ms)
+
+
+def attach_message_pump(app: struct.cef_app_t, pump: AsyncMessagePump):
+    '''
+    Registers `get_browser_process_handler` to |app|, scheduling |pump| by `on_schedule_message_pump_work`.
+    Set `cef_settings_t.external_message_pump = 1` too.
+    '''
+    @handler(app)
+    def get_browser_process_handler(*_):
+        browser_process_handler = base_ctor(struct.cef_browser_process_handler_t)
+
+        @handler(browser_process_handler)
+        def on_schedule_message_pump_work(delay_ms: int):
+            '''
+            Called from any thread when work has been scheduled for the browser process
+            main (UI) thread.
+            '''
+            pump.schedule(delay_ms)
+
+        return browser_process_handler
+
+
+class AsyncBrowser:
+    '''
+    Windowless browser driven by `AsyncCef`. Make it by `AsyncCef.create_browser()`.
+    '''
+    def __init__(self, cef: 'AsyncCef', viewport_size: tuple[int, int]):
+        self.cef = cef
+        self.viewport_size = viewport_size
+        self.browser: struct.cef_browser_t | None = None
+        loop = cef.loop
+        self._created: asyncio.Future = loop.create_future()
+        self._closed: asyncio.Future = loop.create_future()
+        self._loaded: asyncio.Future = loop.create_future()
+        self._loading_seen = False
+        self._paint_waiters: list[asyncio.Future] = []
+        self._frame = b''
+        self._frame_size = (0, 0)
+        self._dev_tools_results: dict[int, asyncio.Future] = {}
+        self._next_message_id = 1
+        self._observer: struct.cef_dev_tools_message_observer_t | None = None
+        self._registration = 0
+        self.client = self._client_ctor()
+
+    def host(self) -> struct.cef_browser_host_t:
+        if self.browser is None:
+            raise Exception('AsyncBrowser is not created or already closed.')
+        return cef_pointer_to_struct(self.browser.get_host(self.browser), struct.cef_browser_host_t)
+
+    async def wait_loaded(self):
+        '''
+        Waits for the end of the current navigation. Raises if the main frame fails to load.
+        '''
+        await asyncio.shield(self._loaded)
+
+    async def navigate(self, url: str):
+        '''
+        Loads |url| in the main frame and waits for the end of loading.
+        '''
+        if self.browser is None:
+            raise Exception('AsyncBrowser is not created or already closed.')
+        self._expect_load()
+        frame = cef_pointer_to_struct(self.browser.get_main_frame(self.browser), struct.cef_frame_t)
+        frame.load_url(frame, cef_string_ctor(url))
+        await self.wait_loaded()
+
+    async def dev_tools(self, method: str, params: dict | None = None) -> ty.Any:
+        '''
+        Executes DevTools protocol |method| and returns its result as parsed JSON.
+        '''
+        host = self.host()
+        if self._observer is None:
+            self._observer = self._observer_ctor()
+            self._registration = host.add_dev_tools_message_observer(host, self._observer)
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        message = json.dumps({'id': message_id, 'method': method, 'params': params or {}}).encode()
+        future = self.cef.loop.create_future()
+        self._dev_tools_results[message_id] = future
+        if not host.send_dev_tools_message(host, message, len(message)):
+            del self._dev_tools_results[message_id]
+            raise Exception(f'send_dev_tools_message() failed: {method}')
+        return await future
+
+    async def evaluate(self, expression: str) -> ty.Any:
+        '''
+        Evaluates JavaScript |expression| in the main frame and returns its value, awaiting a promise.
+        The value should be JSON serializable.
+        '''
+        r = await self.dev_tools('Runtime.evaluate', {
+            'expression': expression, 'returnByValue': True, 'awaitPromise': True})
+        if 'exceptionDetails' in r:
+            d = r['exceptionDetails']
+            raise Exception(d.get('exception', {}).get('description') or d.get('text'))
+        return r['result'].get('value')
+
+    async def screenshot(self, encoder: ty.Callable[[bytes, int, int], bytes] = encode_png) -> bytes:
+        '''
+        Asks a fresh paint and returns it encoded by |encoder|, `encode_png()` by default.
+        Encoding runs in the default executor.
+        '''
+        waiter = self.cef.loop.create_future()
+        self._paint_waiters.append(waiter)
+        host = self.host()
+        host.invalidate(host, header.PET_VIEW)
+        await waiter
+        width, height = self._frame_size
+        return await self.cef.loop.run_in_executor(None, encoder, self._frame, width, height)
+
+    async def close(self):
+        '''
+        Closes the browser and waits for `on_before_close`.
+        '''
+        if self.browser is not None:
+            host = self.host()
+            host.close_browser(host, 1)
+        await asyncio.shield(self._closed)
+
+    def _expect_load(self):
+        if self._loaded.done():
+            self._loaded = self.cef.loop.create_future()
+        self._loading_seen = False
+
+    def _fail_all(self, e: Exception):
+        for f in [self._created, self._loaded, *self._paint_waiters, *self._dev_tools_results.values()]:
+            if not f.done():
+                f.set_exception(e)
+        self._paint_waiters.clear()
+        self._dev_tools_results.clear()
+
+    def _observer_ctor(self) -> struct.cef_dev_tools_message_observer_t:
+        observer = base_ctor(struct.cef_dev_tools_message_observer_t)
+
+        @handler(observer, ignore_arg_indices={0, 1})
+        def on_dev_tools_method_result(message_id: int, success: int, result: int, result_size: int):
+            future = self._dev_tools_results.pop(message_id, None)
+            if future is None or future.done():
+                return
+            value = json.loads(ctypes.string_at(result, result_size)) if result else {}
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(Exception(f'DevTools error: {value}'))
+
+        return observer
+
+    def _client_ctor(self) -> struct.cef_client_t:
+        '''
+        Returns `cef_client_t` resolving the futures of this browser.
+        '''
+        client = base_ctor(struct.cef_client_t)
+
+        @handler(client)
+        def get_life_span_handler(*_):
+            life_span_handler = base_ctor(struct.cef_life_span_handler_t)
+
+            @handler(life_span_handler)
+            def on_after_created(browser: struct.cef_browser_t):
+                self.browser = browser
+                if not self._created.done():
+                    self._created.set_result(self)
+
+            @handler(life_span_handler)
+            def on_before_close(browser: struct.cef_browser_t):
+                self.browser = None
+                self._fail_all(Exception('AsyncBrowser closed.'))
+                self.cef._browsers.discard(self)
+                if not self._closed.done():
+                    self._closed.set_result(None)
+
+            return life_span_handler
+
+        @handler(client)
+        def get_render_handler(*_):
+            render_handler = base_ctor(struct.cef_render_handler_t)
+
+            @handler(render_handler)
+            def get_view_rect(browser: struct.cef_browser_t, rect: struct.cef_rect_t):
+                rect.x = 0
+                rect.y = 0
+                rect.width, rect.height = self.viewport_size
+                return 1
+
+            @handler(render_handler, ignore_arg_indices={0, 1, 3, 4})
+            def on_paint(element_type: int, buffer: int, width: int, height: int):
+                if element_type != header.PET_VIEW or not self._paint_waiters:
+                    return
+                self._frame = ctypes.string_at(buffer, width * height * 4)
+                self._frame_size = (width, height)
+                waiters, self._paint_waiters = self._paint_waiters, []
+                for f in waiters:
+                    if not f.done():
+                        f.set_result(None)
+
+            return render_handler
+
+        @handler(client)
+        def get_load_handler(*_):
+            load_handler = base_ctor(struct.cef_load_handler_t)
+
+            @handler(load_handler)
+            def on_loading_state_change(
+                    browser: struct.cef_browser_t,
+                    is_loading: int,
+                    can_go_back: int,
+                    can_go_forward: int):
+                if is_loading:
+                    self._loading_seen = True
+                elif self._loading_seen and not self._loaded.done():
+                    self._loaded.set_result(None)
+
+            @handler(load_handler)
+            def on_load_error(
+                    browser: struct.cef_browser_t,
+                    frame: struct.cef_frame_t,
+                    error_code: int,
+                    error_text: cef_string_t,
+                    failed_url: cef_string_t):
+                if not frame.is_main(frame) or error_code == header.ERR_ABORTED or self._loaded.done():
+                    return
+                self._loaded.set_exception(Exception(
+                    f'Failed to load {decode_cef_string(failed_url)}: {error_code} {_decode_or_empty(error_text)}'))
+
+            return load_handler
+
+        return client
+
+
+class AsyncCef:
+    '''
+    Initializes CEF with external message pump on the running asyncio loop, and shuts it down on exit.
+    CEF can initialize only once per process.
+    |settings_hook| can modify `cef_settings_t` before `cef_initialize()`.
+    '''
+    def __init__(
+            self,
+            app: struct.cef_app_t | None = None,
+            settings_hook: ty.Callable[[struct.cef_settings_t], None] | None = None,
+            max_pump_delay_ms: int = MAX_PUMP_DELAY_MS):
+        self.app = app
+        self.settings_hook = settings_hook
+        self.max_pump_delay_ms = max_pump_delay_ms
+        self.loop: asyncio.AbstractEventLoop
+        self.pump: AsyncMessagePump | None = None
+        self._browsers: set[AsyncBrowser] = set()
+
+    async def __aenter__(self) -> 'AsyncCef':
+        self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    def start(self):
+        '''
+        Initializes CEF. Call it in a coroutine on the main thread.
+        '''
+        self.loop = asyncio.get_running_loop()
+        self.pump = AsyncMessagePump(self.loop, self.max_pump_delay_ms)
+        app = self.app if self.app is not None else app_ctor()
+        attach_message_pump(app, self.pump)
+        settings, main_args = settings_main_args_ctor()
+        settings.log_severity = struct.LOGSEVERITY_WARNING
+        settings.no_sandbox = 1
+        settings.windowless_rendering_enabled = 1
+        settings.external_message_pump = 1
+        if self.settings_hook is not None:
+            self.settings_hook(settings)
+        if not header.cef_initialize(main_args, settings, app, None):
+            raise Exception('cef_initialize() failed.')
+        self.pump.schedule(0)
+
+    async def create_browser(self, url: str = 'about:blank', viewport_size: tuple[int, int] = (800, 600)) -> AsyncBrowser:
+        '''
+        Creates a windowless browser and waits for the end of loading |url|.
+        '''
+        b = AsyncBrowser(self, viewport_size)
+        self._browsers.add(b)
+        window_info = struct.cef_window_info_t()
+        window_info.windowless_rendering_enabled = 1
+        window_info.window_name = cef_string_ctor('cef-capi-py asyncio')
+        browser_settings = size_ctor(struct.cef_browser_settings_t)
+        if not header.cef_browser_host_create_browser(
+                window_info, b.client, cef_string_ctor(url), browser_settings, None, None):
+            self._browsers.discard(b)
+            raise Exception('cef_browser_host_create_browser() failed.')
+        await asyncio.shield(b._created)
+        await b.wait_loaded()
+        return b
+
+    async def close(self):
+        '''
+        Closes all browsers, lets CEF finish the pending work, and shuts CEF down.
+        '''
+        await asyncio.gather(*(b.close() for b in list(self._browsers)), return_exceptions=True)
+        await asyncio.sleep(self.max_pump_delay_ms / 1000 * 3)  # A few more pumps for the closing work.
+        if self.pump is not None:
+            self.pump.stop()
+        header.cef_shutdown()
@@ -0,0 +1,196 @@
+'''
+Packed static assets in one file, served from `mmap` by `cef_capi.scheme.SchemeServer`.
+
+    python -m cef_capi.asset_bundle webpage webpage.bundle  # Build.
+
+    server.add_bundle('/', AssetBundle('webpage.bundle'))
+
+The bundle has the assets, their gzip variants if smaller, and an index sorted by path with the MIME type
+(by `cef_get_mime_type()`), the size and the ETag of each asset. Loading maps the file and reads the index only.
+A request is looked up by bisection and its body is copied from the mapping into `data_out` of `read()`.
+Chromium adds `Accept-Encoding` after custom scheme handlers, so CEF pages mostly get the identity body.
+
+Layout, little-endian:
+
+    b'CEFBNDL1', u32 version, u32 count, u64 index offset, u64 index size
+    asset bodies and gzip variants
+    index: per asset, sorted by path: u16 path size, path, u8 MIME type size, MIME type, u8 ETag size, ETag,
+           u64 offset, u64 size, u64 gzip offset, u64 gzip size (0 if none)
+'''
+import os
+import sys
+import gzip
+import mmap
+import bisect
+import ctypes
+import hashlib
+import mimetypes
+import argparse
+import struct as pystruct
+from pathlib import Path
+from cef_capi import header, cef_string_ctor, STRING_CACHE, _decode_cef_string_at, _Pin
+from cef_capi.scheme import Blob
+
+MAGIC = b'CEFBNDL1'
+VERSION = 1
+GZIP_MIN_SIZE = 1024
+'''
+Smaller assets are not compressed.
+'''
+GZIP_MAX_RATIO = .9
+'''
+A gzip variant larger than this ratio of the asset is not kept.
+'''
+
+_HEADER = pystruct.Struct('<8sIIQQ')
+_ENTRY = pystruct.Struct('<QQQQ')
+_COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+                 'application/wasm')
+
+
+def _cef_mime_type(path: str) -> str:
+    '''
+    MIME type by `cef_get_mime_type()` of the extension, or by `mimetypes` if CEF does not know it.
+    '''
+    extension = os.path.splitext(path)[1][1:]
+    if extension:
+        p = header.cef_get_mime_type(cef_string_ctor(extension, cache=STRING_CACHE))
+        addr = ctypes.cast(p, ctypes.c_void_p).value
+        if addr:
+            mime_type = _decode_cef_string_at(addr)  # None if empty.
+            header.cef_string_userfree_utf16_free(p)
+            if mime_type:
+                return mime_type
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def build_bundle(
+        directory: str | Path,
+        output: str | Path,
+        compress: bool = True,
+        gzip_level: int = 9) -> int:
+    '''
+    Packs the files under |directory| into |output| and returns the number of assets.
+    |compress| adds gzip variants of text-like assets. |output| is replaced atomically.
+    '''
+    directory = Path(directory)
+    output = Path(output)
+    tmp = output.with_name(output.name + '.tmp')
+    skip = {os.path.realpath(output), os.path.realpath(tmp)}
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in files:
+            file_path = Path(root) / name
+            if os.path.realpath(file_path) in skip:
+                continue
+            paths.append(('/' + file_path.relative_to(directory).as_posix(), file_path))
+    paths.sort()
+
+    index = []
+    with open(tmp, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        offset = _HEADER.size
+        for path, file_path in paths:
+            data = file_path.read_bytes()
+            mime_type = _cef_mime_type(path)
+            etag = '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+            f.write(data)
+            entry = [path, mime_type, etag, offset, len(data), 0, 0]
+            offset += len(data)
+            if compress and len(data) >= GZIP_MIN_SIZE and mime_type.startswith(_COMPRESSIBLE):
+                compressed = gzip.compress(data, compresslevel=gzip_level, mtime=0)
+                if len(compressed) <= len(data) * GZIP_MAX_RATIO:
+                    f.write(compressed)
+                    entry[5:] = offset, len(compressed)
+                    offset += len(compressed)
+            index.append(entry)
+        chunks = []
+        for path, mime_type, etag, *numbers in index:
+            encoded = path.encode()
+            chunks += [
+                pystruct.pack('<H', len(encoded)), encoded,
+                bytes((len(mime_type),)), mime_type.encode(), bytes((len(etag),)), etag.encode(),
+                _ENTRY.pack(*numbers)]
+        index_bytes = b''.join(chunks)
+        f.write(index_bytes)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(index), offset, len(index_bytes)))
+    os.replace(tmp, output)
+    return len(index)
+
+
+class AssetBundle:
+    '''
+    Read-only mapping of a bundle built by `build_bundle()`. Lookups are safe from any thread.
+    The mapping stays open while the bundle or a served asset lives.
+    '''
+    def __init__(self, path: str | Path):
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, index_offset, index_size = _HEADER.unpack_from(mm)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f'Not an asset bundle of version {VERSION}: {path}')
+        self.path = Path(path)
+        self._pin = _Pin(mm)
+        self.paths: list[str] = []
+        '''
+        Sorted asset paths.
+        '''
+        self._entries: list[tuple[str, str, int, int, int, int]] = []  # (MIME type, ETag, offset, size, gzip...)
+        pos = index_offset
+        end = index_offset + index_size
+        while pos < end:
+            n = pystruct.unpack_from('<H', mm, pos)[0]
+            self.paths.append(mm[pos + 2:pos + 2 + n].decode())
+            pos += 2 + n
+            n = mm[pos]
+            mime_type = mm[pos + 1:pos + 1 + n].decode()
+            pos += 1 + n
+            n = mm[pos]
+            etag = mm[pos + 1:pos + 1 + n].decode()
+            pos += 1 + n
+            self._entries.append((mime_type, etag, *_ENTRY.unpack_from(mm, pos)))
+            pos += _ENTRY.size
+        if len(self.paths) != count:
+            raise Exception(f'Broken asset bundle index: {path}')
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get(self, path: str) -> Blob | None:
+        '''
+        Returns the asset at |path| (e.g. `/index.html`) for `SchemeServer`, or None.
+        '''
+        i = bisect.bisect_left(self.paths, path)
+        if i == len(self.paths) or self.paths[i] != path:
+            return None
+        mime_type, etag, offset, size, gzip_offset, gzip_size = self._entries[i]
+        base = self._pin.address
+        return Blob(
+            self._pin, base + offset, size, mime_type, etag,
+            (base + gzip_offset, gzip_size) if gzip_size else None)
+
+    def data(self, path: str) -> memoryview | None:
+        '''
+        Returns the read-only body of the asset at |path| without copying, or None.
+        '''
+        blob = self.get(path)
+        if blob is None:
+            return None
+        offset = blob.address - self._pin.address
+        return memoryview(self._pin.data)[offset:offset + blob.size]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m cef_capi.asset_bundle', description='Builds an asset bundle.')
+    parser.add_argument('directory')
+    parser.add_argument('output')
+    parser.add_argument('--no-gzip', action='store_true', help='no gzip variants')
+    args = parser.parse_args()
+    count = build_bundle(args.directory, args.output, compress=not args.no_gzip)
+    print(f'{count} assets, {os.path.getsize(args.output)} bytes: {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+'''
+NumPy access to BGRA frames given to `cef_render_handler_t.on_paint`.
+
+`frame_view()` wraps the `on_paint` buffer without copying. The view is valid only inside
+the callback: CEF reuses the buffer after `on_paint` returns. `FrameRing` copies frames which
+must outlive the callback into preallocated buffers, without allocation per frame. `FrameCompositor` keeps
+a persistent frame per browser and copies only the dirty rects of each `on_paint`.
+
+NumPy is optional for cef-capi-py. This module raises on use without NumPy.
+'''
+import ctypes
+import threading
+from dataclasses import dataclass
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+from cef_capi import struct, _PyMemoryView_FromMemory, _PyBUF_READ
+
+
+def _require_numpy():
+    if np is None:
+        raise Exception('cef-capi-py: cef_capi.frame requires numpy.')
+
+
+def _buffer_address(buffer: ctypes.c_void_p | int | None) -> int:
+    '''
+    Returns the address of `on_paint` |buffer|, given as int by ctypes.
+    '''
+    addr = buffer.value if isinstance(buffer, ctypes.c_void_p) else buffer
+    if not addr:
+        raise Exception('NULL pointer.')
+    return addr
+
+
+def frame_view(buffer: ctypes.c_void_p | int, width: int, height: int) -> 'np.ndarray':
+    '''
+    Returns read-only `(height, width, 4)` uint8 BGRA array of `on_paint` |buffer| without copying.
+    Use it only inside `on_paint`.
+    '''
+    _require_numpy()
+    mv = _PyMemoryView_FromMemory(_buffer_address(buffer), width * height * 4, _PyBUF_READ)
+    return np.frombuffer(mv, np.uint8).reshape(height, width, 4)
+
+
+class FrameRing:
+    '''
+    Ring of |size| preallocated `(height, width, 4)` uint8 BGRA frames.
+    `copy()` copies `on_paint` buffer into the next frame by one `memmove()` and returns it.
+    The returned frame is overwritten |size| copies later. Reallocates when the frame size changes.
+    '''
+    def __init__(self, width: int, height: int, size: int = 3):
+        _require_numpy()
+        if size < 1:
+            raise Exception('FrameRing size should be positive.')
+        self.size = size
+        self.latest: np.ndarray | None = None
+        '''
+        The frame of the last `copy()`.
+        '''
+        self.count = 0
+        '''
+        The number of `copy()` calls.
+        '''
+        self._lock = threading.Lock()
+        self._allocate(width, height)
+
+    def _allocate(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self._frames = [np.empty((height, width, 4), np.uint8) for _ in range(self.size)]
+        self._addrs = [f.ctypes.data for f in self._frames]
+        self._next = 0
+        self.latest = None
+
+    def copy(self, buffer: ctypes.c_void_p | int, width: int, height: int) -> 'np.ndarray':
+        '''
+        Copies `on_paint` |buffer| into the next frame and returns it.
+        '''
+        addr = _buffer_address(buffer)
+        with self._lock:
+            if width != self.width or height != self.height:
+                self._allocate(width, height)
+            i = self._next
+            ctypes.memmove(self._addrs[i], addr, width * height * 4)
+            self._next = (i + 1) % self.size
+            frame = self._frames[i]
+            self.latest = frame
+            self.count += 1
+        return frame
+
+
+def _dirty_rects_array(dirty_rects, dirty_rects_count: int) -> 'np.ndarray':
+    '''
+    Returns `(dirty_rects_count, 4)` int32 array of x, y, width, height. |dirty_rects| is
+    `ctypes.POINTER(cef_rect_t)`, the first `cef_rect_t`, or a sequence of (x, y, width, height).
+    '''
+    if dirty_rects_count <= 0:
+        return np.empty((0, 4), np.int32)
+    if isinstance(dirty_rects, ctypes._Pointer):
+        addr = ctypes.cast(dirty_rects, ctypes.c_void_p).value
+    elif isinstance(dirty_rects, struct.cef_rect_t):
+        addr = ctypes.addressof(dirty_rects)  # Dereferenced by `@handler()`. The rest follow it.
+    else:
+        return np.array(dirty_rects, np.int32).reshape(-1, 4)[:dirty_rects_count]
+    if not addr:
+        raise Exception('NULL pointer.')
+    mv = _PyMemoryView_FromMemory(addr, dirty_rects_count * ctypes.sizeof(struct.cef_rect_t), _PyBUF_READ)
+    return np.frombuffer(mv, np.int32).reshape(dirty_rects_count, 4)
+
+
+@dataclass(frozen=True)
+class FrameUpdate:
+    '''
+    Result of `FrameCompositor.paint()`.
+    |frame| is the persistent frame of the browser, updated in place by later paints.
+    |rects| are the copied rects clipped to the frame, `(n, 4)` int32 array of x, y, width, height.
+    |full| is True if the whole frame was copied: the first paint or a resize.
+    |count| is the number of paints of the browser including this one.
+    '''
+    browser_id: int
+    frame: 'np.ndarray'
+    rects: 'np.ndarray'
+    full: bool
+    count: int
+
+    def tile_mask(self, tile_size: int = 64) -> 'np.ndarray':
+        '''
+        Returns `(ceil(height / tile_size), ceil(width / tile_size))` bool array, True for changed tiles.
+        '''
+        h, w = self.frame.shape[:2]
+        mask = np.zeros((-(-h // tile_size), -(-w // tile_size)), np.bool_)
+        for x, y, rw, rh in self.rects.tolist():
+            mask[y // tile_size:-(-(y + rh) // tile_size), x // tile_size:-(-(x + rw) // tile_size)] = True
+        return mask
+
+    def changed_tiles(self, tile_size: int = 64) -> list[tuple[int, int, int, int]]:
+        '''
+        Returns changed tiles as (x, y, width, height) list, clipped to the frame.
+        '''
+        h, w = self.frame.shape[:2]
+        ys, xs = np.nonzero(self.tile_mask(tile_size))
+        return [
+            (x, y, min(tile_size, w - x), min(tile_size, h - y))
+            for x, y in zip((xs * tile_size).tolist(), (ys * tile_size).tolist())]
+
+    def change_mask(self) -> 'np.ndarray':
+        '''
+        Returns `(height, width)` bool array, True for pixels in the copied rects.
+        '''
+        mask = np.zeros(self.frame.shape[:2], np.bool_)
+        for x, y, rw, rh in self.rects.tolist():
+            mask[y:y + rh, x:x + rw] = True
+        return mask
+
+
+class FrameCompositor:
+    '''
+    Keeps a persistent `(height, width, 4)` BGRA frame per browser, and copies only the dirty rects
+    of `on_paint` buffer into it. Call `paint()` inside `on_paint`, and `release()` in `on_before_close`.
+    Give `raw_arg_indices={4}` to `@handler()` of `on_paint` to get all of |dirty_rects| as pointer.
+    '''
+    def __init__(self):
+        _require_numpy()
+        self._lock = threading.Lock()
+        self._frames: dict[int, np.ndarray] = {}
+        self._counts: dict[int, int] = {}
+
+    def paint(
+            self,
+            browser_id: int,
+            buffer: ctypes.c_void_p | int,
+            width: int,
+            height: int,
+            dirty_rects_count: int,
+            dirty_rects) -> FrameUpdate:
+        '''
+        Copies the dirty rects of `on_paint` |buffer| into the frame of |browser_id|,
+        typically `browser.get_identifier(browser)`.
+        '''
+        src = frame_view(buffer, width, height)
+        rects = _dirty_rects_array(dirty_rects, dirty_rects_count)
+        with self._lock:
+            frame = self._frames.get(browser_id)
+            full = frame is None or frame.shape[0] != height or frame.shape[1] != width
+            if full:
+                frame = np.empty((height, width, 4), np.uint8)
+                self._frames[browser_id] = frame
+                np.copyto(frame, src)
+                rects = np.array([[0, 0, width, height]], np.int32)
+            else:
+                clipped = []
+                for x, y, rw, rh in rects.tolist():  # A few rects. Plain ints are faster than vectorizing.
+                    x0, y0 = min(max(x, 0), width), min(max(y, 0), height)
+                    x1, y1 = min(max(x + rw, 0), width), min(max(y + rh, 0), height)
+                    if x1 > x0 and y1 > y0:
+                        frame[y0:y1, x0:x1] = src[y0:y1, x0:x1]
+                        clipped.append((x0, y0, x1 - x0, y1 - y0))
+                rects = np.array(clipped, np.int32).reshape(-1, 4)
+            count = self._counts.get(browser_id, 0) + 1
+            self._counts[browser_id] = count
+        return FrameUpdate(browser_id, frame, rects, full, count)
+
+    def frame(self, browser_id: int) -> 'np.ndarray | None':
+        '''
+        Returns the persistent frame of |browser_id|, or None before the first paint.
+        '''
+        return self._frames.get(browser_id)
+
+    def release(self, browser_id: int):
+        '''
+        Drops the frame of |browser_id|.
+        '''
+        with self._lock:
+            self._frames.pop(browser_id, None)
+            self._counts.pop(browser_id, None)
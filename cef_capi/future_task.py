@@ -0,0 +1,174 @@
+'''
+`post_task()`: posts a function to a CEF thread and returns `concurrent.futures.Future` of its result.
+
+`header.cef_post_task(TID_UI, task())` is fire-and-forget. `post_task()` delivers the return value
+or the exception across threads, supports cancellation before the function starts, and fails the
+future by `TimeoutError` after |timeout|. If CEF discards the task without running it
+(e.g. the message loop has quit), the future fails too.
+
+    future = post_task(header.TID_UI, browser_host.get_zoom_level, browser_host)
+    zoom = future.result(timeout=1.)
+
+    zoom = await post_task_async(header.TID_UI, browser_host.get_zoom_level, browser_host)
+'''
+import time
+import heapq
+import asyncio
+import ctypes
+import threading
+import typing as ty
+from concurrent.futures import Future
+from cef_capi import struct, header, cef_pointer_to_struct, _task_ctor
+
+
+class _Deadlines:
+    '''
+    One daemon thread calling `time_out()` of objects at their deadlines.
+    `add()` returns the heap entry. `discard()` it when the object finishes before the deadline.
+    Discarded entries are skipped, and dropped when they are the majority of the heap.
+    '''
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap: list[list] = []  # [deadline, seq, object or None]
+        self._discarded = 0
+        self._seq = 0
+        self._thread: threading.Thread | None = None
+
+    def add(self, deadline: float, o) -> list:
+        with self._cond:
+            entry = [deadline, self._seq, o]
+            self._seq += 1
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._main, name='cef-capi-task-deadline', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return entry
+
+    def discard(self, entry: list):
+        with self._cond:
+            if entry[2] is None:
+                return  # Timed out or discarded already.
+            entry[2] = None
+            self._discarded += 1
+            if self._discarded > 64 and self._discarded * 2 > len(self._heap):
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapq.heapify(self._heap)
+                self._discarded = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap) - self._discarded
+
+    def _main(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                entry = self._heap[0]
+                if entry[2] is None:
+                    heapq.heappop(self._heap)
+                    self._discarded -= 1
+                    continue
+                remaining = entry[0] - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                heapq.heappop(self._heap)
+                o, entry[2] = entry[2], None
+            o.time_out()
+
+
+_DEADLINES = _Deadlines()
+
+
+class _FutureTask:
+    '''
+    Resolves |future| by |func|. |task| is `cef_task_t` running it.
+    '''
+    __slots__ = ('func', 'args', 'kwargs', 'future', 'lock', 'task')
+
+    def __init__(self, func: ty.Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.lock = threading.Lock()
+        self.task = _task_ctor(self.execute, on_released=self.released)
+
+    def execute(self):
+        with self.lock:
+            if self.future.done() or not self.future.set_running_or_notify_cancel():
+                return  # Timed out or cancelled.
+        args, kwargs = self.args, self.kwargs
+        self.args, self.kwargs = tuple(), dict()
+        try:
+            ret = self.func(*args, **kwargs)
+        except BaseException as e:
+            self._resolve(None, e)
+        else:
+            self._resolve(ret, None)
+
+    def released(self, _):
+        self.args, self.kwargs = tuple(), dict()
+        self._resolve(None, Exception('The task was discarded by CEF without execution.'))
+
+    def time_out(self):
+        self._resolve(None, TimeoutError('The task timed out.'))
+
+    def _resolve(self, ret, e: BaseException | None):
+        with self.lock:
+            if self.future.done():
+                return
+            if not self.future.running() and not self.future.set_running_or_notify_cancel():
+                return  # Cancelled.
+            if e is None:
+                self.future.set_result(ret)
+            else:
+                self.future.set_exception(e)
+
+
+def post_task(
+        target: int | struct.cef_task_runner_t | ctypes._Pointer,
+        func: ty.Callable,
+        *args,
+        delay_ms: int = 0,
+        timeout: float | None = None,
+        **kwargs) -> Future:
+    '''
+    Runs `func(*args, **kwargs)` on |target| thread and returns `Future` of the result.
+    |target| is `cef_thread_id_t` (e.g. `header.TID_UI`) or `cef_task_runner_t` (or its pointer).
+    |delay_ms| delays the start. |timeout| seconds from now fail the future by `TimeoutError`,
+    though a running function is not interrupted. `Future.cancel()` works until the function starts.
+    '''
+    ft = _FutureTask(func, args, kwargs)
+    if isinstance(target, int):
+        if delay_ms > 0:
+            posted = header.cef_post_delayed_task(target, ft.task, delay_ms)
+        else:
+            posted = header.cef_post_task(target, ft.task)
+    else:
+        runner = cef_pointer_to_struct(target, struct.cef_task_runner_t)
+        if delay_ms > 0:
+            posted = runner.post_delayed_task(runner, ft.task, delay_ms)
+        else:
+            posted = runner.post_task(runner, ft.task)
+    if not posted:
+        ft._resolve(None, Exception('Failed to post the task.'))
+    elif timeout is not None:
+        entry = _DEADLINES.add(time.monotonic() + timeout, ft)
+        ft.future.add_done_callback(lambda _: _DEADLINES.discard(entry))
+    return ft.future
+
+
+def post_task_async(
+        target: int | struct.cef_task_runner_t | ctypes._Pointer,
+        func: ty.Callable,
+        *args,
+        delay_ms: int = 0,
+        timeout: float | None = None,
+        **kwargs) -> asyncio.Future:
+    '''
+    `post_task()` returning asyncio future of the running loop. Cancelling it cancels the task if not started.
+    '''
+    return asyncio.wrap_future(post_task(target, func, *args, delay_ms=delay_ms, timeout=timeout, **kwargs))
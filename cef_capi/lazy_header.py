@@ -0,0 +1,223 @@
+'''
+Lazy loader of the generated `header.py`.
+
+Only the preamble (imports, `Structure`, `_libraries`) runs at import time.
+Every other top-level statement is indexed by the name it defines
+(`class X(...)`, `X = ...`) or configures (`X._fields_ = ...`, `X.argtypes = ...`),
+and runs the first time the name is accessed. Names referred to by the running
+statement resolve transitively through `_LazyNamespace.__missing__()`.
+
+Compiling `header.py` costs far more than running it, so the index holds the compiled code
+of each statement, and is cached next to the bytecode of `header.py` as `header.*.lazy`.
+The cache is keyed by the size and mtime of `header.py` and the bytecode magic number,
+and is not written with `sys.dont_write_bytecode` like `.pyc`.
+'''
+import os
+import ast
+import sys
+import marshal
+import importlib
+import importlib.util
+import threading
+import types
+from pathlib import Path
+
+
+class _LazyNamespace(dict):
+    '''
+    Globals of the lazy header. Missing names are materialized from the index.
+    |index| maps a name to the marshaled code of its statements.
+    '''
+    def __init__(self, index: dict[str, list[bytes]]):
+        super().__init__()
+        self.index = index
+        self.lock = threading.RLock()
+
+    def __missing__(self, name: str):
+        with self.lock:
+            if dict.__contains__(self, name):  # Materialized by another thread.
+                return dict.__getitem__(self, name)
+            statements = self.index.pop(name, None)
+            if statements is None:
+                raise KeyError(name)
+            for data in statements:
+                code = marshal.loads(data)
+                # Class bodies look up globals without `__missing__()`. Resolve names beforehand.
+                for n in _referred_names(code):
+                    if n in self.index:
+                        self[n]
+                exec(code, self)
+            return dict.__getitem__(self, name)
+
+
+def _referred_names(code: types.CodeType) -> set[str]:
+    '''
+    Returns the names referred to by |code| and its nested code (class bodies).
+    '''
+    names = set(code.co_names)
+    for c in code.co_consts:
+        if isinstance(c, types.CodeType):
+            names |= _referred_names(c)
+    return names
+
+
+def _defined_name(node: ast.stmt) -> str | None:
+    '''
+    Returns the name |node| defines or configures.
+    '''
+    if isinstance(node, ast.ClassDef):
+        return node.name
+    if isinstance(node, ast.Assign) and len(node.targets) == 1:
+        target = node.targets[0]
+        if isinstance(target, ast.Attribute):
+            target = target.value
+        if isinstance(target, ast.Name):
+            return target.id
+    return None
+
+
+def _is_preamble_end(node: ast.stmt) -> bool:
+    '''
+    Returns whether |node| is `_libraries['FIXME_STUB'] = ...`, the last statement of the preamble.
+    '''
+    if not isinstance(node, ast.Assign):
+        return False
+    target = node.targets[0]
+    return (
+        isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name)
+        and target.value.id == '_libraries')
+
+
+def _compile_index(source: str, filename: str) -> tuple[bytes, dict[str, list[bytes]]]:
+    '''
+    Compiles |source| of `header.py` into the marshaled preamble and the index of statements.
+    '''
+    body = ast.parse(source, filename).body
+    for i, node in enumerate(body):
+        if _is_preamble_end(node):
+            break
+    else:
+        raise Exception('cef-capi-py: header.py has no FIXME_STUB library.')
+    preamble = marshal.dumps(compile(ast.Module(body[:i + 1], []), filename, 'exec'))
+    index: dict[str, list[bytes]] = {}
+    for node in body[i + 1:]:
+        name = _defined_name(node)
+        if name is None:
+            raise Exception(f'cef-capi-py: unexpected statement in header line {node.lineno}: {ast.unparse(node)}')
+        index.setdefault(name, []).append(marshal.dumps(compile(ast.Module([node], []), filename, 'exec')))
+    return preamble, index
+
+
+def header_path(package: str) -> Path:
+    '''
+    Returns the path of `header.py` of |package|.
+    '''
+    return Path(__file__).parent / package.split('.')[-1] / 'header.py'
+
+
+def cache_path(path: Path) -> Path:
+    '''
+    Returns the path of the index cache of |path|, `__pycache__/header.{cache_tag}.lazy`.
+    '''
+    return Path(importlib.util.cache_from_source(str(path))).with_suffix('.lazy')
+
+
+def load_index(path: Path) -> tuple[bytes, dict[str, list[bytes]]]:
+    '''
+    Returns the marshaled preamble and the index of statements of `header.py` at |path|,
+    from the cache if it is up to date.
+    '''
+    st = path.stat()
+    key = (importlib.util.MAGIC_NUMBER, st.st_size, st.st_mtime_ns)
+    cache = cache_path(path)
+    try:
+        cached_key, preamble, index = marshal.loads(cache.read_bytes())
+        if cached_key == key:
+            return preamble, index
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+    preamble, index = _compile_index(path.read_text(encoding='utf-8'), str(path))
+    if not sys.dont_write_bytecode:
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache.with_name(f'{cache.name}.{os.getpid()}')
+            tmp.write_bytes(marshal.dumps((key, preamble, index)))
+            os.replace(tmp, cache)
+        except OSError:  # Read-only install. Compiles again next time, as importing `.py` without `.pyc`.
+            pass
+    return preamble, index
+
+
+def _struct_module(package: str, header: types.ModuleType) -> types.ModuleType:
+    '''
+    Returns a lazy module of `{package}.struct`, which is `from {package}.header import *`.
+    '''
+    name = f'{package}.struct'
+    module = types.ModuleType(name)
+    module.__file__ = str(Path(header.__file__).with_name('struct.py'))
+    exported: set[str] = set()
+
+    def __getattr__(attr: str):
+        if attr == '__all__':
+            return header.__all__
+        if not exported:
+            exported.update(header.__all__)
+        if attr not in exported:
+            raise AttributeError(f"module '{name}' has no attribute '{attr}'")
+        v = getattr(header, attr)
+        setattr(module, attr, v)
+        return v
+
+    def __dir__():
+        return sorted(header.__all__)
+
+    module.__getattr__ = __getattr__  # type: ignore
+    module.__dir__ = __dir__  # type: ignore
+    return module
+
+
+def install(package: str, header: types.ModuleType, struct: types.ModuleType):
+    '''
+    Registers |header| as `{package}.header` and |struct| as `{package}.struct`.
+    '''
+    sys.modules[f'{package}.header'] = header
+    sys.modules[f'{package}.struct'] = struct
+    parent = importlib.import_module(package)
+    parent.header = header  # type: ignore
+    parent.struct = struct  # type: ignore
+
+
+def load(package: str) -> tuple[types.ModuleType, types.ModuleType]:
+    '''
+    Returns lazy modules of `{package}.header` and `{package}.struct`, registered in `sys.modules`.
+    '''
+    path = header_path(package)
+    preamble, index = load_index(path)
+
+    name = f'{package}.header'
+    module = types.ModuleType(name)
+    module.__file__ = str(path)
+    ns = _LazyNamespace(index)
+    ns['__name__'] = name
+    ns['__file__'] = str(path)
+    exec(marshal.loads(preamble), ns)
+
+    def __getattr__(attr: str):
+        if attr.startswith('__') and attr != '__all__':
+            raise AttributeError(attr)
+        try:
+            with ns.lock:  # Waits for another thread materializing |attr|.
+                v = ns[attr]
+        except KeyError:
+            raise AttributeError(f"module '{name}' has no attribute '{attr}'") from None
+        setattr(module, attr, v)
+        return v
+
+    def __dir__():
+        return sorted(set(ns.keys()) | set(ns.index.keys()))
+
+    module.__getattr__ = __getattr__  # type: ignore
+    module.__dir__ = __dir__  # type: ignore
+    struct = _struct_module(package, module)
+    install(package, module, struct)
+    return module, struct
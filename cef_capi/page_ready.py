@@ -0,0 +1,289 @@
+'''
+Event-driven "page ready" detection, instead of fixed delays before capturing.
+
+`PageReadyDetector` combines these signals of a browser:
+
+- The end of loading by `cef_load_handler_t.on_loading_state_change`.
+- Network idle: no more than |max_inflight| requests, tracked by `cef_resource_request_handler_t`,
+  for |network_idle_time|.
+- Visual stability: a paint, and no `on_paint` for |stability_window| after both it and the end of loading.
+  The view is invalidated at the end of loading for a fresh paint: a page painted before may not paint again.
+- Optionally, a JS-side signal: `console.log(SIGNAL_MESSAGE)` (or |signal_message|) from the page.
+
+The page is ready as soon as all of them hold. The check runs on UI thread exactly when the pending
+windows expire, not by fixed polling.
+
+    detector = PageReadyDetector(on_ready=lambda timings: header.cef_post_task(header.TID_UI, capture()))
+    detector.attach(client)  # Load, request and display handlers.
+    ...
+    def on_paint(...):
+        ...copy the buffer...
+        detector.paint()
+'''
+import math
+import time
+import threading
+import typing as ty
+from concurrent.futures import Future
+from dataclasses import dataclass
+from cef_capi import base_ctor, struct, header, handler, cef_string_t, cef_pointer_to_struct, pooled_task_factory, \
+    _decode_or_empty
+
+SIGNAL_MESSAGE = '__cef_capi_page_ready__'
+
+
+@dataclass(frozen=True)
+class PageReadyTimings:
+    '''
+    Seconds from `PageReadyDetector.start()` to each phase. None if the phase did not happen.
+    '''
+    load_end: float | None
+    first_paint: float | None
+    last_paint: float | None
+    network_idle: float | None
+    signal: float | None
+    ready: float
+    timed_out: bool
+    paints: int
+    requests: int
+
+
+class PageReadyDetector:
+    '''
+    Fires |on_ready| with `PageReadyTimings` on UI thread when the page is visually stable.
+    `future` gives the same timings. Call `start()` before each navigation but the first.
+
+    |stability_window| is seconds without `on_paint` to consider the page visually stable.
+    |network_idle_time| is seconds with at most |max_inflight| requests. None disables network tracking.
+    |wait_for_signal| requires `console.log(signal_message)` from the page.
+    |timeout| fires |on_ready| with `timed_out=True`.
+    '''
+    def __init__(
+            self,
+            on_ready: ty.Callable[[PageReadyTimings], None] | None = None,
+            stability_window: float = .1,
+            network_idle_time: float | None = .1,
+            max_inflight: int = 0,
+            wait_for_signal: bool = False,
+            signal_message: str = SIGNAL_MESSAGE,
+            timeout: float = 30.):
+        self.on_ready = on_ready
+        self.stability_window = stability_window
+        self.network_idle_time = network_idle_time
+        self.max_inflight = max_inflight
+        self.wait_for_signal = wait_for_signal
+        self.signal_message = signal_message
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+        @pooled_task_factory()
+        def check():
+            self._check()
+
+        self._check_task = check
+        self._reset()
+
+    def start(self):
+        '''
+        Resets the state for a new navigation. Call it before `load_url()`.
+        '''
+        self._reset()
+        self._schedule_check(self.timeout)
+
+    def _reset(self):
+        with self._lock:
+            self.future: Future = Future()
+            self._started_at = time.monotonic()
+            self._check_due = math.inf  # A check of the former navigation must not hold back the first one.
+            self._loading_seen = False
+            self._load_end: float | None = None
+            self._first_paint: float | None = None
+            self._last_paint: float | None = None
+            self._inflight: set[int] = set()
+            self._requests = 0
+            self._paints = 0
+            self._network_changed_at = self._started_at
+            self._network_idle: float | None = None
+            self._signal: float | None = None
+
+    def loading_state_change(self, is_loading: bool, browser: struct.cef_browser_t | None = None):
+        '''
+        Call it from `on_loading_state_change` unless `attach()`-ed.
+        |browser| is invalidated at the end of loading, to paint the loaded page.
+        '''
+        load_end = False
+        with self._lock:
+            if is_loading:
+                self._loading_seen = True
+            elif self._loading_seen and self._load_end is None:
+                self._load_end = time.monotonic()
+                load_end = True
+        if load_end and browser is not None:
+            host = cef_pointer_to_struct(browser.get_host(browser), struct.cef_browser_host_t)
+            host.invalidate(host, header.PET_VIEW)
+        self._schedule_check(self.timeout if is_loading else 0.)
+
+    def paint(self):
+        '''
+        Call it from `on_paint` of `PET_VIEW`.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            if self._first_paint is None:
+                self._first_paint = now
+            self._last_paint = now
+            self._paints += 1
+        self._schedule_check(self.stability_window)
+
+    def request_start(self, request_id: int):
+        '''
+        Call it when a request starts, e.g. in `get_resource_request_handler`, unless `attach()`-ed.
+        '''
+        with self._lock:
+            self._inflight.add(request_id)
+            self._requests += 1
+            self._network_changed_at = time.monotonic()
+
+    def request_complete(self, request_id: int):
+        '''
+        Call it from `on_resource_load_complete` unless `attach()`-ed.
+        '''
+        with self._lock:
+            if request_id not in self._inflight:
+                return  # A request of the former navigation.
+            self._inflight.discard(request_id)
+            self._network_changed_at = time.monotonic()
+        if self.network_idle_time is not None:
+            self._schedule_check(self.network_idle_time)
+
+    def signal(self):
+        '''
+        Marks the JS-side signal. `attach()` calls it by `console.log(signal_message)`.
+        '''
+        with self._lock:
+            if self._signal is None:
+                self._signal = time.monotonic()
+        self._schedule_check(0.)
+
+    def _schedule_check(self, delay: float):
+        '''
+        Posts a check after |delay| seconds unless an earlier one is pending. |delay| is capped by the timeout.
+        '''
+        with self._lock:
+            if self.future.done():
+                return
+            delay = min(delay, self._started_at + self.timeout - time.monotonic())
+            due = time.monotonic() + delay
+            if due >= self._check_due:
+                return
+            self._check_due = due
+        header.cef_post_delayed_task(header.TID_UI, self._check_task(), max(0, int(delay * 1000) + 1))
+
+    def _check(self):
+        '''
+        Fires if ready. Otherwise schedules the next check when the pending window expires.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            self._check_due = math.inf  # A later check, if any, runs as well. It is harmless.
+            if self.future.done():
+                return
+            waits = []
+            ready = self._load_end is not None
+            if self.network_idle_time is not None:
+                if len(self._inflight) <= self.max_inflight:
+                    idle_for = now - self._network_changed_at
+                    if idle_for >= self.network_idle_time:
+                        if self._network_idle is None:
+                            self._network_idle = self._network_changed_at + self.network_idle_time
+                    else:
+                        ready = False
+                        waits.append(self.network_idle_time - idle_for)
+                else:
+                    ready = False
+                    self._network_idle = None
+            if self._last_paint is None or self._load_end is None:
+                ready = False  # Waits for `paint()` or `loading_state_change()`.
+            else:
+                # A paint before the end of loading counts: a static page may not paint again.
+                quiet_for = now - max(self._last_paint, self._load_end)
+                if quiet_for < self.stability_window:
+                    ready = False
+                    waits.append(self.stability_window - quiet_for)
+            if self.wait_for_signal and self._signal is None:
+                ready = False
+            timed_out = not ready and now - self._started_at >= self.timeout
+            if not ready and not timed_out:
+                waits.append(self.timeout - (now - self._started_at))
+            else:
+                timings = self._timings(now, timed_out)
+        if ready or timed_out:
+            self.future.set_result(timings)
+            if self.on_ready is not None:
+                self.on_ready(timings)
+        else:
+            self._schedule_check(min(waits))
+
+    def _timings(self, now: float, timed_out: bool) -> PageReadyTimings:
+        def since(t: float | None) -> float | None:
+            return None if t is None else t - self._started_at
+
+        return PageReadyTimings(
+            load_end=since(self._load_end),
+            first_paint=since(self._first_paint),
+            last_paint=since(self._last_paint),
+            network_idle=since(self._network_idle),
+            signal=since(self._signal),
+            ready=now - self._started_at,
+            timed_out=timed_out,
+            paints=self._paints,
+            requests=self._requests)
+
+    def attach(self, client: struct.cef_client_t):
+        '''
+        Registers `get_load_handler`, `get_request_handler` and `get_display_handler` to |client|,
+        feeding this detector. `on_paint` is yours: call `paint()` from it.
+        '''
+        detector = self
+
+        def resource_request_handler_ctor() -> struct.cef_resource_request_handler_t:
+            resource_request_handler = base_ctor(struct.cef_resource_request_handler_t)
+
+            @handler(resource_request_handler, ignore_arg_indices={0, 1, 2, 4, 5, 6})
+            def on_resource_load_complete(request: struct.cef_request_t):
+                detector.request_complete(request.get_identifier(request))
+
+            return resource_request_handler
+
+        @handler(client)
+        def get_load_handler(*_):
+            load_handler = base_ctor(struct.cef_load_handler_t)
+
+            @handler(load_handler, ignore_arg_indices={0, 3, 4})
+            def on_loading_state_change(browser: struct.cef_browser_t, is_loading: int):
+                detector.loading_state_change(bool(is_loading), browser)
+
+            return load_handler
+
+        @handler(client)
+        def get_request_handler(*_):
+            request_handler = base_ctor(struct.cef_request_handler_t)
+
+            @handler(request_handler, ignore_arg_indices={0, 1, 2, 4, 5, 6, 7})
+            def get_resource_request_handler(request: struct.cef_request_t):
+                detector.request_start(request.get_identifier(request))
+                return resource_request_handler_ctor()
+
+            return request_handler
+
+        @handler(client)
+        def get_display_handler(*_):
+            display_handler = base_ctor(struct.cef_display_handler_t)
+
+            @handler(display_handler, ignore_arg_indices={0, 1, 2, 4, 5})
+            def on_console_message(message: cef_string_t):
+                if _decode_or_empty(message) == detector.signal_message:
+                    detector.signal()
+                return 0
+
+            return display_handler
@@ -0,0 +1,487 @@
+'''
+Typed messaging between browser and renderer processes by `cef_process_message_t`.
+
+    channel = MessageChannel()
+
+    @channel.on('sum')  # In the receiving process.
+    def handle_sum(frame, payload):
+        return sum(payload)
+
+    channel.attach_client(client)  # Browser process. `attach_render_process_handler()` in renderer.
+    future = channel.request(frame, header.PID_RENDERER, 'sum', [1, 2, 3])  # Future of 6.
+
+A small payload goes as typed `cef_list_value_t` / `cef_dictionary_value_t` values, readable by any CEF code.
+A payload of |shared_memory_threshold| bytes or more is packed and copied once into a shared memory region
+by `cef_shared_process_message_builder_t`, instead of IPC serialization of the values.
+Payloads are `dict` (str keys) / `list` / `tuple` / `str` / `int` / `float` / `bool` / `None` / `bytes`.
+
+Python handlers in renderer process require `app_ctor(single_process=True)`. In multi-process mode,
+`app_ctor()` sets `browser_subprocess_path` to the prebuilt cefsimple / cefclient, which run no Python,
+so only the browser side of a channel works there.
+'''
+import time
+import ctypes
+import struct as pystruct
+import threading
+import itertools
+import typing as ty
+from concurrent.futures import Future
+from cef_capi import struct, header, handler, cef_string_ctor, STRING_CACHE, cef_string_t, decode_cef_string_list, \
+    cef_pointer_to_struct, _PyMemoryView_FromMemory, _PyBUF_READ, _BufferExport, _decode_userfree, _INT32_MIN, _INT32_MAX
+from cef_capi.future_task import _DEADLINES
+
+SHARED_MEMORY_THRESHOLD = 64 * 1024
+
+_EVENT = 0
+_REQUEST = 1
+_RESPONSE = 2
+_ERROR = 3
+_PACKED = 0x100  # Flag of the kind: the payload is a packed binary value.
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+_U32 = pystruct.Struct('<I')
+_U64 = pystruct.Struct('<Q')
+_I64 = pystruct.Struct('<q')
+_F64 = pystruct.Struct('<d')
+
+
+def _pack(o, out: list):
+    '''
+    Appends the packed chunks of |o| to |out|. Large `bytes` are appended as is, without copying.
+    '''
+    t = type(o)
+    if o is None:
+        out.append(b'N')
+    elif t is bool:
+        out.append(b'T' if o else b'F')
+    elif isinstance(o, int):
+        if _INT64_MIN <= o <= _INT64_MAX:
+            out.append(b'i' + _I64.pack(o))
+        else:
+            b = str(o).encode()
+            out.append(b'I' + _U32.pack(len(b)))
+            out.append(b)
+    elif isinstance(o, float):
+        out.append(b'd' + _F64.pack(o))
+    elif isinstance(o, str):
+        b = o.encode()
+        out.append(b's' + _U32.pack(len(b)))
+        out.append(b)
+    elif isinstance(o, (bytes, bytearray, memoryview)):
+        out.append(b'b' + _U64.pack(_nbytes(o)))
+        out.append(o)
+    elif isinstance(o, (list, tuple)):
+        out.append(b'l' + _U32.pack(len(o)))
+        for v in o:
+            _pack(v, out)
+    elif isinstance(o, dict):
+        out.append(b'm' + _U32.pack(len(o)))
+        for k, v in o.items():
+            _pack(str(k), out)
+            _pack(v, out)
+    else:
+        raise Exception(f'Cannot send {t.__name__} in process message.')
+
+
+def _nbytes(b: bytes | bytearray | memoryview) -> int:
+    return b.nbytes if isinstance(b, memoryview) else len(b)
+
+
+def _unpack(mv: memoryview, offset: int = 0) -> tuple[ty.Any, int]:
+    '''
+    Returns the object packed at |offset| of |mv| and the offset after it. `bytes` and str are copied out.
+    '''
+    tag = mv[offset]
+    offset += 1
+    match tag:
+        case 0x4e:  # N
+            return None, offset
+        case 0x54:  # T
+            return True, offset
+        case 0x46:  # F
+            return False, offset
+        case 0x69:  # i
+            return _I64.unpack_from(mv, offset)[0], offset + 8
+        case 0x49:  # I
+            n = _U32.unpack_from(mv, offset)[0]
+            offset += 4
+            return int(bytes(mv[offset:offset + n])), offset + n
+        case 0x64:  # d
+            return _F64.unpack_from(mv, offset)[0], offset + 8
+        case 0x73:  # s
+            n = _U32.unpack_from(mv, offset)[0]
+            offset += 4
+            return str(mv[offset:offset + n], 'utf-8'), offset + n
+        case 0x62:  # b
+            n = _U64.unpack_from(mv, offset)[0]
+            offset += 8
+            return bytes(mv[offset:offset + n]), offset + n
+        case 0x6c:  # l
+            n = _U32.unpack_from(mv, offset)[0]
+            offset += 4
+            ret = []
+            for _ in range(n):
+                v, offset = _unpack(mv, offset)
+                ret.append(v)
+            return ret, offset
+        case 0x6d:  # m
+            n = _U32.unpack_from(mv, offset)[0]
+            offset += 4
+            d = {}
+            for _ in range(n):
+                k, offset = _unpack(mv, offset)
+                d[k], offset = _unpack(mv, offset)
+            return d, offset
+    raise Exception(f'Broken process message: tag {tag} at {offset - 1}.')
+
+
+def _typed_size(o, limit: int) -> int:
+    '''
+    Returns the approximate size of |o| as typed values, or -1 if not representable or not smaller than |limit|.
+    '''
+    stack = [o]
+    size = 0
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if o is None or t is bool or t is float:
+            size += 8
+        elif t is int:
+            if not _INT32_MIN <= o <= _INT32_MAX:
+                return -1  # `cef_value_t` int is 32 bits.
+            size += 8
+        elif t is str or t is bytes:
+            size += len(o) + 8
+        elif t is list or t is tuple:
+            size += 8
+            stack.extend(o)
+        elif t is dict:
+            size += 8
+            for k, v in o.items():
+                if type(k) is not str:
+                    return -1
+                size += len(k) + 8
+                stack.append(v)
+        else:
+            return -1  # `_pack()` tells if it is sendable.
+        if size >= limit:
+            return -1
+    return size
+
+
+def _release(o: ctypes.Structure):
+    o.base.release(ctypes.byref(o.base))
+
+
+def _set_value(c: ctypes.Structure, key, o):
+    '''
+    Sets |o| to `cef_list_value_t` index or `cef_dictionary_value_t` key |key|. Checked by `_typed_size()`.
+    '''
+    t = type(o)
+    if o is None:
+        c.set_null(c, key)
+    elif t is bool:
+        c.set_bool(c, key, int(o))
+    elif t is int:
+        c.set_int(c, key, o)
+    elif t is float:
+        c.set_double(c, key, o)
+    elif t is str:
+        c.set_string(c, key, cef_string_ctor(o))
+    elif t is bytes:
+        c.set_binary(c, key, header.cef_binary_value_create(o, len(o)))
+    elif t is list or t is tuple:
+        lst = header.cef_list_value_create().contents
+        lst.set_size(lst, len(o))
+        for i, v in enumerate(o):
+            _set_value(lst, i, v)
+        c.set_list(c, key, lst)
+    else:
+        d = header.cef_dictionary_value_create().contents
+        k = cef_string_t()
+        for name, v in o.items():
+            _set_value(d, cef_string_ctor(name, k, STRING_CACHE), v)
+        c.set_dictionary(c, key, d)
+
+
+def _get_value(c: ctypes.Structure, key):
+    '''
+    Gets the value at `cef_list_value_t` index or `cef_dictionary_value_t` key |key|.
+    '''
+    match c.get_type(c, key):
+        case header.VTYPE_NULL | header.VTYPE_INVALID:
+            return None
+        case header.VTYPE_BOOL:
+            return bool(c.get_bool(c, key))
+        case header.VTYPE_INT:
+            return c.get_int(c, key)
+        case header.VTYPE_DOUBLE:
+            return c.get_double(c, key)
+        case header.VTYPE_STRING:
+            return _decode_userfree(c.get_string(c, key))
+        case header.VTYPE_BINARY:
+            b = cef_pointer_to_struct(c.get_binary(c, key), struct.cef_binary_value_t)
+            try:
+                return ctypes.string_at(b.get_raw_data(b), b.get_size(b))
+            finally:
+                _release(b)
+        case header.VTYPE_LIST:
+            lst = cef_pointer_to_struct(c.get_list(c, key), struct.cef_list_value_t)
+            try:
+                return [_get_value(lst, i) for i in range(lst.get_size(lst))]
+            finally:
+                _release(lst)
+        case header.VTYPE_DICTIONARY:
+            d = cef_pointer_to_struct(c.get_dictionary(c, key), struct.cef_dictionary_value_t)
+            keys = header.cef_string_list_alloc()
+            try:
+                d.get_keys(d, keys)
+                k = cef_string_t()
+                return {
+                    name: _get_value(d, cef_string_ctor(name, k, STRING_CACHE)) for name in decode_cef_string_list(keys)}
+            finally:
+                header.cef_string_list_free(keys)
+                _release(d)
+    raise Exception('Unknown cef_value_type_t.')
+
+
+class _PendingRequest:
+    __slots__ = ('channel', 'request_id', 'future')
+
+    def __init__(self, channel: 'MessageChannel', request_id: int):
+        self.channel = channel
+        self.request_id = request_id
+        self.future: Future = Future()
+
+    def time_out(self):
+        if self.channel._pop_pending(self.request_id) is not None:
+            self.future.set_exception(TimeoutError(f'Process message request {self.request_id} timed out.'))
+
+
+class MessageChannel:
+    '''
+    Events and requests by topic between processes. Make one with the same |name| in both processes,
+    and feed `on_process_message_received` to `receive()` (or `attach_*()`).
+
+    `emit()` and `request()` send through a frame, so call them where the frame is usable:
+    UI thread in browser process and the main thread in renderer process.
+    Handlers run on the thread receiving the message.
+    '''
+    def __init__(self, name: str = 'cef_capi', shared_memory_threshold: int = SHARED_MEMORY_THRESHOLD):
+        self.name = name
+        self.shared_memory_threshold = shared_memory_threshold
+        self.sent_typed = 0
+        self.sent_packed = 0
+        self.sent_shared = 0
+        self._message_name = f'cef_capi.{name}'
+        self._handlers: dict[str, ty.Callable[[struct.cef_frame_t, ty.Any], ty.Any]] = {}
+        self._lock = threading.Lock()
+        self._pending: dict[int, _PendingRequest] = {}
+        self._request_ids = itertools.count()
+
+    def on(self, topic: str) -> ty.Callable[[ty.Callable], ty.Callable]:
+        '''
+        Decorator of a handler of |topic|: `func(frame, payload)`. For a request, the return value is
+        the response, and an exception fails the future of the requester.
+        '''
+        def decorator(func: ty.Callable) -> ty.Callable:
+            self._handlers[topic] = func
+            return func
+        return decorator
+
+    def emit(self, frame: struct.cef_frame_t, target_process: int, topic: str, payload=None):
+        '''
+        Sends an event of |topic| to |target_process| (`header.PID_BROWSER` / `header.PID_RENDERER`).
+        '''
+        self._send(frame, target_process, _EVENT, 0, topic, payload)
+
+    def request(
+            self,
+            frame: struct.cef_frame_t,
+            target_process: int,
+            topic: str,
+            payload=None,
+            timeout: float | None = None) -> Future:
+        '''
+        Sends a request of |topic| and returns `Future` of the response. |timeout| seconds fail it by `TimeoutError`.
+        '''
+        request_id = next(self._request_ids) % _INT32_MAX + 1  # 0 is not a request.
+        pending = _PendingRequest(self, request_id)
+        with self._lock:
+            self._pending[request_id] = pending
+        try:
+            self._send(frame, target_process, _REQUEST, request_id, topic, payload)
+        except BaseException:
+            self._pop_pending(request_id)
+            raise
+        if timeout is not None:
+            entry = _DEADLINES.add(time.monotonic() + timeout, pending)
+            pending.future.add_done_callback(lambda _: _DEADLINES.discard(entry))
+        return pending.future
+
+    def pending_requests(self) -> int:
+        '''
+        Returns the number of requests waiting for the response.
+        '''
+        with self._lock:
+            return len(self._pending)
+
+    def _pop_pending(self, request_id: int) -> _PendingRequest | None:
+        with self._lock:
+            return self._pending.pop(request_id, None)
+
+    def _send(self, frame: struct.cef_frame_t, target_process: int, kind: int, request_id: int, topic: str, payload):
+        msg = self._message_ctor(kind, request_id, topic, payload)
+        frame.send_process_message(frame, target_process, msg)  # CEF takes |msg|.
+
+    def _message_ctor(self, kind: int, request_id: int, topic: str, payload) -> ctypes._Pointer:
+        '''
+        Builds `cef_process_message_t` of typed values, packed binary or shared memory by the payload size.
+        '''
+        threshold = self.shared_memory_threshold
+        if _typed_size(payload, threshold) >= 0:
+            p = header.cef_process_message_create(cef_string_ctor(self._message_name, cache=STRING_CACHE))
+            msg = p.contents
+            args = cef_pointer_to_struct(msg.get_argument_list(msg), struct.cef_list_value_t)
+            try:
+                args.set_size(args, 4)
+                args.set_int(args, 0, kind)
+                args.set_int(args, 1, request_id)
+                args.set_string(args, 2, cef_string_ctor(topic, cache=STRING_CACHE))
+                _set_value(args, 3, payload)
+            finally:
+                _release(args)
+            self.sent_typed += 1
+            return p
+        chunks: list = []
+        _pack(payload, chunks)
+        size = sum(map(_nbytes, chunks))
+        if size < threshold:
+            # Not typed value (e.g. 64 bits int): packed bytes in the argument list.
+            p = header.cef_process_message_create(cef_string_ctor(self._message_name, cache=STRING_CACHE))
+            msg = p.contents
+            args = cef_pointer_to_struct(msg.get_argument_list(msg), struct.cef_list_value_t)
+            try:
+                args.set_size(args, 4)
+                args.set_int(args, 0, kind | _PACKED)
+                args.set_int(args, 1, request_id)
+                args.set_string(args, 2, cef_string_ctor(topic, cache=STRING_CACHE))
+                packed = b''.join(chunks)  # Small. Copies of bytearray / memoryview chunks too.
+                args.set_binary(args, 3, header.cef_binary_value_create(packed, len(packed)))
+            finally:
+                _release(args)
+            self.sent_packed += 1
+            return p
+        # The whole envelope goes into shared memory. Such a message has no argument list.
+        head: list = []
+        _pack([kind, request_id, topic], head)
+        chunks = head + chunks
+        size += sum(len(c) for c in head)
+        builder = header.cef_shared_process_message_builder_create(
+            cef_string_ctor(self._message_name, cache=STRING_CACHE), size).contents
+        try:
+            if not builder.is_valid(builder):
+                raise Exception(f'Failed to allocate {size} bytes of shared memory.')
+            addr = builder.memory(builder)
+            offset = 0
+            for c in chunks:
+                if isinstance(c, bytes):
+                    ctypes.memmove(addr + offset, c, len(c))
+                    offset += len(c)
+                    continue
+                export = _BufferExport(c)
+                try:
+                    ctypes.memmove(addr + offset, export.view.buf, export.view.len)
+                    offset += export.view.len
+                finally:
+                    export.release()
+            p = ctypes.cast(builder.build(builder), ctypes.POINTER(struct.cef_process_message_t))
+        finally:
+            _release(builder)
+        self.sent_shared += 1
+        return p
+
+    def _decode_message(self, msg: struct.cef_process_message_t) -> tuple[int, int, str, ty.Any]:
+        '''
+        Returns `(kind, request_id, topic, payload)` of |msg|.
+        '''
+        region_addr = msg.get_shared_memory_region(msg)
+        if region_addr:
+            region = cef_pointer_to_struct(region_addr, struct.cef_shared_memory_region_t)
+            try:
+                mv = _PyMemoryView_FromMemory(region.memory(region), region.size(region), _PyBUF_READ)
+                (kind, request_id, topic), offset = _unpack(mv)
+                payload, _ = _unpack(mv, offset)
+                return kind, request_id, topic, payload
+            finally:
+                _release(region)
+        args = cef_pointer_to_struct(msg.get_argument_list(msg), struct.cef_list_value_t)
+        try:
+            kind = args.get_int(args, 0)
+            request_id = args.get_int(args, 1)
+            topic = _decode_userfree(args.get_string(args, 2))
+            if kind & _PACKED:
+                payload, _ = _unpack(memoryview(_get_value(args, 3)))
+                kind &= ~_PACKED
+            else:
+                payload = _get_value(args, 3)
+            return kind, request_id, topic, payload
+        finally:
+            _release(args)
+
+    def receive(self, frame: struct.cef_frame_t, source_process: int, message: struct.cef_process_message_t) -> int:
+        '''
+        Handles |message| of `on_process_message_received`. Returns 1 if it is of this channel, otherwise 0.
+        '''
+        if _decode_userfree(message.get_name(message)) != self._message_name:
+            return 0
+        kind, request_id, topic, payload = self._decode_message(message)
+        if kind == _EVENT:
+            func = self._handlers.get(topic)
+            if func is not None:
+                func(frame, payload)
+        elif kind == _REQUEST:
+            func = self._handlers.get(topic)
+            try:
+                if func is None:
+                    raise Exception(f'No handler of {topic}.')
+                result = func(frame, payload)
+            except Exception as e:
+                self._send(frame, source_process, _ERROR, request_id, topic, f'{e.__class__.__name__}: {e}')
+            else:
+                self._send(frame, source_process, _RESPONSE, request_id, topic, result)
+        else:
+            pending = self._pop_pending(request_id)
+            if pending is not None:
+                if kind == _RESPONSE:
+                    pending.future.set_result(payload)
+                else:
+                    pending.future.set_exception(Exception(payload))
+        return 1
+
+    def attach_client(self, client: struct.cef_client_t):
+        '''
+        Registers `on_process_message_received` to |client| in browser process.
+        '''
+        channel = self
+
+        @handler(client, ignore_arg_indices={0, 1})
+        def on_process_message_received(
+                frame: struct.cef_frame_t,
+                source_process: int,
+                message: struct.cef_process_message_t):
+            return channel.receive(frame, source_process, message)
+
+    def attach_render_process_handler(self, render_process_handler: struct.cef_render_process_handler_t):
+        '''
+        Registers `on_process_message_received` to |render_process_handler| in renderer process.
+        '''
+        channel = self
+
+        @handler(render_process_handler, ignore_arg_indices={0, 1})
+        def on_process_message_received(
+                frame: struct.cef_frame_t,
+                source_process: int,
+                message: struct.cef_process_message_t):
+            return channel.receive(frame, source_process, message)
@@ -0,0 +1,476 @@
+'''
+Headless page-to-image render farm.
+
+`RenderFarm` keeps up to |concurrency| windowless browsers alive in one CEF process and feeds them
+URLs from a queue. A page is complete when `cef_load_handler_t.on_loading_state_change` reports the end
+of loading and `on_paint` has settled for |settle_time| seconds. Then the frame is encoded in a worker thread.
+
+    farm = RenderFarm(concurrency=8)
+    futures = [farm.submit(url) for url in urls]
+    farm.serve()  # Runs CEF message loop until all submitted URLs are done.
+    images = [f.result().image for f in futures]
+
+CEF can initialize only once per process, so `serve()` can run only once per process.
+'''
+import ctypes
+import queue
+import struct as _struct
+import threading
+import time
+import typing as ty
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from cef_capi import (
+    base_ctor, struct, header, handler, size_ctor, cef_string_ctor, cef_string_t,
+    cef_pointer_to_struct, pooled_task_factory, _decode_or_empty)
+from cef_capi.app_client import app_ctor, settings_main_args_ctor
+
+TICK_MS = 20
+'''
+Interval of the settle / timeout check on UI thread.
+'''
+
+
+def encode_png(bgra: bytes, width: int, height: int, level: int = 1) -> bytes:
+    '''
+    Encodes BGRA |bgra| to RGBA PNG without external libraries. |level| is zlib compression level.
+    '''
+    rgba = bytearray(bgra)
+    rgba[0::4] = bgra[2::4]
+    rgba[2::4] = bgra[0::4]
+    stride = width * 4
+    mv = memoryview(rgba)
+    raw = b''.join(b'\x00' + mv[y * stride:(y + 1) * stride] for y in range(height))  # Filter type None
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return _struct.pack('>I', len(data)) + tag + data + _struct.pack('>I', zlib.crc32(tag + data))
+
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', _struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(raw, level)),
+        chunk(b'IEND', b'')))
+
+
+@dataclass(frozen=True)
+class RenderResult:
+    '''
+    Encoded image of |url|. |elapsed| is seconds from the start of loading to the capture.
+    '''
+    url: str
+    image: bytes
+    width: int
+    height: int
+    elapsed: float
+
+
+class _Job:
+    __slots__ = ('url', 'future')
+
+    def __init__(self, url: str, future: Future):
+        self.url = url
+        self.future = future
+
+
+class _Slot:
+    '''
+    A windowless browser and the job rendered by it. Touched only on UI thread.
+    '''
+    def __init__(self, farm: 'RenderFarm', index: int):
+        self.index = index
+        self.browser: struct.cef_browser_t | None = None
+        self.job: _Job | None = None
+        self.started_at = 0.
+        self.loading_seen = False
+        self.loaded_at = 0.
+        self.last_paint_at = 0.
+        self.frame = bytearray()
+        self.frame_size = (0, 0)
+        self.client = farm._client_ctor(self)
+
+    def assign(self, job: _Job):
+        self.job = job
+        self.started_at = time.monotonic()
+        self.loading_seen = False
+        self.loaded_at = 0.
+        self.last_paint_at = 0.
+
+    def load(self, url: str):
+        assert self.browser is not None
+        frame = cef_pointer_to_struct(self.browser.get_main_frame(self.browser), struct.cef_frame_t)
+        frame.load_url(frame, cef_string_ctor(url))
+
+    def host(self) -> struct.cef_browser_host_t:
+        assert self.browser is not None
+        return cef_pointer_to_struct(self.browser.get_host(self.browser), struct.cef_browser_host_t)
+
+
+class RenderFarm:
+    '''
+    Renders URLs to images by |concurrency| windowless browsers in this process.
+
+    |viewport_size| is (width, height) of the browsers.
+    |settle_time| is seconds without `on_paint` after loading, to consider the page complete.
+    |max_settle_time| caps it for animated pages. |timeout| is seconds per URL.
+    |max_queued| bounds the queue: `submit()` blocks while it is full.
+    |encoder| is `(bgra, width, height) -> bytes`, `encode_png()` by default.
+    It runs in |encode_workers| threads, out of UI thread.
+    |root_cache_path| is given to `cef_settings_t`. Processes running CEF at once need distinct ones.
+    |on_tick| is called every `TICK_MS` on UI thread while serving. Good for liveness check.
+    '''
+    def __init__(
+            self,
+            concurrency: int = 4,
+            viewport_size: tuple[int, int] = (800, 600),
+            settle_time: float = .3,
+            max_settle_time: float = 3.,
+            timeout: float = 30.,
+            max_queued: int = 0,
+            encoder: ty.Callable[[bytes, int, int], bytes] = encode_png,
+            encode_workers: int = 2,
+            root_cache_path: str | None = None,
+            on_tick: ty.Callable[[], None] | None = None):
+        if concurrency < 1:
+            raise Exception('RenderFarm concurrency should be positive.')
+        self.concurrency = concurrency
+        self.viewport_size = viewport_size
+        self.settle_time = settle_time
+        self.max_settle_time = max_settle_time
+        self.timeout = timeout
+        self.encoder = encoder
+        self.root_cache_path = root_cache_path
+        self.on_tick = on_tick
+        self._queue: queue.Queue[_Job] = queue.Queue(max_queued)
+        self._encode_pool = ThreadPoolExecutor(encode_workers, thread_name_prefix='cef-capi-encode')
+        self._slots: list[_Slot] = []
+        self._lock = threading.Lock()
+        self._serving = False
+        self._closing = False
+        self._close_when_idle = True
+        self._shutdown_requested = False
+        self._open_browsers = 0
+        self._pending = 0  # Submitted and not finished jobs.
+
+        @pooled_task_factory()
+        def dispatch():
+            self._dispatch()
+
+        @pooled_task_factory()
+        def tick():
+            self._tick()
+
+        @pooled_task_factory()
+        def close():
+            self._close()
+
+        self._dispatch_task = dispatch
+        self._tick_task = tick
+        self._close_task = close
+
+    @property
+    def serving(self) -> bool:
+        '''
+        True while `serve()` runs the message loop.
+        '''
+        return self._serving
+
+    def submit(self, url: str) -> Future:
+        '''
+        Queues |url|. Thread-safe. Returns `Future` of `RenderResult`.
+        '''
+        future: Future = Future()
+        with self._lock:
+            if self._closing:
+                raise Exception('RenderFarm is closing.')
+            self._pending += 1
+        self._queue.put(_Job(url, future))
+        if self._serving:
+            header.cef_post_task(header.TID_UI, self._dispatch_task())
+        return future
+
+    def map(self, urls: ty.Iterable[str]) -> list[Future]:
+        '''
+        Queues all of |urls|.
+        '''
+        return [self.submit(url) for url in urls]
+
+    def shutdown(self):
+        '''
+        Closes the browsers and quits `serve()` after the submitted URLs are done. Thread-safe.
+        '''
+        with self._lock:
+            self._shutdown_requested = True
+            self._close_when_idle = True
+            idle = self._pending == 0
+        if self._serving and idle:
+            header.cef_post_task(header.TID_UI, self._close_task())
+
+    def serve(self, close_when_idle: bool = True, app: struct.cef_app_t | None = None):
+        '''
+        Initializes CEF, runs the message loop until the farm closes, and shuts CEF down.
+        Call it on the main thread. If |close_when_idle|, the farm closes when the queue becomes empty.
+        Otherwise it waits for `submit()` until `shutdown()`.
+        '''
+        with self._lock:
+            self._close_when_idle = close_when_idle or self._shutdown_requested
+        if app is None:
+            app = app_ctor()
+        settings, main_args = settings_main_args_ctor()
+        settings.log_severity = struct.LOGSEVERITY_WARNING
+        settings.no_sandbox = 1
+        settings.windowless_rendering_enabled = 1
+        if self.root_cache_path is not None:
+            settings.root_cache_path = cef_string_ctor(self.root_cache_path)
+            settings.cache_path = cef_string_ctor(self.root_cache_path)
+        if not header.cef_initialize(main_args, settings, app, None):
+            raise Exception('cef_initialize() failed.')
+        try:
+            self._serving = True
+            header.cef_post_task(header.TID_UI, self._dispatch_task())
+            header.cef_post_delayed_task(header.TID_UI, self._tick_task(), TICK_MS)
+            header.cef_run_message_loop()
+        finally:
+            self._serving = False
+            header.cef_shutdown()
+            self._fail_all(Exception('RenderFarm stopped.'))
+            self._encode_pool.shutdown()
+
+    def _create_browser(self, slot: _Slot, url: str):
+        window_info = struct.cef_window_info_t()
+        window_info.windowless_rendering_enabled = 1
+        window_info.window_name = cef_string_ctor(f'cef-capi-py render farm {slot.index}')
+        browser_settings = size_ctor(struct.cef_browser_settings_t)
+        self._open_browsers += 1
+        header.cef_browser_host_create_browser(
+            window_info, slot.client, cef_string_ctor(url), browser_settings, None, None)
+
+    def _dispatch(self):
+        '''
+        Assigns queued jobs to idle slots, creating browsers up to |concurrency|.
+        '''
+        if self._closing:
+            return
+        for slot in self._slots:
+            if slot.job is None and slot.browser is not None:
+                job = self._next_job()
+                if job is None:
+                    break
+                slot.assign(job)
+                slot.load(job.url)
+        while len(self._slots) < self.concurrency:
+            job = self._next_job()
+            if job is None:
+                break
+            slot = _Slot(self, len(self._slots))
+            self._slots.append(slot)
+            slot.assign(job)
+            self._create_browser(slot, job.url)
+        self._close_if_idle()
+
+    def _next_job(self) -> _Job | None:
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return None
+            if job.future.set_running_or_notify_cancel():
+                return job
+            self._finish(None)
+
+    def _tick(self):
+        '''
+        Completes settled pages and fails timed out ones. Runs every `TICK_MS` on UI thread.
+        '''
+        if self._closing:
+            return
+        if self.on_tick is not None:
+            self.on_tick()
+        now = time.monotonic()
+        for slot in self._slots:
+            job = slot.job
+            if job is None:
+                continue
+            if slot.loaded_at > 0. and slot.last_paint_at >= slot.loaded_at and (
+                    now - slot.last_paint_at >= self.settle_time or now - slot.loaded_at >= self.max_settle_time):
+                self._capture(slot, now)
+            elif now - slot.started_at >= self.timeout:
+                self._fail(slot, Exception(f'RenderFarm timeout: {job.url}'))
+        header.cef_post_delayed_task(header.TID_UI, self._tick_task(), TICK_MS)
+
+    def _capture(self, slot: _Slot, now: float):
+        job = slot.job
+        assert job is not None
+        width, height = slot.frame_size
+        bgra = bytes(slot.frame)
+        elapsed = now - slot.started_at
+        slot.job = None
+
+        def encode():
+            try:
+                job.future.set_result(RenderResult(job.url, self.encoder(bgra, width, height), width, height, elapsed))
+            except Exception as e:
+                job.future.set_exception(e)
+            finally:
+                self._finish(self._dispatch_task)
+
+        self._encode_pool.submit(encode)
+        self._dispatch()
+
+    def _fail(self, slot: _Slot, e: Exception):
+        job = slot.job
+        assert job is not None
+        slot.job = None
+        if slot.browser is not None:
+            slot.browser.stop_load(slot.browser)
+        job.future.set_exception(e)
+        # Not `_dispatch()` directly: navigating in `on_load_error` of the same browser is unsafe.
+        self._finish(self._dispatch_task)
+
+    def _fail_all(self, e: Exception):
+        for slot in self._slots:
+            if slot.job is not None and not slot.job.future.done():
+                slot.job.future.set_exception(e)
+            slot.job = None
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not job.future.done():
+                job.future.set_exception(e)
+
+    def _finish(self, then: ty.Callable[[], struct.cef_task_t] | None):
+        '''
+        Counts a job done. Posts |then| task if still serving.
+        '''
+        with self._lock:
+            self._pending -= 1
+        if self._serving and then is not None:
+            header.cef_post_task(header.TID_UI, then())
+
+    def _close_if_idle(self):
+        with self._lock:
+            idle = self._close_when_idle and self._pending == 0
+        if idle:
+            self._close()
+
+    def _close(self):
+        '''
+        Closes all browsers. The message loop quits in `on_before_close` of the last one.
+        '''
+        if self._closing:
+            return
+        with self._lock:
+            self._closing = True
+        if self._open_browsers == 0:
+            header.cef_quit_message_loop()
+            return
+        for slot in self._slots:
+            if slot.browser is not None:
+                host = slot.host()
+                host.close_browser(host, 1)
+
+    def _client_ctor(self, slot: _Slot) -> struct.cef_client_t:
+        '''
+        Returns `cef_client_t` bound to |slot|.
+        '''
+        farm = self
+        client = base_ctor(struct.cef_client_t)
+
+        @handler(client)
+        def get_life_span_handler(*_):
+            life_span_handler = base_ctor(struct.cef_life_span_handler_t)
+
+            @handler(life_span_handler)
+            def on_after_created(browser: struct.cef_browser_t):
+                slot.browser = browser
+                if farm._closing:
+                    host = slot.host()
+                    host.close_browser(host, 1)
+                elif slot.job is None:  # The first job timed out before the creation.
+                    header.cef_post_task(header.TID_UI, farm._dispatch_task())
+
+            @handler(life_span_handler)
+            def on_before_close(browser: struct.cef_browser_t):
+                slot.browser = None
+                farm._open_browsers -= 1
+                if farm._closing and farm._open_browsers == 0:
+                    header.cef_quit_message_loop()
+
+            return life_span_handler
+
+        @handler(client)
+        def get_render_handler(*_):
+            render_handler = base_ctor(struct.cef_render_handler_t)
+
+            @handler(render_handler)
+            def get_view_rect(browser: struct.cef_browser_t, rect: struct.cef_rect_t):
+                rect.x = 0
+                rect.y = 0
+                rect.width, rect.height = farm.viewport_size
+                return 1
+
+            @handler(render_handler, ignore_arg_indices={0, 1, 3, 4})
+            def on_paint(element_type: int, buffer: int, width: int, height: int):
+                if element_type != header.PET_VIEW or slot.job is None or not slot.loading_seen:
+                    return
+                n = width * height * 4
+                if len(slot.frame) != n:
+                    slot.frame = bytearray(n)
+                ctypes.memmove((ctypes.c_char * n).from_buffer(slot.frame), buffer, n)
+                slot.frame_size = (width, height)
+                slot.last_paint_at = time.monotonic()
+
+            return render_handler
+
+        @handler(client)
+        def get_load_handler(*_):
+            load_handler = base_ctor(struct.cef_load_handler_t)
+
+            @handler(load_handler)
+            def on_loading_state_change(
+                    browser: struct.cef_browser_t,
+                    is_loading: int,
+                    can_go_back: int,
+                    can_go_forward: int):
+                if slot.job is None:
+                    return
+                if is_loading:
+                    slot.loading_seen = True
+                elif slot.loading_seen and slot.loaded_at == 0.:
+                    # Stale state changes of the former URL are ignored by |loading_seen|.
+                    slot.loaded_at = time.monotonic()
+                    # A page painted before the end of loading may not paint again. Ask a fresh paint.
+                    host = slot.host()
+                    host.invalidate(host, header.PET_VIEW)
+
+            @handler(load_handler)
+            def on_load_error(
+                    browser: struct.cef_browser_t,
+                    frame: struct.cef_frame_t,
+                    error_code: int,
+                    error_text: cef_string_t,
+                    failed_url: cef_string_t):
+                if slot.job is None or not frame.is_main(frame) or error_code == header.ERR_ABORTED:
+                    return
+                farm._fail(slot, Exception(
+                    f'RenderFarm failed to load {slot.job.url}: {error_code} {_decode_or_empty(error_text)}'))
+
+            return load_handler
+
+        return client
+
+
+def render_urls(urls: ty.Iterable[str], **kwargs) -> list[RenderResult | Exception]:
+    '''
+    Renders |urls| by `RenderFarm(**kwargs)` and returns the results in order. Failed URLs give the exception.
+    '''
+    farm = RenderFarm(**kwargs)
+    futures = farm.map(urls)
+    farm.serve()
+    ret: list[RenderResult | Exception] = []
+    for f in futures:
+        e = f.exception()
+        ret.append(e if e is not None else f.result())  # type: ignore
+    return ret
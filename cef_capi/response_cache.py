@@ -0,0 +1,544 @@
+'''
+Shared on-disk HTTP response cache on `cef_resource_request_handler_t`, for repeated crawls of the same sites.
+
+    cache = ResponseCache('crawl-cache', ttl=24 * 3600, max_bytes=2 << 30)
+    cache.attach(client)
+
+A GET response of status 200 is captured by a response filter as it streams, and stored when it loads successfully:
+the body in `objects/` named by its SHA-256, so a body shared by URLs is stored once, and the URL, status, headers
+and MIME type in an SQLite index. Later requests of the URL, in this process or another, are served from the file
+by `get_resource_handler` without network, with the headers rebuilt by `cef_response_t.set_header_map`.
+Entries expire |ttl| seconds after stored. Beyond |max_bytes|, the least recently served entries are evicted.
+
+Processes can share the directory, e.g. each worker process of `cef_capi.smoke_test` style with own `root_cache_path`.
+Index updates and body file creation / deletion run in SQLite write transactions (WAL), so they are serialized
+across processes, and a body is moved into place by `os.replace()` once complete.
+
+The stored body is the decoded one a response filter gets, so `Content-Encoding` and `Content-Length` are dropped.
+A body not encoded is stored only if it is of its `Content-Length`: a cut off one also loads successfully.
+Responses with `Cache-Control: no-store` or `private`, `Set-Cookie` or `Vary` other than `Accept-Encoding`
+are not stored. Requests with `Range` are not served from the cache.
+'''
+import os
+import json
+import time
+import ctypes
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import contextlib
+import typing as ty
+from pathlib import Path
+from dataclasses import dataclass
+from cef_capi import struct, header, handler, cef_string_ctor, STRING_CACHE, \
+    _init_cef_base_ref_counted, _register_callback, _PyMemoryView_FromMemory, _PyBUF_WRITE, _decode_userfree, \
+    _request_header, _attach_resource_request_handler
+from cef_capi.response_filter import ResponseFilters, Transformer
+from cef_capi.string_collection import decode_cef_string_multimap, cef_string_multimap_ctor
+
+_SCHEMES = ('http://', 'https://')
+_DROPPED_HEADERS = frozenset((
+    'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive', 'age'))
+_TOUCH_INTERVAL = 60.
+'''
+`last_access` of an entry is updated at most once in this many seconds, so most hits do not write.
+'''
+_STALE_TMP = 24 * 3600.
+'''
+Partial bodies older than this are of dead processes, and removed.
+'''
+_EVICT_BATCH = 64
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    status_text TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    charset TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL);
+'''
+_COLUMNS = 'url, status, status_text, mime_type, charset, headers, digest, size, stored_at, expires_at'
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    '''
+    An entry of `ResponseCache`. |headers| maps a header name to its values. |digest| is SHA-256 of the body.
+    '''
+    url: str
+    status: int
+    status_text: str
+    mime_type: str
+    charset: str
+    headers: dict[str, list[str]]
+    digest: str
+    size: int
+    stored_at: float
+    expires_at: float
+
+
+def _storable_headers(headers: dict[str, list[str]]) -> dict[str, list[str]] | None:
+    '''
+    Returns |headers| to replay, or None if the response must not be stored.
+    '''
+    ret = {}
+    for name, values in headers.items():
+        lower = name.lower()
+        if lower == 'set-cookie':
+            return None
+        if lower == 'cache-control':
+            directives = {d.strip().split('=')[0].lower() for v in values for d in v.split(',')}
+            if 'no-store' in directives or 'private' in directives:
+                return None
+        elif lower == 'vary':
+            if any(v.strip().lower() not in ('', 'accept-encoding') for value in values for v in value.split(',')):
+                return None
+        if lower not in _DROPPED_HEADERS:
+            ret[name] = values
+    return ret
+
+
+def _identity_length(headers: dict[str, list[str]]) -> int | None:
+    '''
+    Returns `Content-Length` of |headers| if the body is not encoded, i.e. the size a response filter gets.
+    '''
+    length = None
+    for name, values in headers.items():
+        lower = name.lower()
+        if lower == 'content-encoding':
+            if any(v.strip().lower() not in ('', 'identity') for v in values):
+                return None
+        elif lower == 'content-length' and values:
+            try:
+                length = int(values[-1])
+            except ValueError:
+                return None
+    return length
+
+
+class _Fill(Transformer):
+    '''
+    Passes the body through, and writes it to a temporary file while hashing it.
+    The entry is stored once both the body ends and the load completes successfully,
+    and the body is of |expected_size| if not None.
+    '''
+    def __init__(self, cache: 'ResponseCache', url: str, meta: tuple, expected_size: int | None = None):
+        self.cache = cache
+        self.url = url
+        self.meta = meta  # (status, status text, MIME type, charset, headers)
+        self.expected_size = expected_size
+        fd, tmp = tempfile.mkstemp(dir=cache.directory / 'tmp')
+        self.tmp = tmp
+        self._file: ty.BinaryIO | None = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.body_done = False
+        self.success: bool | None = None
+
+    def feed(self, data: memoryview, write: ty.Callable[[ty.Any], None]):
+        write(data)
+        if self._file is None:
+            return
+        self.size += len(data)
+        if self.size > self.cache.max_entry_bytes:
+            self._discard()
+            return
+        try:
+            self._file.write(data)
+        except OSError as e:
+            print(f'cef-capi-py ERROR: response cache: {e}')
+            self._discard()
+            return
+        self._hash.update(data)
+
+    def finish(self, write: ty.Callable[[ty.Any], None]):
+        self.body_done = True
+        self._resolve()
+
+    def complete(self, success: bool):
+        self.success = success
+        self._resolve()
+
+    def _resolve(self):
+        if self._file is None or not self.body_done or self.success is None:
+            return
+        if not self.success or (self.expected_size is not None and self.size != self.expected_size):
+            self._discard()  # Failed or cut off.
+            return
+        file, self._file = self._file, None
+        try:
+            file.close()
+            self.cache._commit(self.url, *self.meta, self.tmp, self._hash.hexdigest(), self.size)
+        except (OSError, sqlite3.Error) as e:
+            print(f'cef-capi-py ERROR: response cache: {e}')
+            with contextlib.suppress(OSError):
+                os.remove(self.tmp)
+
+    def _discard(self):
+        file, self._file = self._file, None
+        if file is not None:
+            file.close()
+            with contextlib.suppress(OSError):
+                os.remove(self.tmp)
+
+
+class _CachedResponseHandler:
+    '''
+    `cef_resource_handler_t` serving |entry| from its opened body |file|. Every call is on IO thread.
+    '''
+    __slots__ = ('cache', 'entry', 'file', 'offset', 'handler')
+
+    def __init__(self, cache: 'ResponseCache', entry: CachedResponse, file: ty.BinaryIO):
+        self.cache = cache
+        self.entry = entry
+        self.file: ty.BinaryIO | None = file
+        self.offset = 0
+        self.handler = struct.cef_resource_handler_t()
+        self.handler.base.size = ctypes.sizeof(struct.cef_resource_handler_t)
+        _init_cef_base_ref_counted(self.handler, on_released=self.released)
+        _register_callback(self.handler, 'open', self.open, ignore_arg_indices={0, 1, 3})
+        _register_callback(self.handler, 'get_response_headers', self.get_response_headers, ignore_arg_indices={0, 3})
+        _register_callback(self.handler, 'skip', self.skip, ignore_arg_indices={0, 3})
+        _register_callback(self.handler, 'read', self.read, ignore_arg_indices={0, 4})
+        _register_callback(self.handler, 'cancel', self.close)
+
+    def open(self, handle_request: ctypes.c_int32):
+        handle_request.value = 1  # Handled synchronously.
+        return 1
+
+    def get_response_headers(self, response: struct.cef_response_t, response_length: ctypes.c_int64):
+        entry = self.entry
+        headers = cef_string_multimap_ctor(entry.headers)
+        response.set_header_map(response, headers)
+        header.cef_string_multimap_free(headers)
+        response.set_status(response, entry.status)
+        response.set_status_text(response, cef_string_ctor(entry.status_text, cache=STRING_CACHE))
+        response.set_mime_type(response, cef_string_ctor(entry.mime_type, cache=STRING_CACHE))
+        if entry.charset:
+            response.set_charset(response, cef_string_ctor(entry.charset, cache=STRING_CACHE))
+        response_length.value = entry.size
+
+    def skip(self, bytes_to_skip: int, bytes_skipped: ctypes.c_int64):
+        n = min(bytes_to_skip, self.entry.size - self.offset)
+        if n <= 0 or self.file is None:
+            bytes_skipped.value = -2  # ERR_FAILED
+            return 0
+        self.offset += n
+        self.file.seek(self.offset)
+        bytes_skipped.value = n
+        return 1
+
+    def read(self, data_out: int, bytes_to_read: int, bytes_read: ctypes.c_int32):
+        n = min(bytes_to_read, self.entry.size - self.offset)
+        if n <= 0 or self.file is None:
+            bytes_read.value = 0
+            self.close()
+            return 0  # Complete.
+        n = self.file.readinto(_PyMemoryView_FromMemory(data_out, n, _PyBUF_WRITE))
+        if not n:  # Truncated.
+            bytes_read.value = -2  # ERR_FAILED
+            self.close()
+            return 0
+        self.offset += n
+        self.cache.bytes_served += n
+        bytes_read.value = n
+        return 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def released(self, _):
+        self.close()
+
+
+class ResponseCache:
+    '''
+    Response cache in |directory|, created if missing. Entries expire |ttl| seconds after stored.
+    Bodies over |max_entry_bytes| are not stored, and the bodies in total are kept within |max_bytes|.
+    Counters are of this process: `disk_usage()` is of every process.
+    '''
+    def __init__(
+            self, directory: str | Path, ttl: float = 24 * 3600., max_bytes: int = 1 << 30,
+            max_entry_bytes: int = 64 << 20):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.misses = 0
+        '''
+        GET requests without `Range` not served from the cache.
+        '''
+        self.bytes_served = 0
+        '''
+        Body bytes served from the cache, i.e. not downloaded.
+        '''
+        self.stored = 0
+        self.bytes_stored = 0
+        self.evicted = 0
+        '''
+        Entries removed by expiration or by |max_bytes|.
+        '''
+        self._local = threading.local()
+        self._fills: dict[int, _Fill] = {}  # By request identifier. IO thread only.
+        self._served: set[int] = set()
+        (self.directory / 'objects').mkdir(parents=True, exist_ok=True)
+        (self.directory / 'tmp').mkdir(exist_ok=True)
+        self._db()
+        self._remove_stale_tmp()
+        self.filters = ResponseFilters(lambda *_: None)
+        '''
+        Counters of the response filters filling the cache.
+        '''
+
+    def _db(self) -> sqlite3.Connection:
+        '''
+        The connection of this thread.
+        '''
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.directory / 'index.sqlite', timeout=30., isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(_SCHEMA)
+            self._local.db = db
+        return db
+
+    @contextlib.contextmanager
+    def _write(self) -> ty.Iterator[sqlite3.Connection]:
+        '''
+        Write transaction. It excludes the writes of the other processes.
+        '''
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _remove_stale_tmp(self):
+        limit = time.time() - _STALE_TMP
+        for entry in os.scandir(self.directory / 'tmp'):
+            with contextlib.suppress(OSError):
+                if entry.stat().st_mtime < limit:
+                    os.remove(entry.path)
+
+    def object_path(self, digest: str) -> Path:
+        '''
+        Returns the path of the body of |digest|.
+        '''
+        return self.directory / 'objects' / digest[:2] / digest
+
+    def get(self, url: str) -> CachedResponse | None:
+        '''
+        Returns the unexpired entry of |url|, or None. Marks it recently used.
+        '''
+        db = self._db()
+        row = db.execute(
+            f'SELECT {_COLUMNS}, last_access FROM entries WHERE url = ?', (url,)).fetchone()
+        now = time.time()
+        if row is None or row[9] <= now:
+            return None
+        if now - row[10] > _TOUCH_INTERVAL:
+            db.execute('UPDATE entries SET last_access = ? WHERE url = ?', (now, url))
+        return CachedResponse(*row[:5], json.loads(row[5]), *row[6:10])  # type: ignore
+
+    def put(
+            self, url: str, body: bytes, status: int = 200, status_text: str = 'OK',
+            mime_type: str = 'text/html', charset: str = '', headers: dict[str, list[str]] | None = None):
+        '''
+        Stores |body| of |url| without CEF, e.g. to prefill the cache.
+        '''
+        fd, tmp = tempfile.mkstemp(dir=self.directory / 'tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        self._commit(
+            url, status, status_text, mime_type, charset, headers or {}, tmp,
+            hashlib.sha256(body).hexdigest(), len(body))
+
+    def _commit(
+            self, url: str, status: int, status_text: str, mime_type: str, charset: str,
+            headers: dict[str, list[str]], tmp: str, digest: str, size: int):
+        '''
+        Moves the body at |tmp| into place, and indexes it for |url|.
+        '''
+        now = time.time()
+        path = self.object_path(digest)
+        with self._write() as db:
+            indexed = db.execute('UPDATE objects SET refs = refs + 1 WHERE digest = ?', (digest,)).rowcount
+            if indexed and path.exists():
+                os.remove(tmp)
+            else:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(tmp, path)  # Also restores a missing body of the other entries.
+                if not indexed:
+                    db.execute('INSERT INTO objects VALUES (?, ?, 1)', (digest, size))
+            old = db.execute('SELECT url, digest FROM entries WHERE url = ?', (url,)).fetchall()
+            if old:
+                db.execute('DELETE FROM entries WHERE url = ?', (url,))
+                self._release_object(db, old[0][1])
+            db.execute(
+                f'INSERT INTO entries ({_COLUMNS}, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, status, status_text, mime_type, charset, json.dumps(headers), digest, size,
+                 now, now + self.ttl, now))
+            self._evict(db, now)
+        self.stored += 1
+        self.bytes_stored += size
+
+    def _release_object(self, db: sqlite3.Connection, digest: str) -> int:
+        '''
+        Drops a reference to the body of |digest|. Returns the freed size.
+        '''
+        db.execute('UPDATE objects SET refs = refs - 1 WHERE digest = ?', (digest,))
+        row = db.execute('SELECT size FROM objects WHERE digest = ? AND refs <= 0', (digest,)).fetchone()
+        if row is None:
+            return 0
+        db.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+        with contextlib.suppress(OSError):  # Still open by a reader on Windows. Left as garbage.
+            os.remove(self.object_path(digest))
+        return row[0]
+
+    def _remove_entries(self, db: sqlite3.Connection, rows: list[tuple[str, str]]) -> int:
+        freed = 0
+        for url, digest in rows:
+            db.execute('DELETE FROM entries WHERE url = ?', (url,))
+            freed += self._release_object(db, digest)
+        self.evicted += len(rows)
+        return freed
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        '''
+        Removes expired entries, then the least recently used ones until the bodies fit in |max_bytes|.
+        '''
+        self._remove_entries(db, db.execute('SELECT url, digest FROM entries WHERE expires_at <= ?', (now,)).fetchall())
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+        while total > self.max_bytes:
+            rows = db.execute(
+                'SELECT url, digest FROM entries ORDER BY last_access LIMIT ?', (_EVICT_BATCH,)).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                total -= self._remove_entries(db, [row])
+                if total <= self.max_bytes:
+                    break
+
+    def disk_usage(self) -> tuple[int, int]:
+        '''
+        Returns the number of entries and the total size of the bodies.
+        '''
+        db = self._db()
+        entries = db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return entries, db.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def stats(self) -> dict[str, float]:
+        return {
+            'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate, 'bytes_served': self.bytes_served,
+            'stored': self.stored, 'bytes_stored': self.bytes_stored, 'evicted': self.evicted}
+
+    def _open(self, url: str) -> _CachedResponseHandler | None:
+        try:
+            entry = self.get(url)
+            if entry is None:
+                return None
+            file = open(self.object_path(entry.digest), 'rb')  # Evicted since `get()` if missing.
+        except (OSError, sqlite3.Error):
+            return None
+        return _CachedResponseHandler(self, entry, file)
+
+    def _fill(self, request: struct.cef_request_t, response: struct.cef_response_t) -> _Fill | None:
+        '''
+        Returns the transformer storing a cacheable response, or None.
+        '''
+        identifier = request.get_identifier(request)
+        if identifier in self._served or response.get_status(response) != 200:
+            return None
+        url = _decode_userfree(request.get_url(request))
+        if not url.startswith(_SCHEMES) or _decode_userfree(request.get_method(request)) != 'GET':
+            return None
+        headers = header.cef_string_multimap_alloc()
+        try:
+            response.get_header_map(response, headers)
+            received = decode_cef_string_multimap(headers)
+        finally:
+            header.cef_string_multimap_free(headers)
+        replayed = _storable_headers(received)
+        if replayed is None:
+            return None
+        meta = (
+            200, _decode_userfree(response.get_status_text(response)) or 'OK',
+            _decode_userfree(response.get_mime_type(response)), _decode_userfree(response.get_charset(response)),
+            replayed)
+        try:
+            fill = _Fill(self, url, meta, _identity_length(received))
+        except OSError as e:
+            print(f'cef-capi-py ERROR: response cache: {e}')
+            return None
+        self._fills[identifier] = fill
+        return fill
+
+    def register(self, resource_request_handler: struct.cef_resource_request_handler_t):
+        '''
+        Registers `get_resource_handler`, `get_resource_response_filter` and `on_resource_load_complete`
+        to |resource_request_handler|.
+        '''
+        cache = self
+
+        @handler(resource_request_handler, ignore_arg_indices={0, 1, 2})
+        def get_resource_handler(request: struct.cef_request_t):
+            url = _decode_userfree(request.get_url(request))
+            if (not url.startswith(_SCHEMES) or _decode_userfree(request.get_method(request)) != 'GET'
+                    or _request_header(request, 'Range')):
+                return 0  # NULL: the network.
+            served = cache._open(url)
+            if served is None:
+                cache.misses += 1
+                return 0
+            cache.hits += 1
+            cache._served.add(request.get_identifier(request))
+            return served.handler
+
+        @handler(resource_request_handler, ignore_arg_indices={0, 1, 2})
+        def get_resource_response_filter(request: struct.cef_request_t, response: struct.cef_response_t):
+            fill = cache._fill(request, response)
+            if fill is None:
+                return 0  # NULL: no filter.
+            return cache.filters.response_filter(fill)
+
+        @handler(resource_request_handler, ignore_arg_indices={0, 1, 2, 4, 6})
+        def on_resource_load_complete(request: struct.cef_request_t, status: int):
+            identifier = request.get_identifier(request)
+            if identifier in cache._served:
+                cache._served.discard(identifier)
+                return
+            fill = cache._fills.pop(identifier, None)
+            if fill is not None:
+                fill.complete(status == header.UR_SUCCESS)
+
+    def attach(self, client: struct.cef_client_t, *others):
+        '''
+        Registers `get_request_handler` to |client|. It replaces another `get_request_handler`,
+        e.g. of `RuleEngine.attach()`. |others| (e.g. `RuleEngine`) `register()` to the same
+        `cef_resource_request_handler_t`, built per request.
+        '''
+        _attach_resource_request_handler(client, [self.register] + [o.register for o in others])
@@ -0,0 +1,282 @@
+'''
+Streaming response body transformers on `cef_response_filter_t`.
+
+    filters = ResponseFilters(lambda url, mime_type: ScriptInjector(b'<script>...</script>')
+                              if mime_type == 'text/html' else None)
+    filters.attach(client)
+
+CEF calls `cef_response_filter_t.filter` per chunk of the body on IO thread. A `Transformer` gets the input chunk
+as memoryview over CEF input buffer, and its `write()` copies straight into CEF output buffer.
+Output beyond the output buffer is kept, and no input is taken until it is written out
+(`RESPONSE_FILTER_NEED_MORE_DATA`). Whole bodies are never held in Python unless the transformer does.
+'''
+import re
+import ctypes
+import typing as ty
+from pathlib import Path
+from cef_capi import struct, header, handler, \
+    _init_cef_base_ref_counted, _register_callback, _PyMemoryView_FromMemory, _PyBUF_READ, _PyBUF_WRITE, \
+    _decode_userfree, _attach_resource_request_handler
+
+_EMPTY = memoryview(b'')
+
+
+class Transformer:
+    '''
+    Base of response body transformers. One instance transforms one response. Passes the body through as is.
+    '''
+    def feed(self, data: memoryview, write: ty.Callable[[ty.Any], None]):
+        '''
+        Transforms the next chunk |data| and calls |write| with bytes-like output.
+        |data| is valid only during the call.
+        '''
+        write(data)
+
+    def finish(self, write: ty.Callable[[ty.Any], None]):
+        '''
+        Called once at the end of the body to write held back output.
+        '''
+        pass
+
+
+class RegexRewriter(Transformer):
+    '''
+    `re.sub()` of the body by |pattern| (bytes) and |repl| (bytes template or function of match).
+    Matches must be |max_match| bytes or shorter: the last |max_match| bytes of each chunk are held back
+    until the next chunk, and only those are copied. A template with backslashes copies each chunk too.
+    '''
+    def __init__(
+            self, pattern: bytes | re.Pattern, repl: bytes | ty.Callable[[re.Match], bytes],
+            max_match: int = 4096, count: int = 0):
+        self.pattern = re.compile(pattern) if isinstance(pattern, bytes) else pattern
+        self.repl = repl
+        self._template = isinstance(repl, bytes) and b'\\' in repl  # `re` expands templates only on bytes.
+        self.max_match = max_match
+        self.count = count
+        '''
+        The max number of replacements. 0 is unlimited.
+        '''
+        self.replaced = 0
+        self._tail = b''
+
+    def _rewrite(self, buf, final: bool, write: ty.Callable[[ty.Any], None]):
+        cut = len(buf)
+        if not final:
+            # Holds back the last |max_match| bytes, or from the start of a match crossing there.
+            cut = len(buf) - self.max_match
+            if cut <= 0:
+                self._tail = bytes(buf)
+                return
+            for m in self.pattern.finditer(buf, max(cut - self.max_match, 0)):
+                if m.start() >= cut:
+                    break
+                if m.end() > cut:
+                    cut = m.start()
+                    break
+        out, n = self.pattern.subn(self.repl, buf[:cut], self.count - self.replaced if self.count else 0)
+        self.replaced += n
+        write(out)
+        if self.count and self.replaced >= self.count:
+            write(buf[cut:])  # No more replacements. The rest passes through.
+            self._tail = b''
+        else:
+            self._tail = bytes(buf[cut:])
+
+    def feed(self, data: memoryview, write: ty.Callable[[ty.Any], None]):
+        if self.count and self.replaced >= self.count:
+            write(data)
+            return
+        if self._tail:
+            buf = self._tail + data
+        else:
+            buf = bytes(data) if self._template else data
+        self._rewrite(buf, False, write)
+
+    def finish(self, write: ty.Callable[[ty.Any], None]):
+        tail, self._tail = self._tail, b''
+        self._rewrite(tail, True, write)
+
+
+class ScriptInjector(Transformer):
+    '''
+    Inserts |snippet| (e.g. `b'<script>...</script>'`) before the first |marker| (case-insensitive),
+    or at the end of the body if not found. After the insertion, chunks pass through as is.
+    '''
+    def __init__(self, snippet: bytes | str, marker: bytes = b'</head>'):
+        self.snippet = snippet.encode() if isinstance(snippet, str) else snippet
+        self.marker = re.compile(re.escape(marker), re.IGNORECASE)
+        self.keep = len(marker) - 1
+        self.injected = False
+        self._tail = b''
+
+    def feed(self, data: memoryview, write: ty.Callable[[ty.Any], None]):
+        if self.injected:
+            write(data)
+            return
+        buf = self._tail + data if self._tail else data
+        m = self.marker.search(buf)
+        if m is None:
+            keep_from = max(len(buf) - self.keep, 0)
+            write(buf[:keep_from])
+            self._tail = bytes(buf[keep_from:])
+            return
+        write(buf[:m.start()])
+        write(self.snippet)
+        write(buf[m.start():])
+        self._tail = b''
+        self.injected = True
+
+    def finish(self, write: ty.Callable[[ty.Any], None]):
+        write(self._tail)
+        if not self.injected:
+            write(self.snippet)
+            self.injected = True
+
+
+class Capture(Transformer):
+    '''
+    Writes the body to |path| as it streams, and passes it through.
+    '''
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.size = 0
+        self._file = open(self.path, 'wb')
+
+    def feed(self, data: memoryview, write: ty.Callable[[ty.Any], None]):
+        self._file.write(data)
+        self.size += len(data)
+        write(data)
+
+    def finish(self, write: ty.Callable[[ty.Any], None]):
+        self._file.close()
+
+
+class _ResponseFilter:
+    '''
+    `cef_response_filter_t` driving |transformer| for one response.
+    '''
+    __slots__ = ('filters', 'transformer', 'pending', 'out', 'out_pos', 'out_full', 'finished', 'filter')
+
+    def __init__(self, filters: 'ResponseFilters', transformer: Transformer):
+        self.filters = filters
+        self.transformer = transformer
+        self.pending = bytearray()
+        self.out = _EMPTY
+        self.out_pos = 0
+        self.out_full = False
+        self.finished = False
+        self.filter = struct.cef_response_filter_t()
+        self.filter.base.size = ctypes.sizeof(struct.cef_response_filter_t)
+        _init_cef_base_ref_counted(self.filter, on_released=self.released)
+        _register_callback(self.filter, 'init_filter', self.init_filter)
+        _register_callback(self.filter, 'filter', self.run)
+
+    def init_filter(self):
+        return 1
+
+    def released(self, _):
+        if not self.finished:  # Cancelled. Lets the transformer clean up, e.g. `Capture` closes the file.
+            self.finished = True
+            self.transformer.finish(lambda _: None)
+
+    def write(self, data):
+        '''
+        Copies |data| into the output buffer, and keeps the overflow.
+        '''
+        n = len(data)
+        if not n:
+            return
+        if self.pending:
+            self.pending += data
+            return
+        space = len(self.out) - self.out_pos
+        if n <= space:
+            self.out[self.out_pos:self.out_pos + n] = data
+            self.out_pos += n
+            return
+        if space:
+            view = data if isinstance(data, memoryview) else memoryview(data)
+            self.out[self.out_pos:] = view[:space]
+            self.out_pos += space
+            data = view[space:]
+        self.pending += data
+
+    def run(
+            self,
+            data_in: int | None, data_in_size: int, data_in_read: ctypes.c_uint64,
+            data_out: int | None, data_out_size: int, data_out_written: ctypes.c_uint64):
+        self.out = _PyMemoryView_FromMemory(data_out, data_out_size, _PyBUF_WRITE) if data_out_size else _EMPTY
+        self.out_pos = 0
+        read = 0
+        try:
+            if self.pending:  # Backpressure: output first.
+                n = min(len(self.pending), data_out_size)
+                self.out[:n] = memoryview(self.pending)[:n]
+                del self.pending[:n]
+                self.out_pos = n
+            if not self.pending:
+                if data_in_size:
+                    self.transformer.feed(_PyMemoryView_FromMemory(data_in, data_in_size, _PyBUF_READ), self.write)
+                    read = data_in_size
+                elif not self.finished and not self.out_full:
+                    # CEF calls with no input at the end of the body, and also whenever the output buffer was
+                    # filled up, mid-body. Only the former follows a call leaving space.
+                    self.finished = True
+                    self.transformer.finish(self.write)
+        except Exception as e:
+            print(f'cef-capi-py ERROR: response filter: {e.__class__.__name__}: {e}')
+            return header.RESPONSE_FILTER_ERROR
+        finally:
+            self.out = _EMPTY
+        data_in_read.value = read
+        data_out_written.value = self.out_pos
+        self.out_full = self.out_pos == data_out_size > 0
+        self.filters.bytes_in += read
+        self.filters.bytes_out += self.out_pos
+        if self.pending or not self.finished:
+            return header.RESPONSE_FILTER_NEED_MORE_DATA
+        return header.RESPONSE_FILTER_DONE
+
+
+class ResponseFilters:
+    '''
+    Filters response bodies by the transformers of `factory(url, mime_type)`, None for no filter.
+    The factory is called on IO thread.
+    '''
+    def __init__(self, factory: ty.Callable[[str, str], Transformer | None]):
+        self.factory = factory
+        self.responses = 0
+        '''
+        The number of filtered responses.
+        '''
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def response_filter(self, transformer: Transformer) -> struct.cef_response_filter_t:
+        '''
+        Returns a new `cef_response_filter_t` driving |transformer| for one response, counted by this.
+        '''
+        self.responses += 1
+        return _ResponseFilter(self, transformer).filter
+
+    def register(self, resource_request_handler: struct.cef_resource_request_handler_t):
+        '''
+        Registers `get_resource_response_filter` to |resource_request_handler|.
+        '''
+        filters = self
+
+        @handler(resource_request_handler, ignore_arg_indices={0, 1, 2})
+        def get_resource_response_filter(request: struct.cef_request_t, response: struct.cef_response_t):
+            transformer = filters.factory(
+                _decode_userfree(request.get_url(request)), _decode_userfree(response.get_mime_type(response)))
+            if transformer is None:
+                return 0  # NULL: no filter.
+            return filters.response_filter(transformer)
+
+    def attach(self, client: struct.cef_client_t, *others):
+        '''
+        Registers `get_request_handler` to |client|. It replaces another `get_request_handler`,
+        e.g. of `PageReadyDetector.attach()`. |others| (e.g. `RuleEngine`) `register()` to the same
+        `cef_resource_request_handler_t`, built per request.
+        '''
+        _attach_resource_request_handler(client, [self.register] + [o.register for o in others])
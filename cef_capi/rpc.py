@@ -0,0 +1,137 @@
+'''
+JS-to-Python RPC over `cef_register_extension()` and one `cef_v8handler_t`.
+
+    rpc = RpcRegistry('py')
+
+    @rpc.expose()
+    def add(a, b):
+        return a + b
+
+    rpc.attach(app)  # Registers the extension in `on_web_kit_initialized`.
+
+JS calls `py.add(1, 2)` and gets `3`. Arguments and the result are converted by `cef_capi.v8value`.
+An exception of the Python function is thrown in JS as `Error` with `"TypeName: message"`.
+V8 extensions require `app_ctor(single_process=True)`.
+'''
+import re
+import ctypes
+import typing as ty
+from cef_capi import base_ctor, struct, header, handler, cef_string_ctor, cef_string_t, decode_cef_string, \
+    _encode_utf16
+from cef_capi.v8value import v8value_ctor, decode_v8_arguments
+
+_IDENTIFIER = re.compile(r'[A-Za-z_$][A-Za-z0-9_$]*')
+
+
+class RpcRegistry:
+    '''
+    Python functions exposed to JS as `{namespace}.{name}(...)`.
+
+    Register the functions before the extension is registered, i.e. before `cef_initialize()`
+    in single process mode. |extension_name| identifies the extension in CEF.
+    '''
+    def __init__(self, namespace: str = 'py', extension_name: str | None = None):
+        if not _IDENTIFIER.fullmatch(namespace):
+            raise Exception(f'Bad JS namespace: {namespace}')
+        self.namespace = namespace
+        self.extension_name = extension_name or f'v8/cef_capi_rpc_{namespace}'
+        self.calls = 0
+        '''
+        The number of dispatched calls.
+        '''
+        self._functions: dict[str, ty.Callable] = {}
+        self._registered = False
+        self.v8handler = base_ctor(struct.cef_v8handler_t)
+        functions = self._functions
+
+        @handler(self.v8handler, ignore_arg_indices={0, 2}, raw_arg_indices={4, 5})
+        def execute(
+                name: cef_string_t,
+                arguments_count: int,
+                arguments: ctypes._Pointer,  # ctypes.POINTER(ctypes.POINTER(struct.cef_v8value_t))
+                retval: ctypes._Pointer,  # ctypes.POINTER(ctypes.POINTER(struct.cef_v8value_t))
+                exception: cef_string_t):
+            # CEF builds |name| per call, so its pointer cannot be a key. The decoded str is.
+            func = functions.get(decode_cef_string(name))
+            if func is None:
+                return 0  # Not ours. V8 throws.
+            self.calls += 1
+            try:
+                retval[0] = v8value_ctor(func(*decode_v8_arguments(arguments_count, arguments)))
+            except Exception as e:
+                # CEF owns |exception|: copy into its own buffer, not one of Python freed after return.
+                _, p, length = _encode_utf16(f'{e.__class__.__name__}: {e}')
+                header.cef_string_utf16_set(p, length, exception, 1)
+            return 1
+
+    def expose(self, name: str | None = None) -> ty.Callable[[ty.Callable], ty.Callable]:
+        '''
+        Decorator exposing the function as |name| (the function name by default). Returns the function as is.
+        '''
+        def decorator(func: ty.Callable) -> ty.Callable:
+            self.register(func, name)
+            return func
+        return decorator
+
+    def register(self, func: ty.Callable, name: str | None = None):
+        '''
+        Exposes |func| as |name| (`func.__name__` by default).
+        '''
+        name = name or func.__name__
+        if not _IDENTIFIER.fullmatch(name):
+            raise Exception(f'Bad JS function name: {name}')
+        native = self._native_name(name)
+        if self._registered and native not in self._functions:
+            raise Exception(f'The extension is already registered. Cannot add {name}.')
+        self._functions[native] = func
+
+    def _native_name(self, name: str) -> str:
+        '''
+        The name of `native function` in the extension, unique among extensions.
+        '''
+        return f'__{self.namespace}_{name}'
+
+    def names(self) -> list[str]:
+        '''
+        Returns the exposed JS names.
+        '''
+        prefix = len(self._native_name(''))
+        return [native[prefix:] for native in self._functions]
+
+    def extension_source(self) -> str:
+        '''
+        Returns JS source of the extension, defining a wrapper per function.
+        '''
+        ns = self.namespace
+        lines = [f'var {ns} = {ns} || {{}};', '(function(){']
+        for name in self.names():
+            native = self._native_name(name)
+            lines.append(f'    {ns}.{name} = function(...args){{ native function {native}(); return {native}(...args); }};')
+        lines.append('})();')
+        return '\n'.join(lines)
+
+    def register_extension(self):
+        '''
+        Registers the extension. Call it in `cef_render_process_handler_t.on_web_kit_initialized`.
+        '''
+        self._registered = True
+        if not header.cef_register_extension(
+                cef_string_ctor(self.extension_name), cef_string_ctor(self.extension_source()),
+                self.v8handler):
+            raise Exception(f'Failed to register extension {self.extension_name}.')
+
+    def attach(self, app: struct.cef_app_t):
+        '''
+        Registers `get_render_process_handler` to |app|, which registers the extension.
+        '''
+        registry = self
+
+        @handler(app)
+        def get_render_process_handler(*_):
+            render_process_handler = base_ctor(struct.cef_render_process_handler_t)
+
+            @handler(render_process_handler)
+            def on_web_kit_initialized(*_):
+                registry.register_extension()
+
+            return render_process_handler
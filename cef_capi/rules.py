@@ -0,0 +1,346 @@
+'''
+Request blocking, redirecting and header rewriting by precompiled rules in
+`cef_resource_request_handler_t.on_before_resource_load`.
+
+    rules = RuleEngine()
+    rules.block(host='doubleclick.net')
+    rules.block(contains='/ads/', resource_types={header.RT_IMAGE, header.RT_SCRIPT})
+    rules.redirect('https://cdn.example.com/lib.js', host='cdn.example.com', contains='/lib.js')
+    rules.set_header('X-From', 'cef-capi', host='api.example.com')
+    rules.attach(client)
+
+A rule matches if all of its conditions hold: |host| matches the host and its subdomains,
+|contains| is a substring of the path and the query, and |resource_types| has the resource type.
+Rules compile into a host label trie and one Aho-Corasick automaton of every |contains|,
+so a request is evaluated in one pass over its host and one pass over its path, whatever the number of rules.
+Only the URL is decoded per request. The resource type is read only if a matched rule asks for it.
+'''
+import time
+import collections
+import typing as ty
+from dataclasses import dataclass
+from cef_capi import struct, header, handler, cef_string_ctor, STRING_CACHE, _decode_userfree, \
+    _attach_resource_request_handler
+
+BLOCK = 'block'
+REDIRECT = 'redirect'
+ALLOW = 'allow'
+SET_HEADER = 'set_header'
+
+
+@dataclass(frozen=True)
+class Rule:
+    '''
+    |to| is the URL or a function of the URL for `REDIRECT`. |header| and |value| are for `SET_HEADER`.
+    '''
+    action: str
+    host: str | None = None
+    contains: str | None = None
+    resource_types: frozenset[int] | None = None
+    to: str | ty.Callable[[str], str] | None = None
+    header: str | None = None
+    value: str | None = None
+    name: str = ''
+
+
+@dataclass(frozen=True)
+class Decision:
+    '''
+    The result of `RuleEngine.evaluate()`. |action| is None if neither blocked nor redirected.
+    '''
+    action: str | None
+    url: str
+    headers: tuple[tuple[str, str], ...]
+    rules: tuple[Rule, ...]
+
+
+def _split_url(url: str) -> tuple[str, str]:
+    '''
+    Returns the lowercase host and the rest after it (path, query and fragment) without full URL parsing.
+    '''
+    i = url.find('://')
+    if i < 0:
+        return '', url
+    start = i + 3
+    end = len(url)
+    for sep in '/?#':
+        j = url.find(sep, start, end)
+        if j >= 0:
+            end = j
+    host = url[start:end]
+    at = host.rfind('@')
+    if at >= 0:
+        host = host[at + 1:]
+    if host.startswith('['):
+        host = host[:host.find(']') + 1]
+    else:
+        colon = host.find(':')
+        if colon >= 0:
+            host = host[:colon]
+    return host.lower(), url[end:]
+
+
+class _AhoCorasick:
+    '''
+    Aho-Corasick automaton of |patterns|, compiled to a DFA: one dict lookup per char.
+    '''
+    def __init__(self, patterns: dict[str, list[int]]):
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[int, ...]] = [()]
+        for pattern, ids in patterns.items():
+            s = 0
+            for c in pattern:
+                t = goto[s].get(c)
+                if t is None:
+                    t = len(goto)
+                    goto.append({})
+                    out.append(())
+                    goto[s][c] = t
+                s = t
+            out[s] += tuple(ids)
+        fail = [0] * len(goto)
+        delta = [dict(g) for g in goto]
+        queue = collections.deque(goto[0].values())  # Breadth first: the fail state of each is done before it.
+        while queue:
+            r = queue.popleft()
+            f = fail[r]
+            delta[r] = {**delta[f], **goto[r]}
+            out[r] += out[f]
+            for c, s in goto[r].items():
+                fail[s] = delta[f].get(c, 0)
+                queue.append(s)
+        self.delta = delta
+        self.out = out
+
+    def search(self, text: str) -> list[int]:
+        '''
+        Returns the ids of every pattern occurring in |text|, with duplicates.
+        '''
+        delta = self.delta
+        out = self.out
+        hits: list[int] = []
+        s = 0
+        for c in text:
+            s = delta[s].get(c, 0)
+            if out[s]:
+                hits += out[s]
+        return hits
+
+
+class _Compiled:
+    def __init__(self, rules: list[Rule]):
+        self.rules = rules
+        self.host_trie: dict = {}
+        contains: dict[str, list[int]] = {}
+        self.required = []
+        self.always = []
+        for i, rule in enumerate(rules):
+            required = 0
+            if rule.host:
+                node = self.host_trie
+                for label in reversed(rule.host.lower().strip('.').split('.')):
+                    node = node.setdefault(label, {})
+                node.setdefault(None, []).append(i)
+                required += 1
+            if rule.contains:
+                contains.setdefault(rule.contains, []).append(i)
+                required += 1
+            if not required:
+                self.always.append(i)
+            self.required.append(required)
+        self.automaton = _AhoCorasick(contains) if contains else None
+
+    def match(self, url: str) -> list[int]:
+        '''
+        Returns the indices of rules whose host and path conditions hold, in order.
+        '''
+        host, rest = _split_url(url)
+        counts: dict[int, int] = {}
+        node = self.host_trie
+        if node:
+            for label in reversed(host.split('.')):
+                node = node.get(label)
+                if node is None:
+                    break
+                for i in node.get(None, ()):
+                    counts[i] = 1
+        if self.automaton is not None:
+            for i in set(self.automaton.search(rest)):
+                counts[i] = counts.get(i, 0) + 1
+        required = self.required
+        matched = [i for i, n in counts.items() if n == required[i]]
+        if self.always:
+            matched += self.always
+        matched.sort()
+        return matched
+
+
+class RuleEngine:
+    '''
+    Rules evaluated in order of addition. An `ALLOW` rule overrides `BLOCK` and `REDIRECT` rules.
+    Otherwise the first `BLOCK` or `REDIRECT` rule decides. Every `SET_HEADER` rule applies unless
+    the request is blocked or redirected. Rules can be added any time. They compile on the next request.
+    '''
+    def __init__(self):
+        self._rules: list[Rule] = []
+        self._compiled: _Compiled | None = None
+        self.hits: list[int] = []
+        '''
+        Hit counts per rule, in order of addition.
+        '''
+        self.evaluations = 0
+        self.evaluation_time = 0.
+        '''
+        Seconds spent in `on_before_resource_load`, including URL decoding.
+        '''
+        self.blocked = 0
+        self.redirected = 0
+
+    def add(self, rule: Rule) -> Rule:
+        '''
+        Adds |rule| and returns it.
+        '''
+        if rule.action not in (BLOCK, REDIRECT, ALLOW, SET_HEADER):
+            raise Exception(f'Unknown rule action: {rule.action}')
+        if rule.action == REDIRECT and rule.to is None:
+            raise Exception('Redirect rule requires |to|.')
+        if rule.action == SET_HEADER and (not rule.header or rule.value is None):
+            raise Exception('Header rule requires |header| and |value|.')
+        self._rules.append(rule)
+        self.hits.append(0)
+        self._compiled = None
+        return rule
+
+    def block(self, host: str | None = None, contains: str | None = None,
+              resource_types: ty.Iterable[int] | None = None, name: str = '') -> Rule:
+        '''
+        Cancels the request.
+        '''
+        return self.add(Rule(BLOCK, host, contains, _types(resource_types), name=name))
+
+    def allow(self, host: str | None = None, contains: str | None = None,
+              resource_types: ty.Iterable[int] | None = None, name: str = '') -> Rule:
+        '''
+        Exempts the request from `BLOCK` and `REDIRECT` rules.
+        '''
+        return self.add(Rule(ALLOW, host, contains, _types(resource_types), name=name))
+
+    def redirect(self, to: str | ty.Callable[[str], str], host: str | None = None, contains: str | None = None,
+                 resource_types: ty.Iterable[int] | None = None, name: str = '') -> Rule:
+        '''
+        Redirects to |to|, or to `to(url)`. Return the URL as is from the function to skip the redirect.
+        '''
+        return self.add(Rule(REDIRECT, host, contains, _types(resource_types), to=to, name=name))
+
+    def set_header(self, header_name: str, value: str, host: str | None = None, contains: str | None = None,
+                   resource_types: ty.Iterable[int] | None = None, name: str = '') -> Rule:
+        '''
+        Sets request header |header_name| to |value|, replacing the existing value.
+        '''
+        return self.add(Rule(SET_HEADER, host, contains, _types(resource_types), header=header_name, value=value,
+                             name=name))
+
+    def rules(self) -> list[Rule]:
+        return list(self._rules)
+
+    def stats(self) -> dict[str, int]:
+        '''
+        Returns hit counts by rule name (`"{index}:{action}"` if unnamed).
+        '''
+        return {rule.name or f'{i}:{rule.action}': hits for i, (rule, hits) in enumerate(zip(self._rules, self.hits))}
+
+    def _compile(self) -> _Compiled:
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self._compiled = _Compiled(list(self._rules))
+        return compiled
+
+    def _decide(self, url: str, resource_type: ty.Callable[[], int]) -> tuple[str | None, str, list[int]]:
+        '''
+        Returns the action, the URL to redirect to and the indices of the applied rules.
+        '''
+        compiled = self._compile()
+        rules = compiled.rules
+        applicable: list[int] = []
+        rt: int | None = None
+        for i in compiled.match(url):
+            types = rules[i].resource_types
+            if types is not None:
+                if rt is None:
+                    rt = resource_type()
+                if rt not in types:
+                    continue
+            applicable.append(i)
+        action = None
+        to = url
+        if any(rules[i].action == ALLOW for i in applicable):
+            applied = [i for i in applicable if rules[i].action in (ALLOW, SET_HEADER)]
+        else:
+            applied = [i for i in applicable if rules[i].action == SET_HEADER]
+            for i in applicable:
+                rule = rules[i]
+                if rule.action == REDIRECT:
+                    to = rule.to if isinstance(rule.to, str) else rule.to(url)  # type: ignore
+                    if to == url:
+                        continue
+                elif rule.action != BLOCK:
+                    continue
+                action = rule.action
+                applied = [i]
+                break
+        return action, to, applied
+
+    def evaluate(self, url: str, resource_type: int = header.RT_MAIN_FRAME) -> Decision:
+        '''
+        Evaluates the rules for |url| without CEF. Hits are not counted.
+        '''
+        action, to, applied = self._decide(url, lambda: resource_type)
+        matched = [self._rules[i] for i in applied]
+        headers = tuple((r.header, r.value) for r in matched if r.action == SET_HEADER)
+        return Decision(action, to, headers, tuple(matched))  # type: ignore
+
+    def register(self, resource_request_handler: struct.cef_resource_request_handler_t):
+        '''
+        Registers `on_before_resource_load` to |resource_request_handler|.
+        '''
+        engine = self
+
+        @handler(resource_request_handler, ignore_arg_indices={0, 1, 2, 4})
+        def on_before_resource_load(request: struct.cef_request_t):
+            t = time.perf_counter()
+            engine.evaluations += 1
+            url = _decode_userfree(request.get_url(request))
+            action, to, applied = engine._decide(url, lambda: request.get_resource_type(request))
+            rules = engine._rules  # Only appended to. Indices stay.
+            hits = engine.hits
+            for i in applied:
+                hits[i] += 1
+            if action == BLOCK:
+                engine.blocked += 1
+                ret = header.RV_CANCEL
+            elif action == REDIRECT:
+                engine.redirected += 1
+                request.set_url(request, cef_string_ctor(to))
+                ret = header.RV_CONTINUE
+            else:
+                for i in applied:
+                    rule = rules[i]
+                    if rule.action == SET_HEADER:
+                        request.set_header_by_name(
+                            request, cef_string_ctor(rule.header, cache=STRING_CACHE),
+                            cef_string_ctor(rule.value, cache=STRING_CACHE), 1)
+                ret = header.RV_CONTINUE
+            engine.evaluation_time += time.perf_counter() - t
+            return ret
+
+    def attach(self, client: struct.cef_client_t, *others):
+        '''
+        Registers `get_request_handler` to |client|. It replaces another `get_request_handler`,
+        e.g. of `ResponseFilters.attach()`. |others| (e.g. `ResponseFilters`) `register()` to the same
+        `cef_resource_request_handler_t`, built per request.
+        '''
+        _attach_resource_request_handler(client, [self.register] + [o.register for o in others])
+
+
+def _types(resource_types: ty.Iterable[int] | None) -> frozenset[int] | None:
+    return None if resource_types is None else frozenset(resource_types)
@@ -0,0 +1,389 @@
+'''
+In-process resource serving by `cef_scheme_handler_factory_t` and `cef_resource_handler_t`,
+instead of a localhost HTTP server.
+
+    server = SchemeServer('app')
+    server.add_directory('/', Path('webpage'))
+    server.add_blob('/data.json', b'{"a": 1}')
+    server.attach(app)  # Registers `app://` as a standard scheme in `on_register_custom_schemes`.
+    header.cef_initialize(main_args, settings, app, None)
+    server.register_handler_factory()
+
+`app://any-host/index.html` is served from `webpage/index.html`, without TCP, HTTP parsing and a thread per request.
+A single `Range: bytes=...` is answered by 206. The body is copied into `data_out` of `read()`
+in chunks of `bytes_to_read`: blobs by memmove, files by `readinto()`.
+
+`on_register_custom_schemes` must run in every process. It does not in the renderer of `app_ctor()`
+without `single_process`, which is the prebuilt cefsimple / cefclient. Serve a built-in scheme with a domain
+(`SchemeServer('https', 'app.local')`) then. It requires no registration.
+'''
+import os
+import time
+import ctypes
+import itertools
+import mimetypes
+import threading
+import typing as ty
+import urllib.parse
+from http import HTTPStatus
+from pathlib import Path
+from cef_capi import struct, header, handler, base_ctor, cef_string_ctor, STRING_CACHE, \
+    _init_cef_base_ref_counted, _register_callback, _PyMemoryView_FromMemory, _PyBUF_WRITE, _Pin, _decode_userfree, \
+    _request_header
+
+DEFAULT_OPTIONS = (
+    header.CEF_SCHEME_OPTION_STANDARD | header.CEF_SCHEME_OPTION_SECURE
+    | header.CEF_SCHEME_OPTION_CORS_ENABLED | header.CEF_SCHEME_OPTION_FETCH_ENABLED)
+
+_BUILTIN_SCHEMES = frozenset(('http', 'https', 'ws', 'wss', 'file', 'ftp', 'data', 'about', 'blob', 'javascript'))
+_UNSATISFIABLE = (-1, -1)
+_Lookup = ty.Callable[[str], ty.Any]
+
+
+def _byte_range(value: str, size: int) -> tuple[int, int] | None:
+    '''
+    Parses `Range` header |value| of a body of |size| bytes to `(start, end)`, end exclusive.
+    Returns None to serve the whole body (no, malformed or multiple ranges),
+    or `_UNSATISFIABLE`.
+    '''
+    unit, _, spec = value.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            n = int(last)
+            return (max(size - n, 0), size) if n > 0 and size > 0 else _UNSATISFIABLE
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start < 0 or (last and end <= start):
+        return None
+    if start >= size:
+        return _UNSATISFIABLE
+    return start, min(end, size)
+
+
+class Blob:
+    '''
+    In-memory body of |size| bytes at |address| in |pin|, e.g. of `AssetBundle.get()`.
+    |gzip| is `(address, size)` of the gzip-encoded variant, served if the request accepts it.
+    '''
+    __slots__ = ('pin', 'address', 'size', 'mime_type', 'etag', 'gzip')
+
+    def __init__(
+            self, pin: _Pin, address: int, size: int, mime_type: str,
+            etag: str | None = None, gzip: tuple[int, int] | None = None):
+        self.pin = pin
+        self.address = address
+        self.size = size
+        self.mime_type = mime_type
+        self.etag = etag
+        self.gzip = gzip
+
+
+class _File:
+    __slots__ = ('path', 'mime_type')
+
+    def __init__(self, path: Path, mime_type: str):
+        self.path = path
+        self.mime_type = mime_type
+
+
+def _mime_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+class _ResourceHandler:
+    '''
+    `cef_resource_handler_t` serving one request of |server|. Every call is on IO thread and completes synchronously.
+    '''
+    __slots__ = (
+        'server', 'path', 'opened', 'status', 'mime_type', 'headers', 'blob', 'address', 'file',
+        'start', 'offset', 'end', 'handler')
+
+    def __init__(self, server: 'SchemeServer'):
+        self.server = server
+        self.path = ''
+        self.opened = 0.
+        self.status = 404
+        self.mime_type = 'text/plain'
+        self.headers: list[tuple[str, str]] = []
+        self.blob: Blob | None = None
+        self.address = 0
+        self.file: ty.BinaryIO | None = None
+        self.start = 0
+        self.offset = 0
+        self.end = 0
+        self.handler = struct.cef_resource_handler_t()
+        self.handler.base.size = ctypes.sizeof(struct.cef_resource_handler_t)
+        _init_cef_base_ref_counted(self.handler, on_released=self.released)
+        _register_callback(self.handler, 'open', self.open, ignore_arg_indices={0, 3})
+        _register_callback(self.handler, 'get_response_headers', self.get_response_headers, ignore_arg_indices={0, 3})
+        _register_callback(self.handler, 'skip', self.skip, ignore_arg_indices={0, 3})
+        _register_callback(self.handler, 'read', self.read, ignore_arg_indices={0, 4})
+        _register_callback(self.handler, 'cancel', self.close)
+
+    def open(self, request: struct.cef_request_t, handle_request: ctypes.c_int32):
+        handle_request.value = 1  # Handled synchronously. `callback` is unused.
+        self.opened = time.perf_counter()
+        method = _decode_userfree(request.get_method(request))
+        path = urllib.parse.unquote(urllib.parse.urlsplit(_decode_userfree(request.get_url(request))).path) or '/'
+        self.path = path
+        resource = self.server.resolve(path)
+        if resource is None:
+            return 1
+        if method not in ('GET', 'HEAD'):
+            self.status = 405
+            self.headers.append(('Allow', 'GET, HEAD'))
+            return 1
+        if isinstance(resource, Blob):
+            self.blob = resource
+            self.address, size = resource.address, resource.size
+            if resource.gzip is not None:
+                self.headers.append(('Vary', 'Accept-Encoding'))
+                if _accepts_gzip(_request_header(request, 'Accept-Encoding')):
+                    self.address, size = resource.gzip
+                    self.headers.append(('Content-Encoding', 'gzip'))
+            if resource.etag is not None:
+                self.headers.append(('ETag', resource.etag))
+                if_none_match = _request_header(request, 'If-None-Match')
+                if if_none_match and (
+                        if_none_match.strip() == '*'
+                        or resource.etag in (tag.strip() for tag in if_none_match.split(','))):
+                    self.status = 304
+                    self.mime_type = resource.mime_type
+                    self.close()
+                    return 1
+        else:
+            try:
+                self.file = open(resource.path, 'rb')
+            except OSError:
+                return 1
+            size = os.fstat(self.file.fileno()).st_size
+        self.mime_type = resource.mime_type
+        self.headers.append(('Accept-Ranges', 'bytes'))
+        byte_range = _byte_range(_request_header(request, 'Range'), size)
+        if byte_range is _UNSATISFIABLE:
+            self.status = 416
+            self.headers.append(('Content-Range', f'bytes */{size}'))
+            self.close()
+            return 1
+        if byte_range is None:
+            self.status = 200
+            self.offset, self.end = 0, size
+        else:
+            self.status = 206
+            self.start, self.end = byte_range
+            self.offset = self.start
+            self.headers.append(('Content-Range', f'bytes {self.offset}-{self.end - 1}/{size}'))
+        if self.file is not None and self.offset:
+            self.file.seek(self.offset)
+        if method == 'HEAD':
+            self.headers.append(('Content-Length', str(self.end - self.offset)))
+            self.close()
+        return 1
+
+    def get_response_headers(self, response: struct.cef_response_t, response_length: ctypes.c_int64):
+        response.set_status(response, self.status)
+        response.set_status_text(response, cef_string_ctor(HTTPStatus(self.status).phrase, cache=STRING_CACHE))
+        response.set_mime_type(response, cef_string_ctor(self.mime_type, cache=STRING_CACHE))
+        for name, value in itertools.chain(self.server.headers.items(), self.headers):
+            response.set_header_by_name(response, cef_string_ctor(name, cache=STRING_CACHE), cef_string_ctor(value), 1)
+        response_length.value = self.end - self.offset
+
+    def skip(self, bytes_to_skip: int, bytes_skipped: ctypes.c_int64):
+        if bytes_to_skip == self.start == self.offset and self.start:
+            # CEF serves `Range` by skipping to its start too. `open()` is already there.
+            bytes_skipped.value = bytes_to_skip
+            return 1
+        n = min(bytes_to_skip, self.end - self.offset)
+        if n <= 0:
+            bytes_skipped.value = -2  # ERR_FAILED
+            return 0
+        self.offset += n
+        if self.file is not None:
+            self.file.seek(self.offset)
+        bytes_skipped.value = n
+        return 1
+
+    def read(self, data_out: int, bytes_to_read: int, bytes_read: ctypes.c_int32):
+        n = min(bytes_to_read, self.end - self.offset)
+        if n <= 0:
+            bytes_read.value = 0
+            if self.blob is not None or self.file is not None:
+                self.server._record_load_time(self.path, time.perf_counter() - self.opened)
+            self.close()
+            return 0  # Complete.
+        if self.blob is not None:
+            ctypes.memmove(data_out, self.address + self.offset, n)
+        else:
+            assert self.file is not None
+            n = self.file.readinto(_PyMemoryView_FromMemory(data_out, n, _PyBUF_WRITE))
+            if not n:  # Truncated since `open()`.
+                bytes_read.value = -2  # ERR_FAILED
+                self.close()
+                return 0
+        self.offset += n
+        bytes_read.value = n
+        return 1
+
+    def close(self):
+        self.end = self.offset
+        self.blob = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def released(self, _):
+        self.close()
+
+
+class SchemeServer:
+    '''
+    Serves blobs, files and directories for |scheme| URLs of |domain| (every domain if empty).
+    |options| are `cef_scheme_options_t` flags of the custom scheme registration.
+    Resources can be added any time. A path added later replaces the earlier one.
+    '''
+    def __init__(self, scheme: str = 'app', domain: str = '', options: int = DEFAULT_OPTIONS):
+        self.scheme = scheme.lower()
+        self.domain = domain
+        self.options = options
+        self.requests = 0
+        '''
+        The number of created `cef_resource_handler_t`.
+        '''
+        self.headers: dict[str, str] = {}
+        '''
+        Headers added to every response, e.g. `{'Cache-Control': 'no-store'}`.
+        '''
+        self._resources: dict[str, Blob | _File] = {}
+        self._mounts: list[tuple[str, str, _Lookup]] = []  # (prefix, index, lookup), longest prefix first.
+        self._load_times: dict[str, list] = {}  # path: [count, total, max]
+        self._lock = threading.Lock()
+        self.factory = base_ctor(struct.cef_scheme_handler_factory_t)
+
+        @handler(self.factory, ignore_arg_indices={0, 1, 2, 3, 4})
+        def create():
+            self.requests += 1
+            return _ResourceHandler(self).handler
+
+    def url(self, path: str = '/') -> str:
+        '''
+        Returns the URL of |path|.
+        '''
+        return f'{self.scheme}://{self.domain or self.scheme}{urllib.parse.quote(path)}'
+
+    def add_blob(self, path: str, data, mime_type: str | None = None):
+        '''
+        Serves C-contiguous buffer object |data| (e.g. `bytes`) at |path| without copying it.
+        |mime_type| is guessed from |path| by default.
+        '''
+        pin = _Pin(data)
+        self._resources[path] = Blob(pin, pin.address, pin.size, mime_type or _mime_type(path))
+
+    def add_file(self, path: str, file_path: str | Path, mime_type: str | None = None):
+        '''
+        Serves |file_path| at |path|. The file is opened per request.
+        '''
+        self._resources[path] = _File(Path(file_path), mime_type or _mime_type(str(file_path)))
+
+    def add_directory(self, prefix: str, directory: str | Path, index: str = 'index.html'):
+        '''
+        Serves files under |directory| at the paths under |prefix|, and |index| for the paths ending with `/`.
+        Paths escaping |directory| are not found.
+        '''
+        root = os.path.realpath(directory)
+
+        def lookup(rel: str) -> _File | None:
+            file_path = os.path.realpath(os.path.join(root, rel))
+            if os.path.commonpath((root, file_path)) == root and os.path.isfile(file_path):
+                return _File(Path(file_path), _mime_type(file_path))
+            return None
+
+        self._mount(prefix, index, lookup)
+
+    def add_bundle(self, prefix: str, bundle, index: str = 'index.html'):
+        '''
+        Serves `cef_capi.asset_bundle.AssetBundle` |bundle| at the paths under |prefix|,
+        and |index| for the paths ending with `/`.
+        '''
+        self._mount(prefix, index, lambda rel: bundle.get('/' + rel))
+
+    def _mount(self, prefix: str, index: str, lookup: _Lookup):
+        prefix = '/' + prefix.strip('/') + '/' if prefix.strip('/') else '/'
+        with self._lock:
+            self._mounts = sorted(
+                [m for m in self._mounts if m[0] != prefix] + [(prefix, index, lookup)],
+                key=lambda m: len(m[0]), reverse=True)
+
+    def resolve(self, path: str) -> Blob | _File | None:
+        '''
+        Returns the resource at URL |path|, or None.
+        '''
+        resource = self._resources.get(path)
+        if resource is not None:
+            return resource
+        for prefix, index, lookup in self._mounts:
+            if not path.startswith(prefix):
+                continue
+            rel = path[len(prefix):]
+            if not rel or rel.endswith('/'):
+                rel += index
+            resource = lookup(rel)
+            if resource is not None:
+                return resource
+        return None
+
+    def _record_load_time(self, path: str, seconds: float):
+        t = self._load_times.get(path)
+        if t is None:
+            self._load_times[path] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+
+    def load_times(self) -> dict[str, tuple[int, float, float]]:
+        '''
+        Returns `{path: (count, mean, max)}` of completed responses in seconds, from `open()` to the last `read()`.
+        '''
+        return {path: (count, total / count, max_) for path, (count, total, max_) in list(self._load_times.items())}
+
+    def register_custom_scheme(self, registrar: struct.cef_scheme_registrar_t):
+        '''
+        Registers |scheme| with |options|. Call it in `cef_app_t.on_register_custom_schemes`. Built-in schemes are skipped.
+        '''
+        if self.scheme in _BUILTIN_SCHEMES:
+            return
+        if not registrar.add_custom_scheme(registrar, cef_string_ctor(self.scheme), self.options):
+            raise Exception(f'Failed to register custom scheme {self.scheme}.')
+
+    def attach(self, app: struct.cef_app_t):
+        '''
+        Registers `on_register_custom_schemes` to |app|, which registers |scheme|.
+        '''
+        server = self
+
+        @handler(app)
+        def on_register_custom_schemes(registrar: struct.cef_scheme_registrar_t):
+            server.register_custom_scheme(registrar)
+
+    def register_handler_factory(self):
+        '''
+        Registers the factory for |scheme| and |domain|. Call it after `cef_initialize()` in browser process.
+        '''
+        if not header.cef_register_scheme_handler_factory(
+                cef_string_ctor(self.scheme), cef_string_ctor(self.domain), self.factory):
+            raise Exception(f'Failed to register scheme handler factory for {self.scheme}.')
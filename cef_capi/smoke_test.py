@@ -6,12 +6,13 @@ import sys
 import os
 import time
 import threading
-from itertools import product
 from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from multiprocessing import Process
 
 from cef_capi import base_ctor, struct, header, cef_string_ctor, handler, size_ctor, task_factory, decode_cef_string, cef_string_t
 from cef_capi.app_client import client_ctor, app_ctor, settings_main_args_ctor
+from cef_capi import frame
+from cef_capi.page_ready import PageReadyDetector
 
 VIEWPORT_SIZE = (800, 600)
 COLOR_SHOULD_BE = (0, 0x80, 0, 0xff)  # BGRA green
@@ -112,6 +113,17 @@ def _main(server_port: str, check_v8_extension=False):
         sys.exit(1)
 
 
+def _is_solid_color(saved_frame) -> bool:
+    '''
+    Checks all pixels of |saved_frame| are COLOR_SHOULD_BE, by one vectorized comparison.
+    |saved_frame| is `FrameRing` frame, or bytes without NumPy.
+    '''
+    if isinstance(saved_frame, bytes):
+        return saved_frame == bytes(COLOR_SHOULD_BE) * (VIEWPORT_SIZE[0] * VIEWPORT_SIZE[1])
+    return saved_frame.shape == (VIEWPORT_SIZE[1], VIEWPORT_SIZE[0], 4) and \
+        bool((saved_frame == COLOR_SHOULD_BE).all())
+
+
 def _smoke_test_screenshot_check(url: str, check_v8_extension: bool):
     '''
     Takes a screenshot and checks |url| page for smoke test.
@@ -199,8 +211,9 @@ def _smoke_test_screenshot_check(url: str, check_v8_extension: bool):
 
     client = client_ctor()
 
-    # Given bitmap of on_paint() handler.
-    saved_buffer: ctypes.c_void_p | None = None
+    # Copy of the bitmap given to on_paint() handler. The buffer itself is valid only in on_paint().
+    frame_ring = frame.FrameRing(*VIEWPORT_SIZE, size=1) if frame.np is not None else None
+    saved_frame = None
 
     @handler(client)
     def get_render_handler(*_):
@@ -216,9 +229,13 @@ def _smoke_test_screenshot_check(url: str, check_v8_extension: bool):
                 buffer: ctypes.c_void_p,
                 width: int,
                 height: int):
-            nonlocal saved_buffer
+            nonlocal saved_frame
             if element_type == header.PET_VIEW:
-                saved_buffer = buffer
+                if frame_ring is not None:
+                    saved_frame = frame_ring.copy(buffer, width, height)
+                else:
+                    saved_frame = ctypes.string_at(buffer, width * height * 4)
+                detector.paint()
 
         @handler(render_handler)
         @handle_exception
@@ -238,7 +255,7 @@ def _smoke_test_screenshot_check(url: str, check_v8_extension: bool):
     @task_factory
     @handle_exception
     def check_screenshot(retry_count=0):
-        if saved_buffer is None:
+        if saved_frame is None:
             if retry_count < MAX_RETRY:
                 header.cef_post_delayed_task(
                     header.TID_UI,
@@ -247,22 +264,23 @@ def _smoke_test_screenshot_check(url: str, check_v8_extension: bool):
                 retry_count += 1
                 return
             else:
-                raise Exception(f'{prefix}saved_buffer is None')
-        bstr = ctypes.string_at(saved_buffer, VIEWPORT_SIZE[0] * VIEWPORT_SIZE[1] * 4)
-        for x, y, bgra in product(range(VIEWPORT_SIZE[0]), range(VIEWPORT_SIZE[1]), range(4)):
-            i = (x + y * VIEWPORT_SIZE[0]) * 4 + bgra
-            if bstr[i] != COLOR_SHOULD_BE[bgra]:
-                if retry_count < MAX_RETRY:
-                    header.cef_post_delayed_task(
-                        header.TID_UI,
-                        check_screenshot(retry_count=retry_count + 1),
-                        500)
-                    retry_count += 1
-                    return
-                print(f'{prefix}ERROR: bad pixel in screenshot')
-                raise Exception(f'{prefix}Screenshot has wrong colored pixel.')
+                raise Exception(f'{prefix}saved_frame is None')
+        if not _is_solid_color(saved_frame):
+            if retry_count < MAX_RETRY:
+                header.cef_post_delayed_task(
+                    header.TID_UI,
+                    check_screenshot(retry_count=retry_count + 1),
+                    500)
+                retry_count += 1
+                return
+            print(f'{prefix}ERROR: bad pixel in screenshot')
+            raise Exception(f'{prefix}Screenshot has wrong colored pixel.')
         header.cef_post_task(header.TID_UI, exit_app())
 
+    # Checks as soon as the page is painted and stable. The retries above remain for slow paints.
+    detector = PageReadyDetector(
+        on_ready=lambda _: header.cef_post_task(header.TID_UI, check_screenshot()), network_idle_time=None)
+
     @handler(client)
     def get_load_handler(*_):
         load_handler = base_ctor(struct.cef_load_handler_t)
@@ -277,7 +295,7 @@ def _smoke_test_screenshot_check(url: str, check_v8_extension: bool):
             nonlocal saved_browser
             if not is_loading:
                 saved_browser = browser
-                header.cef_post_delayed_task(header.TID_UI, check_screenshot(), 500)
+            detector.loading_state_change(bool(is_loading), browser)
 
         @handler(load_handler)
         @handle_exception
@@ -303,6 +321,7 @@ def _smoke_test_screenshot_check(url: str, check_v8_extension: bool):
 
     browser_settings = size_ctor(struct.cef_browser_settings_t)
 
+    detector.start()
     header.cef_browser_host_create_browser(
         window_info,
         client,
@@ -0,0 +1,176 @@
+'''
+Converters between Python and `cef_string_list_t`, `cef_string_map_t` and `cef_string_multimap_t`.
+
+Each converter reuses scratch `cef_string_t` for the whole pass: CEF frees the previous value
+of the scratch when it writes a new one, so no `cef_string_t` is allocated per element.
+`CefStringMapView` and `CefStringMultimapView` decode on access, good for large header sets.
+'''
+import ctypes
+import typing as ty
+from collections.abc import Mapping
+from cef_capi import header, cef_string_t, cef_string_ctor, _decode_cef_string_at
+
+
+class _Scratch:
+    '''
+    `cef_string_t` written by CEF repeatedly. `clear()` frees the last value.
+    '''
+    __slots__ = ('s', 'p', 'addr', '_clear')
+
+    def __init__(self):
+        self.s = cef_string_t()
+        self.p = ctypes.pointer(self.s)
+        self.addr = ctypes.addressof(self.s)
+        self._clear = header.cef_string_utf16_clear  # Still callable in `__del__()` at interpreter exit.
+
+    def decode(self) -> str:
+        return _decode_cef_string_at(self.addr) or ''
+
+    def clear(self):
+        self._clear(self.p)
+
+
+def decode_cef_string_multimap(mm) -> dict[str, list[str]]:
+    '''
+    Converts `cef_string_multimap_t` to dict of str list in one pass.
+    '''
+    multimap_key = header.cef_string_multimap_key
+    multimap_value = header.cef_string_multimap_value
+    k = _Scratch()
+    v = _Scratch()
+    ret: dict[str, list[str]] = {}
+    try:
+        for i in range(header.cef_string_multimap_size(mm)):
+            multimap_key(mm, i, k.p)
+            multimap_value(mm, i, v.p)
+            ret.setdefault(k.decode(), []).append(v.decode())
+    finally:
+        k.clear()
+        v.clear()
+    return ret
+
+
+def cef_string_list_ctor(strings: ty.Iterable[str], lst=None):
+    '''
+    Converts str iterable to `cef_string_list_t`. Appends to |lst| if given.
+    Free the returned list by `header.cef_string_list_free()` unless CEF takes it.
+    '''
+    if lst is None:
+        lst = header.cef_string_list_alloc()
+    append = header.cef_string_list_append
+    u = cef_string_t()
+    p = ctypes.pointer(u)
+    for s in strings:
+        cef_string_ctor(s, u)
+        append(lst, p)  # CEF copies the value.
+    return lst
+
+
+def cef_string_map_ctor(d: ty.Mapping[str, str], m=None):
+    '''
+    Converts str dict to `cef_string_map_t`. Appends to |m| if given.
+    Free the returned map by `header.cef_string_map_free()` unless CEF takes it.
+    '''
+    if m is None:
+        m = header.cef_string_map_alloc()
+    append = header.cef_string_map_append
+    k = cef_string_t()
+    v = cef_string_t()
+    k_p = ctypes.pointer(k)
+    v_p = ctypes.pointer(v)
+    for key, value in d.items():
+        cef_string_ctor(key, k)
+        cef_string_ctor(value, v)
+        append(m, k_p, v_p)
+    return m
+
+
+def cef_string_multimap_ctor(d: ty.Mapping[str, ty.Iterable[str]], mm=None):
+    '''
+    Converts dict of str iterable to `cef_string_multimap_t`. Appends to |mm| if given.
+    Free the returned multimap by `header.cef_string_multimap_free()` unless CEF takes it.
+    '''
+    if mm is None:
+        mm = header.cef_string_multimap_alloc()
+    append = header.cef_string_multimap_append
+    k = cef_string_t()
+    v = cef_string_t()
+    k_p = ctypes.pointer(k)
+    v_p = ctypes.pointer(v)
+    for key, values in d.items():
+        cef_string_ctor(key, k)
+        for value in values:
+            cef_string_ctor(value, v)
+            append(mm, k_p, v_p)
+    return mm
+
+
+class CefStringMapView(Mapping):
+    '''
+    Read-only view of `cef_string_map_t`. Decodes on access.
+    The view does not own the map. Do not use it after CEF frees the map,
+    and use it on one thread at a time.
+    '''
+    def __init__(self, m):
+        self._m = m
+        self._k = _Scratch()
+        self._v = _Scratch()
+
+    def __getitem__(self, key: str) -> str:
+        if not header.cef_string_map_find(self._m, cef_string_ctor(key), self._v.p):
+            raise KeyError(key)
+        return self._v.decode()
+
+    def __len__(self) -> int:
+        return header.cef_string_map_size(self._m)
+
+    def __iter__(self) -> ty.Iterator[str]:
+        map_key = header.cef_string_map_key
+        for i in range(len(self)):
+            map_key(self._m, i, self._k.p)
+            yield self._k.decode()
+
+    def __del__(self):
+        self._k.clear()
+        self._v.clear()
+
+
+class CefStringMultimapView(Mapping):
+    '''
+    Read-only view of `cef_string_multimap_t`. Decodes on access. A key maps to the list of its values.
+    The view does not own the multimap. Do not use it after CEF frees the multimap,
+    and use it on one thread at a time.
+    '''
+    def __init__(self, mm):
+        self._mm = mm
+        self._k = _Scratch()
+        self._v = _Scratch()
+
+    def __getitem__(self, key: str) -> list[str]:
+        k = cef_string_ctor(key)
+        count = header.cef_string_multimap_find_count(self._mm, k)
+        if count == 0:
+            raise KeyError(key)
+        enumerate_ = header.cef_string_multimap_enumerate
+        ret = []
+        for i in range(count):
+            enumerate_(self._mm, k, i, self._v.p)
+            ret.append(self._v.decode())
+        return ret
+
+    def __len__(self) -> int:
+        return len(set(iter(self)))
+
+    def __iter__(self) -> ty.Iterator[str]:
+        multimap_key = header.cef_string_multimap_key
+        seen = set()
+        for i in range(header.cef_string_multimap_size(self._mm)):
+            multimap_key(self._mm, i, self._k.p)
+            key = self._k.decode()
+            if key not in seen:
+                seen.add(key)
+                yield key
+
+    def __del__(self):
+        self._k.clear()
+        self._v.clear()
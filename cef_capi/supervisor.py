@@ -0,0 +1,428 @@
+'''
+Multi-process sharding of `RenderFarm`.
+
+CEF can initialize only once per process. `Supervisor` starts K worker processes, each running
+`RenderFarm` with its own `root_cache_path`, and spreads URLs to the least loaded worker.
+Jobs and results go over pipes. A worker which exits or stops sending heartbeats from its UI thread
+is killed and restarted with exponential backoff, and its in-flight URLs are retried on the other workers.
+A worker restarted too often in a while is retired instead.
+
+    with Supervisor(workers=4, concurrency=4) as supervisor:
+        futures = supervisor.map(urls)
+        images = [f.result().image for f in futures]
+'''
+import os
+import time
+import shutil
+import tempfile
+import threading
+import typing as ty
+import multiprocessing
+from multiprocessing import connection
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+
+def _worker_main(conn, root_cache_path: str, heartbeat_interval: float, farm_kwargs: dict):
+    '''
+    Entry point of a worker process. Runs `RenderFarm` until the supervisor sends `drain`.
+    '''
+    from cef_capi.render_farm import RenderFarm
+    send_lock = threading.Lock()
+
+    def send(msg: tuple):
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (OSError, EOFError):
+                pass  # The supervisor is gone. `reader()` drains.
+
+    last_beat = 0.
+
+    def on_tick():
+        nonlocal last_beat
+        now = time.monotonic()
+        if now - last_beat >= heartbeat_interval:
+            last_beat = now
+            send(('heartbeat',))
+
+    farm = RenderFarm(root_cache_path=root_cache_path, on_tick=on_tick, **farm_kwargs)
+
+    def send_result(job_id: int, f: Future):
+        e = f.exception()
+        if e is None:
+            send(('result', job_id, f.result(), None))
+        else:
+            send(('result', job_id, None, str(e)))
+
+    def reader():
+        while True:
+            try:
+                msg = conn.recv()
+            except (OSError, EOFError):
+                msg = ('drain',)
+            match msg[0]:
+                case 'job':
+                    _, job_id, url = msg
+                    try:
+                        future = farm.submit(url)
+                    except Exception as e:
+                        send(('result', job_id, None, str(e)))
+                        continue
+                    future.add_done_callback(lambda f, job_id=job_id: send_result(job_id, f))
+                case 'drain':
+                    farm.shutdown()
+                    return
+
+    threading.Thread(target=reader, daemon=True).start()
+    send(('ready', os.getpid()))
+    farm.serve(close_when_idle=False)
+
+
+@dataclass(frozen=True)
+class WorkerStats:
+    '''
+    Health metrics of a worker process. |heartbeat_age| is seconds since the last heartbeat
+    from its UI thread. |restarts| counts restarts after crash or hang.
+    |retired| is True after too many restarts. The worker is not restarted any more.
+    '''
+    index: int
+    pid: int | None
+    alive: bool
+    ready: bool
+    in_flight: int
+    done: int
+    failed: int
+    restarts: int
+    heartbeat_age: float
+    uptime: float
+    retired: bool
+
+
+class _Job:
+    __slots__ = ('url', 'future', 'attempts')
+
+    def __init__(self, url: str, future: Future):
+        self.url = url
+        self.future = future
+        self.attempts = 0
+
+
+class _Worker:
+    def __init__(self, index: int, root_cache_path: str):
+        self.index = index
+        self.root_cache_path = root_cache_path
+        self.process: ty.Any = None
+        self.conn: ty.Any = None
+        self.pid: int | None = None
+        self.ready = False
+        self.draining = False
+        self.in_flight: dict[int, _Job] = {}
+        self.done = 0
+        self.failed = 0
+        self.restarts = 0
+        self.restart_times: deque[float] = deque()
+        self.respawn_at: float | None = None
+        self.retired = False
+        self.started_at = 0.
+        self.last_heartbeat = 0.
+
+
+class Supervisor:
+    '''
+    Runs |workers| `RenderFarm` processes (`os.cpu_count()` by default) and spreads URLs by load.
+
+    |max_in_flight| bounds URLs sent to a worker at once. The rest wait in the supervisor.
+    A worker without heartbeat for |heartbeat_timeout| seconds is considered hung.
+    A URL is tried |max_attempts| times at most over worker crashes.
+    A crashed or hung worker is respawned after |restart_backoff| seconds, doubled for each earlier restart
+    in the last |restart_window| seconds up to |max_restart_backoff|. A worker is retired after
+    |max_restarts| restarts in |restart_window| seconds. When all are retired, queued URLs fail.
+    |root_cache_dir| holds `root_cache_path` of each worker. A temporary directory by default.
+    |farm_kwargs| go to `RenderFarm`. They should be picklable.
+    '''
+    def __init__(
+            self,
+            workers: int | None = None,
+            max_in_flight: int = 16,
+            heartbeat_interval: float = 1.,
+            heartbeat_timeout: float = 30.,
+            max_attempts: int = 2,
+            restart_backoff: float = .5,
+            max_restart_backoff: float = 30.,
+            max_restarts: int = 5,
+            restart_window: float = 300.,
+            root_cache_dir: str | None = None,
+            **farm_kwargs):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.farm_kwargs = farm_kwargs
+        self._root_cache_dir = root_cache_dir
+        self._temporary_cache_dir = False
+        self._ctx = multiprocessing.get_context('spawn')  # The supervisor has threads. Do not fork it.
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._workers: list[_Worker] = []
+        self._backlog: deque[_Job] = deque()
+        self._next_job_id = 0
+        self._accepting = False
+        self._stopping = False
+        self._monitor: threading.Thread | None = None
+
+    def __enter__(self) -> 'Supervisor':
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
+
+    def start(self):
+        '''
+        Starts the worker processes and the monitor thread.
+        '''
+        if self._root_cache_dir is None:
+            self._root_cache_dir = tempfile.mkdtemp(prefix='cef-capi-supervisor-')
+            self._temporary_cache_dir = True
+        with self._lock:
+            for i in range(self.worker_count):
+                w = _Worker(i, os.path.join(self._root_cache_dir, f'worker-{i}'))
+                self._workers.append(w)
+                self._spawn(w)
+            self._accepting = True
+        self._monitor = threading.Thread(target=self._monitor_main, name='cef-capi-supervisor', daemon=True)
+        self._monitor.start()
+
+    def submit(self, url: str) -> Future:
+        '''
+        Queues |url|. Thread-safe. Returns `Future` of `RenderResult`.
+        '''
+        future: Future = Future()
+        with self._lock:
+            if not self._accepting:
+                raise Exception('Supervisor is not accepting jobs.')
+            self._backlog.append(_Job(url, future))
+            self._dispatch()
+        return future
+
+    def map(self, urls: ty.Iterable[str]) -> list[Future]:
+        '''
+        Queues all of |urls|.
+        '''
+        return [self.submit(url) for url in urls]
+
+    def stats(self) -> list[WorkerStats]:
+        '''
+        Returns health metrics of the workers.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            return [WorkerStats(
+                index=w.index,
+                pid=w.pid,
+                alive=w.process is not None and w.process.is_alive(),
+                ready=w.ready,
+                in_flight=len(w.in_flight),
+                done=w.done,
+                failed=w.failed,
+                restarts=w.restarts,
+                heartbeat_age=now - w.last_heartbeat,
+                uptime=now - w.started_at,
+                retired=w.retired) for w in self._workers]
+
+    def backlog(self) -> int:
+        '''
+        Returns the number of URLs waiting for a worker.
+        '''
+        with self._lock:
+            return len(self._backlog)
+
+    def shutdown(self, drain: bool = True, timeout: float | None = None):
+        '''
+        Stops accepting URLs. If |drain|, waits for the queued and in-flight URLs (up to |timeout| seconds).
+        Then lets the workers close their browsers and exit. Unfinished URLs fail.
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._accepting = False
+            if drain:
+                while self._backlog or any(w.in_flight for w in self._workers):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._idle.wait(remaining)
+            self._stopping = True
+            workers = list(self._workers)
+            for w in workers:
+                w.draining = True
+                self._send(w, ('drain',))
+        for w in workers:
+            if w.process is None:
+                continue
+            remaining = None if deadline is None else max(0., deadline - time.monotonic())
+            w.process.join(remaining if drain else 0.)
+            if w.process.is_alive():
+                w.process.kill()
+                w.process.join()
+        if self._monitor is not None:
+            self._monitor.join()
+        failed: list[_Job] = []
+        with self._lock:
+            failed.extend(self._backlog)
+            self._backlog.clear()
+            for w in workers:
+                failed.extend(w.in_flight.values())
+                w.in_flight.clear()
+                if w.conn is not None:
+                    w.conn.close()
+        for job in failed:
+            job.future.set_exception(Exception(f'Supervisor shut down: {job.url}'))
+        if self._temporary_cache_dir and self._root_cache_dir is not None:
+            shutil.rmtree(self._root_cache_dir, ignore_errors=True)
+
+    def _spawn(self, w: _Worker):
+        parent_conn, child_conn = self._ctx.Pipe()
+        w.process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, w.root_cache_path, self.heartbeat_interval, self.farm_kwargs),
+            name=f'cef-capi-worker-{w.index}',
+            daemon=True)
+        w.process.start()
+        child_conn.close()
+        w.conn = parent_conn
+        w.pid = w.process.pid
+        w.ready = False
+        w.draining = False
+        w.started_at = w.last_heartbeat = time.monotonic()
+
+    def _send(self, w: _Worker, msg: tuple) -> bool:
+        try:
+            w.conn.send(msg)
+            return True
+        except (OSError, EOFError):
+            return False  # The monitor restarts the worker.
+
+    def _dispatch(self):
+        '''
+        Sends backlog URLs to the least loaded workers. Call it with `_lock`.
+        '''
+        while self._backlog:
+            candidates = [
+                w for w in self._workers
+                if not w.draining and w.process is not None and len(w.in_flight) < self.max_in_flight]
+            if not candidates:
+                return
+            w = min(candidates, key=lambda w: len(w.in_flight))
+            job = self._backlog.popleft()
+            if not job.future.running() and not job.future.set_running_or_notify_cancel():
+                continue  # Cancelled.
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            if not self._send(w, ('job', job_id, job.url)):
+                self._backlog.appendleft(job)
+                w.draining = True  # Until the monitor restarts it.
+                continue
+            job.attempts += 1
+            w.in_flight[job_id] = job
+
+    def _monitor_main(self):
+        while True:
+            with self._lock:
+                if self._stopping and all(w.process is None or not w.process.is_alive() for w in self._workers):
+                    return
+                conns = {w.conn: w for w in self._workers if w.conn is not None and not w.conn.closed}
+                sentinels = {w.process.sentinel: w for w in self._workers if w.process is not None}
+                timeout = self.heartbeat_interval
+                for w in self._workers:
+                    if w.respawn_at is not None:
+                        timeout = max(0., min(timeout, w.respawn_at - time.monotonic()))
+            ready = connection.wait(list(conns) + list(sentinels), timeout=timeout)
+            resolved: list[tuple[Future, ty.Any, str | None]] = []
+            with self._lock:
+                for o in ready:
+                    if o in conns:
+                        self._receive(conns[o], resolved)
+                now = time.monotonic()
+                for w in self._workers:
+                    if w.respawn_at is not None and now >= w.respawn_at and not self._stopping:
+                        w.respawn_at = None
+                        self._spawn(w)
+                    if w.process is None:
+                        continue
+                    crashed = not w.process.is_alive()
+                    hung = now - w.last_heartbeat > self.heartbeat_timeout
+                    if (crashed or hung) and not self._stopping:
+                        self._restart(w, 'crashed' if crashed else 'hung', resolved)
+                self._dispatch()
+                self._idle.notify_all()
+            for future, result, error in resolved:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(Exception(error))
+
+    def _receive(self, w: _Worker, resolved: list):
+        '''
+        Handles all pending messages from |w|. Call it with `_lock`.
+        '''
+        try:
+            while w.conn.poll():
+                msg = w.conn.recv()
+                match msg[0]:
+                    case 'ready':
+                        w.ready = True
+                        w.pid = msg[1]
+                        w.last_heartbeat = time.monotonic()
+                    case 'heartbeat':
+                        w.last_heartbeat = time.monotonic()
+                    case 'result':
+                        _, job_id, result, error = msg
+                        job = w.in_flight.pop(job_id, None)
+                        if job is None:
+                            continue
+                        if error is None:
+                            w.done += 1
+                        else:
+                            w.failed += 1
+                        resolved.append((job.future, result, error))
+        except (OSError, EOFError):
+            w.conn.close()  # The sentinel tells the exit.
+
+    def _restart(self, w: _Worker, reason: str, resolved: list):
+        '''
+        Kills |w| and schedules its respawn with backoff, or retires it after too many restarts.
+        Its in-flight URLs go back to the backlog or fail. Call it with `_lock`.
+        '''
+        if w.process.is_alive():
+            w.process.kill()
+        w.process.join()
+        w.process = None
+        w.conn.close()
+        for job in w.in_flight.values():
+            if job.attempts < self.max_attempts:
+                self._backlog.appendleft(job)
+            else:
+                resolved.append((job.future, None, f'Worker {w.index} {reason}: {job.url}'))
+        w.in_flight.clear()
+        now = time.monotonic()
+        while w.restart_times and now - w.restart_times[0] > self.restart_window:
+            w.restart_times.popleft()
+        if len(w.restart_times) >= self.max_restarts:
+            w.retired = True
+            w.draining = True
+            if all(o.retired for o in self._workers):
+                resolved.extend((job.future, None, f'All workers retired: {job.url}') for job in self._backlog)
+                self._backlog.clear()
+                self._accepting = False
+            return
+        delay = min(self.restart_backoff * 2 ** len(w.restart_times), self.max_restart_backoff)
+        w.restart_times.append(now)
+        w.restarts += 1
+        w.respawn_at = now + delay
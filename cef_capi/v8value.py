@@ -0,0 +1,409 @@
+'''
+Converters between Python objects and `cef_v8value_t`, for `cef_v8handler_t.execute` and friends.
+
+    retval[0] = v8value_ctor({'rows': rows, 'total': len(rows)})
+    args = decode_v8_arguments(arguments_count, arguments)
+
+Python `dict` / `list` / `tuple` / `str` / `int` / `float` / `bool` / `None` / `bytes` map to
+JS object / array / array / string / number / number / boolean / null / ArrayBuffer. `undefined` decodes to None,
+and integral numbers decode to int. A `cef_v8value_t` pointer in |o|, e.g. of `array_buffer_ctor()`, is used as is.
+
+`array_buffer_ctor()` exposes a writable Python buffer (`bytearray`, `memoryview`, NumPy array...)
+to JS as ArrayBuffer without copying. The object stays pinned until V8 calls the release callback.
+
+Reading `cef_v8value_t.is_string` and the like from the struct builds a ctypes function object per access.
+These converters read the function table of the first value once, and call the raw function pointers
+with plain int addresses through the whole tree. The type of each element picks its converter
+by one dict lookup. A str, e.g. a key repeated in rows, is encoded once per conversion,
+and object keys are read into a scratch `cef_string_t` per depth and looked up without re-encoding.
+Call them on the thread of the V8 context, as any V8 API.
+'''
+import ctypes
+import threading
+import typing as ty
+from cef_capi import struct, header, handler, base_ctor, UTF16_ENCODING, _CefStringRaw, _decode_cef_string_at, \
+    _BufferExport, _PyBUF_WRITABLE, _INT32_MIN, _INT32_MAX
+
+_UINT32_MAX = 2 ** 32 - 1
+_V8VALUE_P = ctypes.POINTER(struct.cef_v8value_t)
+
+
+def _raw_argtype(t):
+    return ctypes.c_void_p if t is not None and issubclass(t, (ctypes._Pointer, ctypes.c_void_p)) else t
+
+
+def _raw_prototype(proto) -> type:
+    '''
+    `CFUNCTYPE` like |proto|, taking and returning addresses as int instead of pointer objects.
+    '''
+    return ctypes.CFUNCTYPE(_raw_argtype(proto._restype_), *map(_raw_argtype, proto._argtypes_))
+
+
+def _raw_function(func) -> ty.Callable:
+    '''
+    Rebinds C function |func| (e.g. `header.cef_v8value_create_int`) by `_raw_prototype()`.
+    '''
+    proto = ctypes.CFUNCTYPE(_raw_argtype(func.restype), *map(_raw_argtype, func.argtypes))
+    return proto(ctypes.cast(func, ctypes.c_void_p).value)
+
+
+_METHODS = (
+    'is_undefined', 'is_null', 'is_bool', 'is_double', 'is_string', 'is_object', 'is_array', 'is_array_buffer',
+    'get_bool_value', 'get_double_value', 'get_string_value', 'get_keys', 'get_value_bykey', 'get_value_byindex',
+    'set_value_bykey', 'set_value_byindex', 'get_array_length', 'get_array_buffer_byte_length',
+    'get_array_buffer_data')
+_METHOD_OFFSETS = tuple((name, getattr(struct.cef_v8value_t, name).offset) for name in _METHODS)
+_METHOD_PROTOTYPES = {name: _raw_prototype(t) for name, t in struct.cef_v8value_t._fields_ if name in _METHODS}
+_RELEASE_PROTOTYPE = _raw_prototype(dict(struct.cef_base_ref_counted_t._fields_)['release'])
+_RELEASE_OFFSET = struct.cef_v8value_t.base.offset + struct.cef_base_ref_counted_t.release.offset
+_VTABLE_KEY_OFFSET = struct.cef_v8value_t.is_valid.offset
+
+
+class _V8ValueVtable:
+    '''
+    Raw functions of `cef_v8value_t`, read from a value. Every value of CEF shares them.
+    '''
+    __slots__ = _METHODS + ('release',)
+
+    def __init__(self, addr: int):
+        for name, offset in _METHOD_OFFSETS:
+            setattr(self, name, _METHOD_PROTOTYPES[name](ctypes.c_void_p.from_address(addr + offset).value))
+        self.release = _RELEASE_PROTOTYPE(ctypes.c_void_p.from_address(addr + _RELEASE_OFFSET).value)
+
+
+_VTABLES: dict[int, _V8ValueVtable] = {}
+
+
+def _vtable(addr: int) -> _V8ValueVtable:
+    key = ctypes.c_void_p.from_address(addr + _VTABLE_KEY_OFFSET).value or 0
+    vt = _VTABLES.get(key)
+    if vt is None:
+        vt = _VTABLES[key] = _V8ValueVtable(addr)
+    return vt
+
+
+class _Functions:
+    '''
+    Raw global functions. Bound on first use, after the header is loaded.
+    '''
+    def __init__(self):
+        self.create_undefined = _raw_function(header.cef_v8value_create_undefined)
+        self.create_null = _raw_function(header.cef_v8value_create_null)
+        self.create_bool = _raw_function(header.cef_v8value_create_bool)
+        self.create_int = _raw_function(header.cef_v8value_create_int)
+        self.create_uint = _raw_function(header.cef_v8value_create_uint)
+        self.create_double = _raw_function(header.cef_v8value_create_double)
+        self.create_string = _raw_function(header.cef_v8value_create_string)
+        self.create_object = _raw_function(header.cef_v8value_create_object)
+        self.create_array = _raw_function(header.cef_v8value_create_array)
+        self.create_array_buffer = _raw_function(header.cef_v8value_create_array_buffer)
+        self.create_array_buffer_with_copy = _raw_function(header.cef_v8value_create_array_buffer_with_copy)
+        self.string_userfree_free = _raw_function(header.cef_string_userfree_utf16_free)
+        self.string_list_alloc = _raw_function(header.cef_string_list_alloc)
+        self.string_list_size = _raw_function(header.cef_string_list_size)
+        self.string_list_value = _raw_function(header.cef_string_list_value)
+        self.string_list_clear = _raw_function(header.cef_string_list_clear)
+        self.string_list_free = _raw_function(header.cef_string_list_free)
+        self.string_clear = _raw_function(header.cef_string_utf16_clear)
+
+
+_FUNCTIONS: _Functions | None = None
+
+
+def _functions() -> _Functions:
+    global _FUNCTIONS
+    if _FUNCTIONS is None:
+        _FUNCTIONS = _Functions()
+    return _FUNCTIONS
+
+
+def _checked(addr: int | None) -> int:
+    if not addr:
+        raise Exception('Failed to create V8 value. Call it in V8 context, e.g. in `cef_v8handler_t.execute`.')
+    return addr
+
+
+class _Encoder:
+    '''
+    One Python to V8 conversion. Holds the encoded str until the end of it.
+    '''
+    def __init__(self):
+        self.f = _functions()
+        self.strings: dict[str, tuple[_CefStringRaw, bytes]] = {}
+        self.vt: _V8ValueVtable | None = None
+        self.table: dict[type, ty.Callable[[ty.Any], int]] = {
+            dict: self.object,
+            list: self.array,
+            tuple: self.array,
+            str: self.string,
+            int: self.int,
+            float: self.double,
+            bool: self.bool,
+            type(None): self.null,
+            bytes: self.array_buffer,
+            bytearray: self.array_buffer,
+            memoryview: self.array_buffer,
+            _V8VALUE_P: self.v8value,
+        }
+
+    def encode(self, o) -> int:
+        encoder = self.table.get(type(o))
+        if encoder is None:
+            encoder = self.fallback(o)
+        return encoder(o)
+
+    def fallback(self, o) -> ty.Callable[[ty.Any], int]:
+        '''
+        Finds the converter of a base class (e.g. `IntEnum`, `OrderedDict`) and caches it for the type.
+        '''
+        for t in type(o).__mro__[1:]:
+            encoder = self.table.get(t)
+            if encoder is not None:
+                self.table[type(o)] = encoder
+                return encoder
+        raise Exception(f'Cannot convert {type(o).__name__} to V8 value.')
+
+    def cef_string(self, s: str) -> int:
+        '''
+        Returns the address of `cef_string_t` of |s|, encoded once per conversion.
+        '''
+        e = self.strings.get(s)
+        if e is None:
+            b = s.encode(UTF16_ENCODING)
+            e = self.strings[s] = (
+                _CefStringRaw(ctypes.cast(ctypes.c_char_p(b), ctypes.c_void_p).value, len(b) // 2, None), b)
+        return ctypes.addressof(e[0])
+
+    def vtable(self, addr: int) -> _V8ValueVtable:
+        if self.vt is None:
+            self.vt = _vtable(addr)
+        return self.vt
+
+    def object(self, d: ty.Mapping) -> int:
+        addr = _checked(self.f.create_object(None, None))
+        set_value_bykey = self.vtable(addr).set_value_bykey
+        encode = self.encode
+        cef_string = self.cef_string
+        attribute = header.V8_PROPERTY_ATTRIBUTE_NONE
+        for k, v in d.items():
+            if not isinstance(k, str):
+                k = str(k)  # As `JSON.stringify()` does.
+            set_value_bykey(addr, cef_string(k), encode(v), attribute)
+        return addr
+
+    def array(self, a: ty.Sequence) -> int:
+        addr = _checked(self.f.create_array(len(a)))
+        set_value_byindex = self.vtable(addr).set_value_byindex
+        encode = self.encode
+        for i, v in enumerate(a):
+            set_value_byindex(addr, i, encode(v))
+        return addr
+
+    def string(self, s: str) -> int:
+        return _checked(self.f.create_string(self.cef_string(s)))
+
+    def int(self, i: int) -> int:
+        if _INT32_MIN <= i <= _INT32_MAX:
+            return _checked(self.f.create_int(i))
+        if 0 <= i <= _UINT32_MAX:
+            return _checked(self.f.create_uint(i))
+        return _checked(self.f.create_double(float(i)))
+
+    def double(self, d: float) -> int:
+        return _checked(self.f.create_double(d))
+
+    def bool(self, b: bool) -> int:
+        return _checked(self.f.create_bool(1 if b else 0))
+
+    def null(self, _) -> int:
+        return _checked(self.f.create_null())
+
+    def array_buffer(self, b: bytes | bytearray | memoryview) -> int:
+        return _array_buffer_with_copy(self.f, b)
+
+    def v8value(self, p: ctypes._Pointer) -> int:
+        return _checked(ctypes.cast(p, ctypes.c_void_p).value)
+
+
+def v8value_ctor(o) -> ctypes._Pointer:
+    '''
+    Converts Python object |o| to a new `cef_v8value_t`, e.g. for `retval[0]` of `cef_v8handler_t.execute`.
+    Nested `dict` / `list` are converted recursively. Call it in V8 context.
+    '''
+    return ctypes.cast(_Encoder().encode(o), _V8VALUE_P)
+
+
+def _array_buffer_with_copy(f: _Functions, o) -> int:
+    export = _BufferExport(o)
+    try:
+        return _checked(f.create_array_buffer_with_copy(export.view.buf, export.view.len))
+    finally:
+        export.release()
+
+
+_PINNED_LOCK = threading.Lock()
+_PINNED: dict[int, _BufferExport] = {}
+
+
+def array_buffer_ctor(o, copy: bool = False) -> ctypes._Pointer:
+    '''
+    Creates ArrayBuffer `cef_v8value_t` of C-contiguous buffer object |o|. Call it in V8 context.
+
+    Without |copy|, ArrayBuffer refers to the memory of |o|, and |o| is pinned until V8 releases
+    ArrayBuffer by garbage collection. Writes from JS reach |o|. A read-only object like `bytes` is copied,
+    as JS may write into ArrayBuffer.
+    |copy| copies once into V8 heap and pins nothing, good for short-lived or small buffers.
+    '''
+    f = _functions()
+    if copy:
+        return ctypes.cast(_array_buffer_with_copy(f, o), _V8VALUE_P)
+    try:
+        export = _BufferExport(o, _PyBUF_WRITABLE)
+    except BufferError:
+        return ctypes.cast(_array_buffer_with_copy(f, o), _V8VALUE_P)
+    if export.view.len == 0:
+        export.release()
+        return ctypes.cast(_checked(f.create_array_buffer_with_copy(None, 0)), _V8VALUE_P)
+    release_callback = base_ctor(struct.cef_v8array_buffer_release_callback_t)
+    key = ctypes.addressof(release_callback)
+
+    def unpin():
+        with _PINNED_LOCK:
+            _PINNED.pop(key, None)
+        export.release()
+
+    @handler(release_callback)
+    def release_buffer(_):
+        unpin()
+
+    with _PINNED_LOCK:
+        _PINNED[key] = export
+    p = f.create_array_buffer(export.view.buf, export.view.len, key)
+    if not p:
+        unpin()
+        _checked(p)
+    return ctypes.cast(p, _V8VALUE_P)
+
+
+def pinned_array_buffers() -> int:
+    '''
+    Returns the number of objects pinned by `array_buffer_ctor()` and not yet released by V8.
+    '''
+    with _PINNED_LOCK:
+        return len(_PINNED)
+
+
+class _Decoder:
+    '''
+    One V8 to Python conversion. Object keys go through a scratch `cef_string_list_t` / `cef_string_t` per depth.
+    '''
+    def __init__(self):
+        self.f = _functions()
+        self.scratches: list[tuple[int, _CefStringRaw]] = []
+        self.depth = 0
+
+    def close(self):
+        for lst, s in self.scratches:
+            self.f.string_list_free(lst)
+            self.f.string_clear(ctypes.addressof(s))
+        self.scratches.clear()
+
+    def decode(self, addr: int):
+        vt = _vtable(addr)
+        if vt.is_string(addr):
+            p = vt.get_string_value(addr)
+            if not p:
+                return ''  # Empty string.
+            try:
+                return _decode_cef_string_at(p) or ''
+            finally:
+                self.f.string_userfree_free(p)
+        if vt.is_double(addr):  # True for int and uint too.
+            d = vt.get_double_value(addr)
+            return int(d) if d.is_integer() else d
+        if vt.is_bool(addr):
+            return bool(vt.get_bool_value(addr))
+        if vt.is_null(addr) or vt.is_undefined(addr):
+            return None
+        if vt.is_array(addr):
+            return self.array(vt, addr)
+        if vt.is_array_buffer(addr):
+            return ctypes.string_at(vt.get_array_buffer_data(addr), vt.get_array_buffer_byte_length(addr))
+        if vt.is_object(addr):
+            return self.object(vt, addr)  # Functions and dates too: their own keys.
+        raise Exception('Cannot convert V8 value to Python.')
+
+    def child(self, vt: _V8ValueVtable, addr: int | None):
+        '''
+        Decodes and releases a value returned by `get_value_by*()`.
+        '''
+        if not addr:
+            return None
+        try:
+            return self.decode(addr)
+        finally:
+            vt.release(addr)
+
+    def array(self, vt: _V8ValueVtable, addr: int) -> list:
+        get_value_byindex = vt.get_value_byindex
+        child = self.child
+        return [child(vt, get_value_byindex(addr, i)) for i in range(vt.get_array_length(addr))]
+
+    def object(self, vt: _V8ValueVtable, addr: int) -> dict:
+        if self.depth == len(self.scratches):
+            self.scratches.append((_checked(self.f.string_list_alloc()), _CefStringRaw()))
+        lst, s = self.scratches[self.depth]
+        s_addr = ctypes.addressof(s)
+        string_list_value = self.f.string_list_value
+        get_value_bykey = vt.get_value_bykey
+        child = self.child
+        ret = {}
+        self.depth += 1
+        try:
+            vt.get_keys(addr, lst)
+            for i in range(self.f.string_list_size(lst)):
+                string_list_value(lst, i, s_addr)  # CEF frees the previous value of |s|.
+                ret[_decode_cef_string_at(s_addr) or ''] = child(vt, get_value_bykey(addr, s_addr))
+        finally:
+            self.depth -= 1
+            self.f.string_list_clear(lst)
+        return ret
+
+
+def _v8value_address(v: struct.cef_v8value_t | ctypes._Pointer | int) -> int:
+    if isinstance(v, int):
+        addr = v
+    elif isinstance(v, struct.cef_v8value_t):
+        addr = ctypes.addressof(v)
+    elif isinstance(v, ctypes._Pointer):
+        addr = ctypes.cast(v, ctypes.c_void_p).value or 0
+    else:
+        raise Exception(f'decode_v8value() got wrong arg: {v}')
+    if not addr:
+        raise Exception('NULL pointer.')
+    return addr
+
+
+def decode_v8value(v: struct.cef_v8value_t | ctypes._Pointer | int):
+    '''
+    Converts `cef_v8value_t` |v| to Python object recursively. |v| itself is not released.
+    '''
+    decoder = _Decoder()
+    try:
+        return decoder.decode(_v8value_address(v))
+    finally:
+        decoder.close()
+
+
+def decode_v8_arguments(arguments_count: int, arguments: ctypes._Pointer) -> list:
+    '''
+    Converts |arguments| of `cef_v8handler_t.execute` (given with `raw_arg_indices`) to Python list.
+    '''
+    if arguments_count == 0:
+        return []
+    addrs = ctypes.cast(arguments, ctypes.POINTER(ctypes.c_void_p * arguments_count)).contents
+    decoder = _Decoder()
+    try:
+        return [decoder.decode(addr) if addr else None for addr in addrs]
+    finally:
+        decoder.close()
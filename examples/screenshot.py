@@ -4,6 +4,7 @@ import ctypes
 from PIL import Image as PilImageModule
 from cef_capi import cef_string_ctor, size_ctor, base_ctor, task_factory, handler, header, struct, decode_cef_string, cef_string_t, __version__
 from cef_capi.app_client import client_ctor, app_ctor, settings_main_args_ctor
+from cef_capi.page_ready import PageReadyDetector, PageReadyTimings
 
 
 VIEWPORT_SIZE = (800, 600)
@@ -28,8 +29,8 @@ def main():
 
     client = client_ctor()
 
-    # Given bitmap of on_paint() handler.
-    saved_buffer: ctypes.c_void_p | None = None
+    # Copy of the bitmap of on_paint() handler. The buffer is valid only during the call.
+    saved_frame: bytes | None = None
 
     @handler(client)
     def get_render_handler(*_):
@@ -59,10 +60,11 @@ def main():
             an upper-left origin. This function is only called when
             cef_window_tInfo::shared_texture_enabled is set to false (0).
             '''
-            nonlocal saved_buffer
+            nonlocal saved_frame
             print('on_paint')
             if element_type == header.PET_VIEW:
-                saved_buffer = buffer
+                saved_frame = ctypes.string_at(buffer, width * height * 4)
+                detector.paint()
 
         @handler(render_handler)
         def get_view_rect(
@@ -99,29 +101,31 @@ def main():
             ctypes.POINTER(struct.cef_browser_host_t))
         browser_host_p.contents.close_browser(browser_host_p, 0)
 
-    MAX_RETRY = 4
-
     @task_factory
-    def save_screenshot(retry_count=0):  # The arg from ctor
+    def save_screenshot():
         print('save_screenshot')
-        if saved_buffer is None:
-            if retry_count < MAX_RETRY:
-                print('save_screenshot retry...')
-                header.cef_post_delayed_task(
-                    header.TID_UI,
-                    save_screenshot(retry_count + 1),  # The arg to function
-                    500)
-                retry_count += 1
-                return
-            else:
-                raise Exception('save_screenshot timeout.')
-        bstr = ctypes.string_at(saved_buffer, VIEWPORT_SIZE[0] * VIEWPORT_SIZE[1] * 4)
-        pil_image = PilImageModule.frombytes('RGBA', (VIEWPORT_SIZE[0], VIEWPORT_SIZE[1]), bstr, 'raw', 'BGRA')
+        if saved_frame is None:
+            raise Exception('No frame is painted.')
+        pil_image = PilImageModule.frombytes('RGBA', (VIEWPORT_SIZE[0], VIEWPORT_SIZE[1]), saved_frame, 'raw', 'BGRA')
         pil_image.save(SCREENSHOT_PATH)
         print(f"Screenshot image saved: {SCREENSHOT_PATH}")
         # See comments in exit_app() why post_task must be used
         header.cef_post_task(header.TID_UI, exit_app())
 
+    def on_ready(timings: PageReadyTimings):
+        '''
+        Called when loading is complete, the network is idle and on_paint() has settled,
+        instead of waiting for a fixed delay.
+        '''
+        print(f"Page ready: {timings}")
+        # See comments in exit_app() why post_task must be used
+        header.cef_post_task(header.TID_UI, save_screenshot())
+
+    detector = PageReadyDetector(on_ready=on_ready)
+    # Request and display handlers of the detector. get_load_handler() below replaces its load handler
+    # to handle on_load_error() too, so it feeds on_loading_state_change() to the detector.
+    detector.attach(client)
+
     @handler(client)
     def get_load_handler(*_):
         '''
@@ -144,13 +148,10 @@ def main():
             '''
             nonlocal saved_browser
             print('on_loading_state_change')
+            saved_browser = browser
             if not is_loading:
                 print("Web page loading is complete")
-                # Give up to 200 ms for the OnPaint call. Most of the time
-                # it is already called, but sometimes it may be called later.
-                # In the case, `save_screenshot` retries.
-                saved_browser = browser
-                header.cef_post_delayed_task(header.TID_UI, save_screenshot(), 200)
+            detector.loading_state_change(bool(is_loading), browser)
 
         @handler(load_handler)
         def on_load_error(
@@ -186,6 +187,7 @@ def main():
 
     browser_settings = size_ctor(struct.cef_browser_settings_t)
 
+    detector.start()
     header.cef_browser_host_create_browser(
         window_info,
         client,
@@ -0,0 +1,226 @@
+'''
+Fakes of CEF functions for the tests. The libcef of the tests does nothing, and a real one must not free memory
+owned by Python, so the strings CEF allocates come from `FakeCefStrings` here. It checks every free.
+'''
+import ctypes
+import functools
+import itertools
+import typing as ty
+import pytest
+from cef_capi import base_ctor, header, struct, cef_string_t, _decode_cef_string_at, _encode_utf16
+
+
+def address(p) -> int:
+    '''
+    Returns the address of pointer, `byref()` or instance |p|.
+    '''
+    if isinstance(p, int):
+        return p
+    if isinstance(p, ctypes._Pointer):
+        return ctypes.cast(p, ctypes.c_void_p).value or 0
+    if isinstance(p, (ctypes.Structure, ctypes.Union, ctypes.Array, ctypes._SimpleCData)):
+        return ctypes.addressof(p)
+    return ctypes.addressof(p._obj)  # `byref()`
+
+
+class FakeCefStrings:
+    '''
+    `cef_string_utf16_set()` / `clear()`, userfree strings, and string lists, maps and multimaps
+    over memory kept here. Freeing what was not allocated here fails.
+    '''
+    def __init__(self):
+        self.buffers: dict[int, ctypes.Array] = {}
+        '''
+        UTF-16 buffers owned by "CEF", i.e. set with |copy|.
+        '''
+        self.userfree: dict[int, cef_string_t] = {}
+        '''
+        Userfree strings not freed yet.
+        '''
+        self.collections: dict[int, list] = {}
+        self._handles = itertools.count(0x1000, 0x10)
+
+    def functions(self) -> dict:
+        return {
+            'cef_string_utf16_set': self.set,
+            'cef_string_utf16_clear': self.clear,
+            'cef_string_userfree_utf16_alloc': self.userfree_alloc,
+            'cef_string_userfree_utf16_free': self.userfree_free,
+            'cef_string_list_alloc': lambda: self.alloc(header.cef_string_list_t),
+            'cef_string_list_size': self.size,
+            'cef_string_list_value': self.list_value,
+            'cef_string_list_append': self.list_append,
+            'cef_string_list_free': self.free,
+            'cef_string_map_alloc': lambda: self.alloc(header.cef_string_map_t),
+            'cef_string_map_size': self.size,
+            'cef_string_map_find': self.find,
+            'cef_string_map_key': self.key,
+            'cef_string_map_value': self.value,
+            'cef_string_map_append': self.append,
+            'cef_string_map_free': self.free,
+            'cef_string_multimap_alloc': lambda: self.alloc(header.cef_string_multimap_t),
+            'cef_string_multimap_size': self.size,
+            'cef_string_multimap_find_count': self.find_count,
+            'cef_string_multimap_enumerate': self.enumerate,
+            'cef_string_multimap_key': self.key,
+            'cef_string_multimap_value': self.value,
+            'cef_string_multimap_append': self.append,
+            'cef_string_multimap_free': self.free,
+        }
+
+    # Strings.
+
+    def set(self, src, length: int, output, copy: int) -> int:
+        self.clear(output)
+        out = cef_string_t.from_address(address(output))
+        if copy:
+            buf = (ctypes.c_uint16 * (length + 1)).from_buffer_copy(ctypes.string_at(src, length * 2) + b'\0\0')
+            self.buffers[ctypes.addressof(buf)] = buf
+            out.str = ctypes.cast(buf, type(out.str))
+        else:
+            out.str = ctypes.cast(src, type(out.str))
+        out.length = length
+        return 1
+
+    def set_str(self, s: str, output):
+        _, p, length = _encode_utf16(s)
+        self.set(p, length, output, 1)
+
+    def clear(self, output):
+        out = cef_string_t.from_address(address(output))
+        self.buffers.pop(ctypes.cast(out.str, ctypes.c_void_p).value or 0, None)
+        out.str = None
+        out.length = 0
+
+    def owns(self, s) -> bool:
+        '''
+        Whether the buffer of `cef_string_t` |s| was copied by `set()`.
+        '''
+        out = cef_string_t.from_address(address(s))
+        return (ctypes.cast(out.str, ctypes.c_void_p).value or 0) in self.buffers
+
+    def userfree_alloc(self) -> ctypes._Pointer:
+        s = cef_string_t()
+        self.userfree[ctypes.addressof(s)] = s
+        return ctypes.pointer(s)
+
+    def userfree_free(self, p):
+        addr = address(p)
+        if addr not in self.userfree:
+            raise AssertionError(f'Freed {addr:#x}, not a userfree string of CEF.')
+        self.clear(addr)
+        del self.userfree[addr]
+
+    def new_userfree(self, s: str) -> int:
+        '''
+        Returns the address of a new userfree string of |s|, e.g. as `cef_request_t.get_url()` returns.
+        '''
+        p = self.userfree_alloc()
+        self.set_str(s, p)
+        return address(p)
+
+    # Lists, maps and multimaps: lists of values or (key, value).
+
+    def alloc(self, handle_t: type | None = None):
+        '''
+        Returns a new handle of |handle_t|, e.g. `cef_string_list_t` as CEF does, or of int by default.
+        '''
+        handle = next(self._handles)
+        self.collections[handle] = []
+        return handle if handle_t is None else ctypes.cast(handle, handle_t)
+
+    def collection(self, handle) -> list:
+        return self.collections[address(handle)]
+
+    def free(self, handle):
+        del self.collections[address(handle)]
+
+    def size(self, handle) -> int:
+        return len(self.collection(handle))
+
+    def list_append(self, handle, value):
+        self.collection(handle).append(_decode_cef_string_at(address(value)) or '')
+
+    def list_value(self, handle, index: int, output) -> int:
+        self.set_str(self.collection(handle)[index], output)
+        return 1
+
+    def append(self, handle, key, value) -> int:
+        self.collection(handle).append(
+            (_decode_cef_string_at(address(key)) or '', _decode_cef_string_at(address(value)) or ''))
+        return 1
+
+    def key(self, handle, index: int, output) -> int:
+        self.set_str(self.collection(handle)[index][0], output)
+        return 1
+
+    def value(self, handle, index: int, output) -> int:
+        self.set_str(self.collection(handle)[index][1], output)
+        return 1
+
+    def _values(self, handle, key) -> list[str]:
+        k = _decode_cef_string_at(address(key)) or ''
+        return [v for kk, v in self.collection(handle) if kk == k]
+
+    def find(self, handle, key, output) -> int:
+        values = self._values(handle, key)
+        if not values:
+            return 0
+        self.set_str(values[0], output)
+        return 1
+
+    def find_count(self, handle, key) -> int:
+        return len(self._values(handle, key))
+
+    def enumerate(self, handle, key, index: int, output) -> int:
+        self.set_str(self._values(handle, key)[index], output)
+        return 1
+
+
+@pytest.fixture
+def cef_strings(monkeypatch) -> FakeCefStrings:
+    fake = FakeCefStrings()
+    for name, f in fake.functions().items():
+        monkeypatch.setattr(header, name, f)
+    return fake
+
+
+def request_ctor(
+        cef_strings: FakeCefStrings, url: str, headers: dict[str, str] | None = None, method: str = 'GET',
+        identifier: int = 1, resource_type: int = header.RT_MAIN_FRAME) -> struct.cef_request_t:
+    '''
+    `cef_request_t` whose getters return userfree strings of |cef_strings|, as CEF does.
+    `set_url()` and `set_header_by_name()` update `r.url` and `r.headers`.
+    '''
+    r = base_ctor(struct.cef_request_t)
+    r.url = url
+    r.headers = dict(headers or {})
+
+    def header_by_name(name) -> str:
+        name = (_decode_cef_string_at(address(name)) or '').lower()
+        return next((v for k, v in r.headers.items() if k.lower() == name), '')
+
+    def set_url(_, url):
+        r.url = _decode_cef_string_at(address(url)) or ''
+
+    def set_header_by_name(_, name, value, overwrite):
+        name = _decode_cef_string_at(address(name)) or ''
+        if overwrite or name not in r.headers:
+            r.headers[name] = _decode_cef_string_at(address(value)) or ''
+
+    r.get_url = type(r.get_url)(lambda _: cef_strings.new_userfree(r.url))
+    r.get_method = type(r.get_method)(lambda _: cef_strings.new_userfree(method))
+    r.get_header_by_name = type(r.get_header_by_name)(lambda _, name: cef_strings.new_userfree(header_by_name(name)))
+    r.get_identifier = type(r.get_identifier)(lambda _: identifier)
+    r.get_resource_type = type(r.get_resource_type)(lambda _: resource_type)
+    r.set_url = type(r.set_url)(set_url)
+    r.set_header_by_name = type(r.set_header_by_name)(set_header_by_name)
+    return r
+
+
+@pytest.fixture
+def cef_request(cef_strings) -> ty.Callable[..., struct.cef_request_t]:
+    '''
+    `request_ctor()` over the `cef_strings` fixture. Check `cef_strings.userfree` for the strings left unfreed.
+    '''
+    return functools.partial(request_ctor, cef_strings)
@@ -0,0 +1,35 @@
+import gzip
+import ctypes
+from cef_capi.scheme import SchemeServer
+from cef_capi.asset_bundle import AssetBundle, build_bundle, GZIP_MIN_SIZE
+
+
+def test_round_trip(tmp_path):
+    html = b'<p>hello</p>\n' * GZIP_MIN_SIZE
+    files = {'index.html': html, 'img/a.png': bytes(range(256)), 'js/app.js': b'1;'}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    output = tmp_path / 'site.bundle'  # In the directory. Not packed.
+    assert build_bundle(tmp_path, output) == 3
+    assert build_bundle(tmp_path, output) == 3
+
+    bundle = AssetBundle(output)
+    assert bundle.paths == ['/img/a.png', '/index.html', '/js/app.js']
+    for name, data in files.items():
+        assert bundle.data('/' + name) == data
+    assert bundle.get('/missing') is None and bundle.data('/index') is None
+
+    index = bundle.get('/index.html')
+    assert index.mime_type == 'text/html' and index.size == len(html)
+    address, size = index.gzip
+    assert gzip.decompress(ctypes.string_at(address, size)) == html
+    assert bundle.get('/js/app.js').gzip is None  # Too small.
+    assert bundle.get('/img/a.png').gzip is None  # Not compressible.
+    assert bundle.get('/img/a.png').etag != bundle.get('/js/app.js').etag
+
+    server = SchemeServer('app')
+    server.add_bundle('/static', bundle)
+    assert server.resolve('/static/').address == index.address
+    assert server.resolve('/static/js/app.js').size == 2
+    assert server.resolve('/js/app.js') is None
@@ -0,0 +1,144 @@
+'''
+The trampoline and the generic dispatcher of `_register_callback()` must behave the same.
+Each case calls the registered member function through C and records what the handler got and returned.
+'''
+import sys
+import ctypes
+import pytest
+from cef_capi import base_ctor, handler, struct, _register_callback
+
+
+def on_paint_case(trampoline: bool):
+    render_handler = base_ctor(struct.cef_render_handler_t)
+    got = []
+
+    @handler(render_handler, trampoline=trampoline)
+    def on_paint(browser, element_type, dirty_rects_count, dirty_rects, buffer, width, height):
+        got.append((
+            type(browser), element_type, dirty_rects_count, dirty_rects and (dirty_rects.x, dirty_rects.width),
+            buffer, width, height))
+
+    browser = struct.cef_browser_t()
+    rect = struct.cef_rect_t(1, 2, 3, 4)
+    ret = render_handler.on_paint(
+        ctypes.pointer(render_handler), ctypes.pointer(browser), 1, 1, ctypes.pointer(rect), 1234, 800, 600)
+    ret_null = render_handler.on_paint(ctypes.pointer(render_handler), None, 0, 0, None, None, 0, 0)
+    return got, ret, ret_null
+
+
+def get_view_rect_case(trampoline: bool):
+    render_handler = base_ctor(struct.cef_render_handler_t)
+
+    @handler(render_handler, trampoline=trampoline)
+    def get_view_rect(browser, rect):
+        rect.width = 800
+        rect.height = 600
+
+    rect = struct.cef_rect_t()
+    render_handler.get_view_rect(
+        ctypes.pointer(render_handler), ctypes.pointer(struct.cef_browser_t()), ctypes.pointer(rect))
+    return rect.width, rect.height
+
+
+def raw_and_ignored_case(trampoline: bool):
+    render_handler = base_ctor(struct.cef_render_handler_t)
+    got = []
+
+    @handler(render_handler, trampoline=trampoline, ignore_arg_indices={0, 1}, raw_arg_indices={4})
+    def get_screen_point(view_x, view_y, screen_x, screen_y):
+        got.append((view_x, view_y, type(screen_x).__name__, type(screen_y).__name__))
+        screen_x[0] = view_x + 1
+        screen_y.value = view_y + 1
+        return 1
+
+    x = ctypes.c_int32()
+    y = ctypes.c_int32()
+    ret = render_handler.get_screen_point(
+        ctypes.pointer(render_handler), None, 10, 20, ctypes.pointer(x), ctypes.pointer(y))
+    return got, ret, x.value, y.value
+
+
+def self_arg_case(trampoline: bool):
+    task = base_ctor(struct.cef_task_t)
+    got = []
+
+    @handler(task, trampoline=trampoline, ignore_arg_indices=set())
+    def execute(self):
+        got.append(ctypes.addressof(self) == ctypes.addressof(task))
+
+    task.execute(ctypes.pointer(task))
+    return got
+
+
+def additional_args_case(trampoline: bool):
+    task = base_ctor(struct.cef_task_t)
+    got = []
+    _register_callback(
+        task, 'execute', lambda *args, **kwargs: got.append((args, kwargs)),
+        additional_args=(1, 'a'), additional_kwargs={'k': 2}, trampoline=trampoline)
+    task.execute(ctypes.pointer(task))
+    return got
+
+
+def return_struct_case(trampoline: bool):
+    client = base_ctor(struct.cef_client_t)
+    render_handler = base_ctor(struct.cef_render_handler_t)
+    returns = [render_handler, 7]
+
+    @handler(client, trampoline=trampoline)
+    def get_render_handler():
+        return returns.pop(0)
+
+    got = [client.get_render_handler(ctypes.pointer(client)) for _ in range(2)]
+    return got[0] == ctypes.addressof(render_handler), got[1]
+
+
+def no_handler_case(trampoline: bool):
+    client = base_ctor(struct.cef_client_t)
+    render_handler = base_ctor(struct.cef_render_handler_t)
+    task = base_ctor(struct.cef_task_t)
+    _register_callback(client, 'get_render_handler', None, trampoline=trampoline)
+    _register_callback(render_handler, 'get_screen_point', None, trampoline=trampoline)
+    _register_callback(task, 'execute', None, trampoline=trampoline)
+    x = ctypes.c_int32()
+    return (
+        client.get_render_handler(ctypes.pointer(client)),
+        render_handler.get_screen_point(
+            ctypes.pointer(render_handler), None, 0, 0, ctypes.pointer(x), ctypes.pointer(x)),
+        task.execute(ctypes.pointer(task)))
+
+
+def wrong_return_case(trampoline: bool):
+    client = base_ctor(struct.cef_client_t)
+    rect = struct.cef_rect_t()
+    errors = []
+
+    @handler(client, trampoline=trampoline)
+    def get_render_handler():
+        return rect  # Not `cef_base_ref_counted_t`-ed.
+
+    hook = sys.unraisablehook
+    sys.unraisablehook = lambda u: errors.append((u.exc_type, str(u.exc_value)))
+    try:
+        client.get_render_handler(ctypes.pointer(client))
+    finally:
+        sys.unraisablehook = hook
+    return errors
+
+
+@pytest.mark.parametrize('case', [
+    on_paint_case, get_view_rect_case, raw_and_ignored_case, self_arg_case, additional_args_case,
+    return_struct_case, no_handler_case, wrong_return_case])
+def test_trampoline_equals_generic(case):
+    assert case(True) == case(False)
+
+
+def test_cases_observe_calls():
+    got, _, _ = on_paint_case(False)
+    assert got == [(struct.cef_browser_t, 1, 1, (1, 3), 1234, 800, 600), (type(None), 0, 0, None, None, 0, 0)]
+    assert raw_and_ignored_case(False) == ([(10, 20, 'LP_c_int', 'c_int')], 1, 11, 21)
+    assert additional_args_case(False) == [((1, 'a'), {'k': 2})]
+    assert return_struct_case(False) == (True, 7)
+    assert wrong_return_case(False) == [(Exception, 'Python GC may remove the return value!')]
+    assert no_handler_case(False) == (0, 0, None)
+
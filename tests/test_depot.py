@@ -0,0 +1,74 @@
+import threading
+import pytest
+from cef_capi.depot import ObjectDepot, TypeStats
+
+
+class A:
+    pass
+
+
+class B:
+    pass
+
+
+def test_add_remove_and_counters():
+    depot = ObjectDepot(shard_count=4)
+    a1, a2, b = A(), A(), B()
+    for o in (a1, a2, b, a1):  # Adding again does nothing.
+        depot.add(o)
+    assert len(depot) == 3 and a1 in depot and A() not in depot
+    assert depot[id(b)] is b
+    depot.remove(a1)
+    del depot[id(b)]
+    assert len(depot) == 1 and a1 not in depot
+    with pytest.raises(KeyError):
+        depot.remove(a1)
+    assert depot.live_count(A) == 1 and depot.live_count(B) == 0 and depot.live_count(int) == 0
+    assert depot.stats() == {A: TypeStats(1, 2, 2), B: TypeStats(0, 1, 1)}
+
+
+def test_setitem_and_shard_count():
+    depot = ObjectDepot()
+    a = A()
+    depot[id(a)] = a
+    assert a in depot
+    with pytest.raises(Exception):
+        depot[id(a) + 16] = a
+    with pytest.raises(Exception):
+        ObjectDepot(shard_count=3)
+
+
+def test_snapshot():
+    depot = ObjectDepot()
+    a, b = A(), B()
+    depot.add(a)
+    before = depot.snapshot()
+    depot.add(b)
+    depot.remove(a)
+    after = depot.snapshot()
+    assert before.of_type(A) == [a] and after.of_type(A) == []
+    assert after.new_since(before) == [b]
+    assert before.stats[A].live == 1 and after.stats[A].live == 0
+
+
+def test_threads():
+    depot = ObjectDepot(shard_count=2)
+    n = 2000
+
+    def work():
+        objects = [A() for _ in range(n)]
+        for o in objects:
+            depot.add(o)
+        for o in objects[::2]:
+            depot.remove(o)
+        kept.append(objects)
+
+    kept: list = []
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(depot) == depot.live_count(A) == 8 * n // 2
+    stats = depot.stats()[A]
+    assert stats.total == 8 * n and n <= stats.high_water <= 8 * n
@@ -0,0 +1,43 @@
+import ctypes
+import pytest
+from cef_capi import struct
+
+np = pytest.importorskip('numpy')
+from cef_capi.frame import FrameCompositor, FrameRing, frame_view  # noqa: E402
+
+
+def buffer(width: int, height: int, value: int):
+    data = np.full((height, width, 4), value, np.uint8)
+    return data, data.ctypes.data
+
+
+def test_frame_view_and_ring():
+    data, addr = buffer(4, 3, 7)
+    view = frame_view(addr, 4, 3)
+    assert view.shape == (3, 4, 4) and not view.flags.writeable and (view == 7).all()
+    ring = FrameRing(4, 3, size=2)
+    a = ring.copy(addr, 4, 3)
+    data[:] = 8
+    b = ring.copy(ctypes.c_void_p(addr), 4, 3)
+    assert (a == 7).all() and (b == 8).all() and ring.latest is b and ring.count == 2
+    assert ring.copy(addr, 4, 3) is a  # Wrapped around.
+    data, addr = buffer(2, 2, 9)
+    assert ring.copy(addr, 2, 2).shape == (2, 2, 4)
+    with pytest.raises(Exception):
+        ring.copy(0, 2, 2)
+
+
+def test_compositor_copies_dirty_rects_only():
+    compositor = FrameCompositor()
+    data, addr = buffer(8, 4, 1)
+    update = compositor.paint(1, addr, 8, 4, 0, None)
+    assert update.full and update.count == 1 and update.rects.tolist() == [[0, 0, 8, 4]]
+    data[:] = 2
+    rects = (struct.cef_rect_t * 2)(struct.cef_rect_t(6, 2, 4, 4), struct.cef_rect_t(0, 0, 0, 1))
+    update = compositor.paint(1, addr, 8, 4, 2, ctypes.pointer(rects[0]))
+    assert not update.full and update.rects.tolist() == [[6, 2, 2, 2]]  # Clipped. The empty one is dropped.
+    assert update.change_mask().sum() == 4 and (update.frame[2:, 6:] == 2).all() and (update.frame[:2] == 1).all()
+    assert update.changed_tiles(4) == [(4, 0, 4, 4)]
+    assert compositor.paint(1, addr, 8, 4, 1, [(0, 0, 1, 1)]).count == 3
+    compositor.release(1)
+    assert compositor.frame(1) is None
@@ -0,0 +1,87 @@
+import ctypes
+import pytest
+from cef_capi import base_ctor, handler, struct, task_factory
+from cef_capi.future_task import post_task, _DEADLINES
+
+
+def task_runner():
+    runner = base_ctor(struct.cef_task_runner_t)
+    posted = []
+
+    @handler(runner)
+    def post_task(task):
+        posted.append(task)
+        return 1
+
+    return runner, posted
+
+
+def run(task):
+    task.execute(ctypes.pointer(task))
+
+
+def release(task):
+    task.base.release(ctypes.pointer(task.base))
+
+
+def test_result_and_exception():
+    runner, posted = task_runner()
+    ok = post_task(runner, lambda a, b=0: a + b, 1, b=2)
+    ng = post_task(runner, lambda: 1 / 0)
+    for task in posted:
+        run(task)
+        release(task)
+    assert ok.result(0) == 3
+    assert isinstance(ng.exception(0), ZeroDivisionError)
+
+
+def test_discarded_without_execution():
+    runner, posted = task_runner()
+    future = post_task(runner, lambda: 1)
+    release(posted[0])
+    assert 'discarded' in str(future.exception(0))
+
+
+def test_cancel_before_start():
+    runner, posted = task_runner()
+    calls = []
+    future = post_task(runner, calls.append, 1)
+    assert future.cancel()
+    run(posted[0])
+    release(posted[0])
+    assert calls == []
+
+
+def test_timeout():
+    runner, posted = task_runner()
+    future = post_task(runner, lambda: 1, timeout=.01)
+    with pytest.raises(TimeoutError):
+        future.result(1.)
+    run(posted[0])  # Too late.
+    release(posted[0])
+    assert len(_DEADLINES) == 0
+
+
+def test_finished_tasks_leave_deadlines():
+    runner, posted = task_runner()
+    futures = [post_task(runner, lambda i=i: i, timeout=60.) for i in range(1000)]
+    assert len(_DEADLINES) == 1000
+    for task in posted:
+        run(task)
+        release(task)
+    assert [f.result(0) for f in futures] == list(range(1000))
+    assert len(_DEADLINES) == 0
+    assert len(_DEADLINES._heap) < 1000 // 2
+
+
+def test_task_factory_passes_on_released_kwarg():
+    got = []
+
+    @task_factory
+    def record(on_released=None):
+        got.append(on_released)
+
+    task = record(on_released='arg')
+    run(task)
+    release(task)
+    assert got == ['arg']
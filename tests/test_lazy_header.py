@@ -0,0 +1,67 @@
+import sys
+import types
+import ctypes
+import shutil
+import marshal
+from cef_capi import header, lazy_header
+
+
+def lazy_namespace(index, preamble):
+    ns = lazy_header._LazyNamespace(dict(index))
+    ns['__name__'] = 'lazy'
+    exec(marshal.loads(preamble), ns)
+    return ns
+
+
+def fields(t):
+    return [(f[0], getattr(t, f[0]).offset, getattr(t, f[0]).size) for f in t._fields_]
+
+
+def test_materializes_as_eager(tmp_path, monkeypatch):
+    path = tmp_path / 'header.py'
+    shutil.copy(header.__file__, path)
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    preamble, index = lazy_header.load_index(path)
+    assert lazy_header.cache_path(path).exists()
+    assert lazy_header.load_index(path) == (preamble, index)  # From the cache.
+
+    ns = lazy_namespace(index, preamble)
+    for name in ('struct__cef_client_t', 'cef_browser_settings_t', 'struct__cef_request_handler_t'):
+        assert ctypes.sizeof(ns[name]) == ctypes.sizeof(getattr(header, name))
+        assert fields(ns[name]) == fields(getattr(header, name))
+    assert ns['cef_initialize'].argtypes[0].__name__ == header.cef_initialize.argtypes[0].__name__
+    assert ns['__all__'] == header.__all__
+    assert 'cef_zip_reader_create' in ns.index  # Not referred to by the names above.
+
+
+def test_line_numbers(tmp_path):
+    path = tmp_path / 'header.py'
+    shutil.copy(header.__file__, path)
+    preamble, index = lazy_header.load_index(path)
+    ns = lazy_namespace(index, preamble)
+    (body,) = (c for c in marshal.loads(index['struct__cef_rect_t'][0]).co_consts if isinstance(c, types.CodeType))
+    line = path.read_text(encoding='utf-8').splitlines()[body.co_firstlineno - 1]
+    assert line.startswith('class struct__cef_rect_t(')
+    assert ns['struct__cef_rect_t'].__name__ == 'struct__cef_rect_t'
+
+
+def test_stale_cache(tmp_path):
+    path = tmp_path / 'header.py'
+    shutil.copy(header.__file__, path)
+    cache = lazy_header.cache_path(path)
+    cache.parent.mkdir()
+    cache.write_bytes(marshal.dumps(((b'', 0, 0), b'', {})))
+    _, index = lazy_header.load_index(path)
+    assert 'struct__cef_rect_t' in index
+
+
+def test_struct_exports_all_only():
+    fake = types.ModuleType('pkg.header')
+    fake.__file__ = '/pkg/header.py'
+    fake.__all__ = ['cef_a_t']
+    fake.cef_a_t = int
+    fake.cef_a_t__enumvalues = {}
+    struct = lazy_header._struct_module('pkg', fake)
+    assert struct is not fake and struct.__name__ == 'pkg.struct'
+    assert struct.cef_a_t is int and dir(struct) == ['cef_a_t']
+    assert not hasattr(struct, 'cef_a_t__enumvalues')
@@ -0,0 +1,111 @@
+import math
+import time
+import ctypes
+from cef_capi import base_ctor, cef_string_t, header, struct
+from cef_capi.page_ready import PageReadyDetector, SIGNAL_MESSAGE
+
+
+def test_ready_after_load_and_paint():
+    fired = []
+    d = PageReadyDetector(on_ready=fired.append, stability_window=0., network_idle_time=None)
+    d.start()
+    d.loading_state_change(True)
+    d.paint()  # Before the end of loading. Not enough.
+    d._check()
+    assert not d.future.done()
+    d.loading_state_change(False)
+    d.paint()
+    d._check()
+    timings = d.future.result(0)
+    assert fired == [timings] and not timings.timed_out and timings.paints == 2
+    assert timings.load_end <= timings.last_paint <= timings.ready
+
+
+def test_network_idle_and_signal():
+    d = PageReadyDetector(stability_window=0., network_idle_time=0., wait_for_signal=True)
+    d.start()
+    d.loading_state_change(True)
+    d.request_start(1)
+    d.loading_state_change(False)
+    d.paint()
+    d._check()
+    assert not d.future.done()  # A request in flight.
+    d.request_complete(1)
+    d.request_complete(2)  # Not ours.
+    d._check()
+    assert not d.future.done()  # No signal.
+    d.signal()
+    d._check()
+    timings = d.future.result(0)
+    assert timings.requests == 1 and timings.network_idle is not None and timings.signal is not None
+
+
+def test_timeout():
+    d = PageReadyDetector(timeout=0.)
+    d.start()
+    d._check()
+    assert d.future.result(0).timed_out
+
+
+def test_start_forgets_pending_check():
+    d = PageReadyDetector(timeout=30.)
+    d.start()
+    d._check_due = 0.  # A check of the former navigation, which will find nothing to do.
+    d.start()
+    assert 0. < d._check_due < math.inf
+
+
+def browser_ctor(invalidated: list) -> struct.cef_browser_t:
+    host = base_ctor(struct.cef_browser_host_t)
+    host.invalidate = type(host.invalidate)(lambda _, element_type: invalidated.append(element_type))
+    browser = base_ctor(struct.cef_browser_t)
+    browser.get_host = type(browser.get_host)(lambda _: ctypes.addressof(host))
+    browser.host = host  # Keeps it alive.
+    return browser
+
+
+def test_ready_without_paint_after_load_end():
+    invalidated = []
+    d = PageReadyDetector(stability_window=.05, network_idle_time=None)
+    client = base_ctor(struct.cef_client_t)
+    d.attach(client)
+    load_handler = struct.cef_load_handler_t.from_address(client.get_load_handler(ctypes.pointer(client)))
+    browser = browser_ctor(invalidated)
+    d.start()
+    load_handler.on_loading_state_change(ctypes.pointer(load_handler), ctypes.pointer(browser), 1, 0, 0)
+    d.paint()  # The only paint of a static page.
+    load_handler.on_loading_state_change(ctypes.pointer(load_handler), ctypes.pointer(browser), 0, 0, 0)
+    assert invalidated == [header.PET_VIEW]
+    d._check()
+    assert not d.future.done()  # Within the window after the end of loading.
+    time.sleep(.06)
+    d._check()
+    timings = d.future.result(0)
+    assert not timings.timed_out and timings.paints == 1 and timings.last_paint < timings.load_end
+
+
+def test_attached_handlers_feed_detector(cef_strings):
+    d = PageReadyDetector(stability_window=0., network_idle_time=0., wait_for_signal=True)
+    client = base_ctor(struct.cef_client_t)
+    d.attach(client)
+    p = ctypes.pointer(client)
+    d.start()
+    request_handler = struct.cef_request_handler_t.from_address(client.get_request_handler(p))
+    request = base_ctor(struct.cef_request_t)
+    request.get_identifier = type(request.get_identifier)(lambda _: 7)
+    resource_request_handler = struct.cef_resource_request_handler_t.from_address(
+        request_handler.get_resource_request_handler(
+            ctypes.pointer(request_handler), None, None, ctypes.pointer(request), 0, 0, None, None))
+    assert d._inflight == {7}
+    resource_request_handler.on_resource_load_complete(
+        ctypes.pointer(resource_request_handler), None, None, ctypes.pointer(request), None, 0, 0)
+    assert d._inflight == set()
+
+    display_handler = struct.cef_display_handler_t.from_address(client.get_display_handler(p))
+    message = cef_string_t()
+    for text in (None, ctypes.pointer(message)):  # Empty messages.
+        assert display_handler.on_console_message(ctypes.pointer(display_handler), None, 0, text, None, 0) == 0
+    cef_strings.set_str(SIGNAL_MESSAGE, ctypes.pointer(message))
+    display_handler.on_console_message(ctypes.pointer(display_handler), None, 0, ctypes.pointer(message), None, 0)
+    cef_strings.clear(ctypes.pointer(message))
+    assert d._signal is not None
@@ -0,0 +1,54 @@
+import ctypes
+import weakref
+from cef_capi import pooled_task_factory, NON_GC_DEPOT
+
+
+def run_and_release(task):
+    task.execute(ctypes.pointer(task))
+    task.base.release(ctypes.pointer(task.base))
+
+
+def test_recycled_after_release():
+    calls = []
+
+    @pooled_task_factory(pool_size=2)
+    def append(a, b=0):
+        calls.append((a, b))
+
+    t1 = append(1, b=2)
+    run_and_release(t1)
+    assert t1 not in NON_GC_DEPOT
+    t2 = append(3)
+    assert t2 is t1 and t2 in NON_GC_DEPOT  # Revived with new args.
+    run_and_release(t2)
+    assert calls == [(1, 2), (3, 0)]
+
+
+def test_in_use_and_pool_size():
+    @pooled_task_factory(pool_size=1)
+    def nop():
+        pass
+
+    tasks = [nop() for _ in range(3)]
+    assert len({id(t) for t in tasks}) == 3  # Not released yet. Nothing to reuse.
+    for t in tasks:
+        run_and_release(t)
+    reused = [nop() for _ in range(3)]
+    assert sum(t in tasks for t in reused) == 1  # Only |pool_size| instances were kept.
+
+
+def test_released_without_execute_drops_args():
+    @pooled_task_factory()
+    def nop(*_):
+        pass
+
+    class Arg:
+        pass
+
+    arg = Arg()
+    ref = weakref.ref(arg)
+    t = nop(arg)
+    del arg
+    t.base.release(ctypes.pointer(t.base))
+    assert ref() is None
+    assert nop() is t
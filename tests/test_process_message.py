@@ -0,0 +1,29 @@
+from cef_capi import process_message
+from cef_capi.process_message import MessageChannel, _pack, _unpack, _typed_size
+
+
+def test_request_ids_skip_zero(monkeypatch):
+    channel = MessageChannel()
+    sent = []
+    monkeypatch.setattr(channel, '_send', lambda frame, target, kind, request_id, topic, payload: sent.append(request_id))
+    channel._request_ids = iter([0, process_message._INT32_MAX - 1, process_message._INT32_MAX])
+    for _ in range(3):
+        channel.request(None, 0, 'topic')
+    assert sent == [1, process_message._INT32_MAX, 1]
+    assert channel.pending_requests() == 2  # The last one replaced the first.
+
+
+def test_pack_round_trip():
+    payload = {'a': [1, 2 ** 40, -1.5, None, True, False], 'b': ('x', b'\0' * 100000), 'c': {}}
+    chunks: list = []
+    _pack(payload, chunks)
+    o, offset = _unpack(memoryview(b''.join(chunks)))
+    assert o == {'a': [1, 2 ** 40, -1.5, None, True, False], 'b': ['x', b'\0' * 100000], 'c': {}}
+    assert offset == sum(len(c) for c in chunks)
+
+
+def test_typed_size():
+    assert _typed_size({'k': [1, 'ab']}, 1024) > 0
+    assert _typed_size(2 ** 31, 1024) == -1  # Packed instead.
+    assert _typed_size(b'x' * 2048, 1024) == -1
+    assert _typed_size({1: 2}, 1024) == -1
@@ -0,0 +1,51 @@
+import ctypes
+from cef_capi import base_ctor, struct, NON_GC_DEPOT, _init_cef_base_ref_counted, _attach_resource_request_handler
+
+
+def base_of(o):
+    base = o.base
+    return base, ctypes.pointer(base)
+
+
+def test_release_to_zero():
+    released = []
+    o = struct.cef_client_t()
+    o.base.size = ctypes.sizeof(struct.cef_client_t)
+    _init_cef_base_ref_counted(o, on_released=released.append)
+    base, p = base_of(o)
+    assert o in NON_GC_DEPOT
+    assert base.has_one_ref(p) == 1 and base.has_at_least_one_ref(p) == 0
+    base.add_ref(p)
+    assert base.has_one_ref(p) == 0 and base.has_at_least_one_ref(p) == 1
+    assert base.release(p) == 0
+    assert base.release(p) == 1
+    assert released == [o]
+    assert o not in NON_GC_DEPOT
+
+
+def test_add_ref_after_release_increments(capsys):
+    o = base_ctor(struct.cef_client_t)
+    base, p = base_of(o)
+    assert base.release(p) == 1
+    base.add_ref(p)  # As the former per-object closures: reports, and still counts.
+    assert 'access to released instance' in capsys.readouterr().out
+    assert base.has_one_ref(p) == 1
+    assert base.release(p) == 1
+    assert base.release(p) == 0
+    assert 'underrun' in capsys.readouterr().out
+
+
+def test_attach_resource_request_handler_builds_handlers_per_call():
+    registered = []
+    client = base_ctor(struct.cef_client_t)
+    _attach_resource_request_handler(client, [registered.append, lambda h: registered.append(('other', h))])
+    p = ctypes.pointer(client)
+    assert client.get_request_handler(p) != client.get_request_handler(p)  # CEF takes a ref of each.
+    request_handler = struct.cef_request_handler_t.from_address(client.get_request_handler(p))
+    args = (ctypes.pointer(request_handler), None, None, None, 0, 0, None, None)
+    first = request_handler.get_resource_request_handler(*args)
+    second = request_handler.get_resource_request_handler(*args)
+    assert first != second
+    assert [ctypes.addressof(h) if isinstance(h, struct.cef_resource_request_handler_t)
+            else ('other', ctypes.addressof(h[1])) for h in registered] \
+        == [first, ('other', first), second, ('other', second)]
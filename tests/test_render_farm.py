@@ -0,0 +1,43 @@
+import zlib
+import ctypes
+import struct as pystruct
+from concurrent.futures import Future
+from cef_capi import base_ctor, cef_string_ctor, cef_string_t, struct
+from cef_capi.render_farm import RenderFarm, encode_png, _Job, _Slot
+
+
+def test_encode_png():
+    bgra = bytes([1, 2, 3, 4, 5, 6, 7, 8]) * 3  # 2x3
+    png = encode_png(bgra, 2, 3)
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = {}
+    pos = 8
+    while pos < len(png):
+        (n,) = pystruct.unpack_from('>I', png, pos)
+        tag, data = png[pos + 4:pos + 8], png[pos + 8:pos + 8 + n]
+        assert pystruct.unpack_from('>I', png, pos + 8 + n)[0] == zlib.crc32(tag + data)
+        chunks[tag] = data
+        pos += 12 + n
+    assert pystruct.unpack('>IIBBBBB', chunks[b'IHDR']) == (2, 3, 8, 6, 0, 0, 0)
+    assert chunks[b'IEND'] == b''
+    assert zlib.decompress(chunks[b'IDAT']) == (b'\x00' + bytes([3, 2, 1, 4, 7, 6, 5, 8])) * 3
+
+
+def test_load_error_with_empty_text():
+    farm = RenderFarm(concurrency=1)
+    slot = _Slot(farm, 0)
+    slot.job = _Job('https://example.com/', Future())
+    farm._pending = 1
+    client = slot.client
+    load_handler = struct.cef_load_handler_t.from_address(client.get_load_handler(ctypes.pointer(client)))
+    frame = base_ctor(struct.cef_frame_t)
+    frame.is_main = type(frame.is_main)(lambda _: 1)
+    for error_text in (None, ctypes.pointer(cef_string_t())):
+        slot.job = _Job('https://example.com/', Future())
+        job = slot.job
+        load_handler.on_load_error(
+            ctypes.pointer(load_handler), None, ctypes.pointer(frame), -105, error_text,
+            ctypes.pointer(cef_string_ctor('https://example.com/')))
+        assert str(job.future.exception(0)) == 'RenderFarm failed to load https://example.com/: -105 '
+        assert slot.job is None
+    farm._encode_pool.shutdown()
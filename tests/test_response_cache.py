@@ -0,0 +1,119 @@
+import os
+import ctypes
+import typing as ty
+import pytest
+from cef_capi import base_ctor, decode_cef_string, struct
+from cef_capi.response_cache import ResponseCache, _Fill, _storable_headers, _identity_length
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'Content-Type': ['text/html'], 'Content-Length': ['3'], 'Content-Encoding': ['gzip'], 'ETag': ['"a"']},
+     {'Content-Type': ['text/html'], 'ETag': ['"a"']}),
+    ({'Cache-Control': ['max-age=60, public'], 'Vary': ['Accept-Encoding']},
+     {'Cache-Control': ['max-age=60, public'], 'Vary': ['Accept-Encoding']}),
+    ({'Set-Cookie': ['a=1']}, None),
+    ({'cache-control': ['public', 'no-store']}, None),
+    ({'Cache-Control': ['Private=x']}, None),
+    ({'Vary': ['Accept-Encoding, Cookie']}, None),
+])
+def test_storable_headers(headers, expected):
+    assert _storable_headers(headers) == expected
+
+
+def test_identity_length():
+    assert _identity_length({'Content-Length': ['12']}) == 12
+    assert _identity_length({'content-length': ['12'], 'Content-Encoding': ['identity']}) == 12
+    assert _identity_length({'Content-Length': ['12'], 'Content-Encoding': ['br']}) is None
+    assert _identity_length({'Content-Length': ['x']}) is None
+    assert _identity_length({}) is None
+
+
+def fill(cache: ResponseCache, url: str, body: bytes, expected_size: int | None) -> _Fill:
+    f = _Fill(cache, url, (200, 'OK', 'text/html', '', {}), expected_size)
+    f.feed(memoryview(body), lambda _: None)
+    f.finish(lambda _: None)
+    f.complete(True)
+    return f
+
+
+def test_cut_off_body_is_not_stored(tmp_path):
+    cache = ResponseCache(tmp_path)
+    fill(cache, 'https://a.com/cut', b'abc', 10)
+    fill(cache, 'https://a.com/ok', b'abc', 3)
+    fill(cache, 'https://a.com/unknown', b'abc', None)
+    assert cache.get('https://a.com/cut') is None
+    assert cache.get('https://a.com/ok').size == cache.get('https://a.com/unknown').size == 3
+    assert os.listdir(tmp_path / 'tmp') == []
+
+
+def test_missing_body_is_restored_with_refs(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put('https://a.com/1', b'same')
+    cache.put('https://a.com/2', b'same')
+    digest = cache.get('https://a.com/1').digest
+    os.remove(cache.object_path(digest))
+    cache.put('https://a.com/3', b'same')
+    assert cache.object_path(digest).read_bytes() == b'same'
+    refs = cache._db().execute('SELECT refs FROM objects WHERE digest = ?', (digest,)).fetchone()[0]
+    assert refs == 3
+    cache.put('https://a.com/1', b'other')
+    cache.put('https://a.com/2', b'other')
+    assert cache.object_path(digest).exists()  # Still of /3.
+    assert cache.disk_usage() == (3, 9)
+
+
+def response_ctor(cef_strings) -> struct.cef_response_t:
+    '''
+    `cef_response_t` recording what is set to `r.set`.
+    '''
+    r = base_ctor(struct.cef_response_t)
+    r.set = {}
+
+    def setter(name: str, decode: ty.Callable):
+        def f(_, v):
+            r.set[name] = decode(v)
+        setattr(r, f'set_{name}', type(getattr(r, f'set_{name}'))(f))
+
+    setter('status', int)
+    for name in ('status_text', 'mime_type', 'charset'):
+        setter(name, lambda s: decode_cef_string(s.contents))
+    setter('header_map', lambda handle: list(cef_strings.collection(handle)))
+    return r
+
+
+def test_get_resource_handler_serves_entry(tmp_path, cef_strings, cef_request):
+    cache = ResponseCache(tmp_path)
+    body = bytes(range(256)) * 5
+    cache.put('https://a.com/x', body, mime_type='image/png', headers={'ETag': ['"1"']})
+    client = base_ctor(struct.cef_client_t)
+    cache.attach(client)
+    request_handler = struct.cef_request_handler_t.from_address(client.get_request_handler(ctypes.pointer(client)))
+
+    def resource_handler(request: struct.cef_request_t) -> int:
+        h = struct.cef_resource_request_handler_t.from_address(request_handler.get_resource_request_handler(
+            ctypes.pointer(request_handler), None, None, ctypes.pointer(request), 0, 0, None, None))
+        return h.get_resource_handler(ctypes.pointer(h), None, None, ctypes.pointer(request))
+
+    assert resource_handler(cef_request('https://a.com/missing')) == 0  # NULL: the network.
+    assert resource_handler(cef_request('https://a.com/x', {'Range': 'bytes=0-1'})) == 0
+    assert resource_handler(cef_request('https://a.com/x', method='POST')) == 0
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    served = struct.cef_resource_handler_t.from_address(resource_handler(cef_request('https://a.com/x', identifier=9)))
+    p = ctypes.pointer(served)
+    handle_request = ctypes.c_int()
+    assert served.open(p, None, ctypes.pointer(handle_request), None) == 1 and handle_request.value == 1
+    response = response_ctor(cef_strings)
+    response_length = ctypes.c_long()
+    served.get_response_headers(p, ctypes.pointer(response), ctypes.pointer(response_length), None)
+    assert response.set == {
+        'status': 200, 'status_text': 'OK', 'mime_type': 'image/png', 'header_map': [('ETag', '"1"')]}
+    assert response_length.value == len(body)
+    buf = ctypes.create_string_buffer(100)
+    bytes_read = ctypes.c_int()
+    out = b''
+    while served.read(p, ctypes.addressof(buf), len(buf), ctypes.pointer(bytes_read), None):
+        out += buf.raw[:bytes_read.value]
+    assert out == body and bytes_read.value == 0
+    assert (cache.hits, cache.bytes_served, cache._served) == (1, len(body), {9})
+    assert cef_strings.userfree == {} and cef_strings.collections == {}
@@ -0,0 +1,110 @@
+import re
+import ctypes
+import pytest
+from cef_capi import base_ctor, header, struct
+from cef_capi.response_filter import ResponseFilters, Transformer, RegexRewriter, ScriptInjector
+from cef_capi.rules import RuleEngine
+
+NEED_MORE_DATA = header.RESPONSE_FILTER_NEED_MORE_DATA
+
+
+def drive(transformer: Transformer, data: bytes, chunk: int = 1024, out_size: int = 1024) -> bytes:
+    return drive_filter(ResponseFilters(lambda *_: None).response_filter(transformer), data, chunk, out_size)
+
+
+def drive_filter(
+        filter: struct.cef_response_filter_t, data: bytes, chunk: int = 1024, out_size: int = 1024) -> bytes:
+    '''
+    Calls |filter| as CEF does: per |chunk| of input, again while input is left or the output buffer is full
+    (with no input once all is read), then with no input while the filter needs more data.
+    '''
+    self_p = ctypes.pointer(filter)
+    in_buf = ctypes.create_string_buffer(data, len(data))
+    out_buf = ctypes.create_string_buffer(out_size)
+    read = ctypes.c_uint64()
+    written = ctypes.c_uint64()
+    out = b''
+    status = NEED_MORE_DATA
+
+    def call(offset: int, size: int) -> int:
+        nonlocal out
+        ret = filter.filter(self_p, ctypes.addressof(in_buf) + offset if size else None, size,
+                            ctypes.byref(read), out_buf, out_size, ctypes.byref(written))
+        assert read.value <= size and written.value <= out_size
+        out += out_buf.raw[:written.value]
+        return ret
+
+    for pos in range(0, len(data), chunk):
+        offset, end = pos, min(pos + chunk, len(data))
+        while True:
+            status = call(offset, end - offset)
+            offset += read.value
+            if status != NEED_MORE_DATA or (offset == end and written.value < out_size):
+                break
+    while status == NEED_MORE_DATA:
+        status = call(0, 0)
+    assert status == header.RESPONSE_FILTER_DONE
+    return out
+
+
+def html(n: int) -> bytes:
+    return b'<html><HEAD><title>t</title></HEAD><body>' + b'<a href="http://cdn.example.com/x.png">x</a>\n' * n
+
+
+@pytest.mark.parametrize('size', [0, 1, 1023, 1024, 1025, 4096, 10000])
+def test_pass_through_fills_output_exactly(size):
+    data = bytes(i % 251 for i in range(size))
+    assert drive(Transformer(), data) == data
+
+
+@pytest.mark.parametrize('chunk, out_size', [(1024, 1024), (7, 1024), (1024, 5), (100, 100)])
+def test_regex_rewriter(chunk, out_size):
+    data = html(300)
+    pattern = rb'https?://cdn\.example\.com/'
+    expected = re.sub(pattern, b'/assets/', data)
+    assert drive(RegexRewriter(pattern, b'/assets/', max_match=64), data, chunk, out_size) == expected
+    assert drive(RegexRewriter(pattern, rb'/\g<0>', max_match=64), data, chunk, out_size) \
+        == re.sub(pattern, rb'/\g<0>', data)
+    rewriter = RegexRewriter(pattern, lambda m: m.group(0).upper(), max_match=64, count=2)
+    assert drive(rewriter, data, chunk, out_size) == re.sub(pattern, lambda m: m.group(0).upper(), data, count=2)
+    assert rewriter.replaced == 2
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 30, 1024])
+def test_script_injector(chunk):
+    data = html(100)
+    out = drive(ScriptInjector(b'<script>1</script>'), data, chunk)
+    assert out == data.replace(b'</HEAD>', b'<script>1</script></HEAD>')
+    assert drive(ScriptInjector('<s>'), b'<p>no head</p>' * 100, chunk) == b'<p>no head</p>' * 100 + b'<s>'
+
+
+def test_attached_beside_rule_engine(cef_strings, cef_request):
+    rules = RuleEngine()
+    rules.block(host='ads.example')
+    filters = ResponseFilters(lambda url, mime_type: ScriptInjector('<s>') if mime_type == 'text/html' else None)
+    client = base_ctor(struct.cef_client_t)
+    filters.attach(client, rules)
+    request_handler = struct.cef_request_handler_t.from_address(client.get_request_handler(ctypes.pointer(client)))
+
+    def resource_request_handler(request: struct.cef_request_t) -> struct.cef_resource_request_handler_t:
+        return struct.cef_resource_request_handler_t.from_address(request_handler.get_resource_request_handler(
+            ctypes.pointer(request_handler), None, None, ctypes.pointer(request), 0, 0, None, None))
+
+    def response_filter(url: str, mime_type: str) -> int:
+        request = cef_request(url)
+        h = resource_request_handler(request)
+        assert h.on_before_resource_load(ctypes.pointer(h), None, None, ctypes.pointer(request), None) \
+            == header.RV_CONTINUE
+        response = base_ctor(struct.cef_response_t)
+        response.get_mime_type = type(response.get_mime_type)(lambda _: cef_strings.new_userfree(mime_type))
+        return h.get_resource_response_filter(ctypes.pointer(h), None, None, ctypes.pointer(request),
+                                              ctypes.pointer(response))
+
+    request = cef_request('https://ads.example/x.js')
+    h = resource_request_handler(request)
+    assert h.on_before_resource_load(ctypes.pointer(h), None, None, ctypes.pointer(request), None) == header.RV_CANCEL
+    assert response_filter('https://a.com/x.js', 'text/javascript') == 0  # NULL.
+    filter = struct.cef_response_filter_t.from_address(response_filter('https://a.com/', 'text/html'))
+    assert drive_filter(filter, b'<head></head>') == b'<head><s></head>'
+    assert (rules.evaluations, rules.blocked, filters.responses) == (3, 1, 1)
+    assert cef_strings.userfree == {}
@@ -0,0 +1,61 @@
+import gc
+import ctypes
+import pytest
+from cef_capi import base_ctor, cef_string_ctor, cef_string_t, decode_cef_string, struct
+from cef_capi.rpc import RpcRegistry
+
+
+def test_register_and_source():
+    rpc = RpcRegistry('py')
+
+    @rpc.expose()
+    def add(a, b):
+        return a + b
+
+    rpc.register(len, 'size')
+    assert rpc.names() == ['add', 'size']
+    source = rpc.extension_source()
+    assert 'py.add = function(...args){ native function __py_add(); return __py_add(...args); };' in source
+    with pytest.raises(Exception, match='Bad JS function name'):
+        rpc.register(len, 'a-b')
+
+
+def test_reregister_after_extension_registered():
+    rpc = RpcRegistry('py')
+    rpc.register(len, 'size')
+    rpc._registered = True
+    rpc.register(max, 'size')  # Replaces the function. The extension source is the same.
+    assert rpc._functions == {'__py_size': max}
+    with pytest.raises(Exception, match='Cannot add other'):
+        rpc.register(min, 'other')
+
+
+def test_attach_builds_handler_per_call():
+    rpc = RpcRegistry('py')
+    app = base_ctor(struct.cef_app_t)
+    rpc.attach(app)
+    p = ctypes.pointer(app)
+    assert app.get_render_process_handler(p) != app.get_render_process_handler(p)
+
+
+def test_exception_is_copied_by_cef(cef_strings):
+    rpc = RpcRegistry('py')
+
+    @rpc.expose()
+    def fail():
+        raise ValueError('bad value')
+
+    retval = (ctypes.POINTER(struct.cef_v8value_t) * 1)()
+    exception = cef_string_t()
+
+    def execute(name: str) -> int:
+        return rpc.v8handler.execute(
+            ctypes.pointer(rpc.v8handler), ctypes.pointer(cef_string_ctor(name)), None, 0, None, retval,
+            ctypes.pointer(exception))
+
+    assert execute('__py_other') == 0 and not exception.str
+    assert execute('__py_fail') == 1 and rpc.calls == 1
+    gc.collect()  # Whatever Python built in the call is gone.
+    assert cef_strings.owns(exception)
+    assert decode_cef_string(exception) == 'ValueError: bad value'
+    cef_strings.clear(ctypes.pointer(exception))
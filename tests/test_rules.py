@@ -0,0 +1,67 @@
+import ctypes
+import pytest
+from cef_capi import base_ctor, header, struct
+from cef_capi.rules import RuleEngine, BLOCK, REDIRECT, _split_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://Example.COM/a?b#c', ('example.com', '/a?b#c')),
+    ('https://example.com', ('example.com', '')),
+    ('https://example.com?q=/x', ('example.com', '?q=/x')),
+    ('https://example.com#/x', ('example.com', '#/x')),
+    ('https://user:pw@example.com:8080/a', ('example.com', '/a')),
+    ('http://[::1]:80/a', ('[::1]', '/a')),
+    ('data:text/plain,x', ('', 'data:text/plain,x')),
+])
+def test_split_url(url, expected):
+    assert _split_url(url) == expected
+
+
+def engine() -> RuleEngine:
+    rules = RuleEngine()
+    rules.block(host='ads.example', name='ads')
+    rules.block(contains='/track', resource_types={header.RT_IMAGE})
+    rules.allow(host='ok.ads.example')
+    rules.redirect(lambda url: url.replace('http:', 'https:'), contains='/upgrade')
+    rules.set_header('X-A', '1', host='api.example.com')
+    return rules
+
+
+def test_evaluate():
+    rules = engine()
+    assert rules.evaluate('https://cdn.ads.example/x.js').action == BLOCK
+    assert rules.evaluate('https://ads.example.org/x.js').action is None
+    assert rules.evaluate('https://ok.ads.example/x.js').action is None  # Allowed.
+    assert rules.evaluate('https://a.com/track.gif', header.RT_IMAGE).action == BLOCK
+    assert rules.evaluate('https://a.com/track.gif', header.RT_SCRIPT).action is None
+    decision = rules.evaluate('http://a.com/upgrade')
+    assert (decision.action, decision.url) == (REDIRECT, 'https://a.com/upgrade')
+    assert rules.evaluate('https://a.com/upgrade').action is None  # Same URL. No redirect.
+    decision = rules.evaluate('https://api.example.com/v1')
+    assert decision.action is None and decision.headers == (('X-A', '1'),)
+    assert rules.hits == [0] * 5
+
+
+def on_before_resource_load(client: struct.cef_client_t, request: struct.cef_request_t) -> int:
+    request_handler = struct.cef_request_handler_t.from_address(client.get_request_handler(ctypes.pointer(client)))
+    h = struct.cef_resource_request_handler_t.from_address(request_handler.get_resource_request_handler(
+        ctypes.pointer(request_handler), None, None, ctypes.pointer(request), 0, 0, None, None))
+    return h.on_before_resource_load(ctypes.pointer(h), None, None, ctypes.pointer(request), None)
+
+
+def test_on_before_resource_load(cef_strings, cef_request):
+    rules = engine()
+    client = base_ctor(struct.cef_client_t)
+    rules.attach(client)
+    assert on_before_resource_load(client, cef_request('https://cdn.ads.example/x.js')) == header.RV_CANCEL
+    assert on_before_resource_load(
+        client, cef_request('https://a.com/track.gif', resource_type=header.RT_SCRIPT)) == header.RV_CONTINUE
+    request = cef_request('http://a.com/upgrade')
+    assert on_before_resource_load(client, request) == header.RV_CONTINUE
+    assert request.url == 'https://a.com/upgrade'
+    request = cef_request('https://api.example.com/v1', {'X-A': '0', 'X-B': '2'})
+    assert on_before_resource_load(client, request) == header.RV_CONTINUE
+    assert request.url == 'https://api.example.com/v1' and request.headers == {'X-A': '1', 'X-B': '2'}
+    assert rules.hits == [1, 0, 0, 1, 1] and (rules.blocked, rules.redirected, rules.evaluations) == (1, 1, 4)
+    assert rules.stats()['ads'] == 1
+    assert cef_strings.userfree == {}
@@ -0,0 +1,63 @@
+import ctypes
+import pytest
+from cef_capi.scheme import SchemeServer, _ResourceHandler, _byte_range, _accepts_gzip, _UNSATISFIABLE
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('', None),
+    ('bytes=0-9', (0, 10)),
+    ('bytes=5-', (5, 100)),
+    ('bytes=90-200', (90, 100)),
+    ('bytes=-10', (90, 100)),
+    ('bytes=-200', (0, 100)),
+    ('BYTES = 1-1', (1, 2)),
+    ('bytes=100-', _UNSATISFIABLE),
+    ('bytes=-0', _UNSATISFIABLE),
+    ('bytes=9-5', None),
+    ('bytes=0-1,5-6', None),
+    ('bytes=a-b', None),
+    ('items=0-9', None),
+    ('bytes=5', None),
+])
+def test_byte_range(value, expected):
+    assert _byte_range(value, 100) == expected
+
+
+def test_byte_range_of_empty_body():
+    assert _byte_range('bytes=0-', 0) is _UNSATISFIABLE
+    assert _byte_range('bytes=-1', 0) is _UNSATISFIABLE
+
+
+def test_accepts_gzip():
+    assert _accepts_gzip('deflate, gzip;q=0.5')
+    assert _accepts_gzip('*')
+    assert not _accepts_gzip('gzip;q=0')
+    assert not _accepts_gzip('br')
+
+
+def serve(server: SchemeServer, r, chunk: int = 4) -> tuple[_ResourceHandler, bytes]:
+    h = _ResourceHandler(server)
+    handle_request = ctypes.c_int32()
+    assert h.open(r, handle_request) == 1 and handle_request.value == 1
+    body = b''
+    buf = ctypes.create_string_buffer(chunk)
+    bytes_read = ctypes.c_int32()
+    while h.read(ctypes.addressof(buf), chunk, bytes_read):
+        body += buf.raw[:bytes_read.value]
+    return h, body
+
+
+def test_range_of_blob_and_file(tmp_path, cef_strings, cef_request):
+    server = SchemeServer('app')
+    server.add_blob('/a.txt', b'0123456789')
+    (tmp_path / 'b.txt').write_bytes(b'0123456789')
+    server.add_file('/b.txt', tmp_path / 'b.txt')
+    for path in ('/a.txt', '/b.txt'):
+        h, body = serve(server, cef_request(f'app://app{path}', {'Range': 'bytes=3-7'}))
+        assert (h.status, body) == (206, b'34567')
+        assert ('Content-Range', 'bytes 3-7/10') in h.headers
+        h, body = serve(server, cef_request(f'app://app{path}', {'Range': 'bytes=10-'}))
+        assert (h.status, body) == (416, b'')
+        h, body = serve(server, cef_request(f'app://app{path}', {}))
+        assert (h.status, body) == (200, b'0123456789')
+    assert cef_strings.userfree == {}
@@ -0,0 +1,39 @@
+import gc
+import ctypes
+from cef_capi import CefStringCache, cef_string_ctor, decode_cef_string
+
+
+def test_hits_and_lru_eviction():
+    cache = CefStringCache(max_entries=2)
+    first = cache.encode('a')
+    cache.encode('b')
+    assert cache.encode('a') is first  # 'a' is the most recently used now.
+    cache.encode('c')
+    assert len(cache) == 2 and (cache.hits, cache.misses) == (1, 3)
+    assert cache.encode('a') is first
+    cache.encode('b')  # Evicted by 'c'. Encoded again.
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_max_bytes():
+    cache = CefStringCache(max_bytes=8)
+    cache.encode('ab')
+    cache.encode('cd')
+    assert cache.total_bytes == 8
+    cache.encode('e')
+    assert len(cache) == 2 and cache.total_bytes == 6
+    cache.encode('x' * 5)  # Over |max_bytes|. Not cached.
+    assert len(cache) == 2 and cache.total_bytes == 6
+    cache.clear()
+    assert len(cache) == 0 and cache.total_bytes == 0
+
+
+def test_buffer_outlives_eviction():
+    cache = CefStringCache(max_entries=1)
+    u = cef_string_ctor('kept', cache=cache)
+    v = cef_string_ctor('kept', cache=cache)
+    assert ctypes.cast(u.str, ctypes.c_void_p).value == ctypes.cast(v.str, ctypes.c_void_p).value  # Shared.
+    cache.encode('other')
+    cache.clear()
+    gc.collect()
+    assert decode_cef_string(u) == decode_cef_string(v) == 'kept'
@@ -0,0 +1,34 @@
+from cef_capi import header
+from cef_capi.string_collection import cef_string_list_ctor, cef_string_map_ctor, cef_string_multimap_ctor, \
+    decode_cef_string_multimap, CefStringMapView, CefStringMultimapView
+
+
+def test_list_ctor(cef_strings):
+    lst = cef_string_list_ctor(['a', '', 'ü'])
+    assert cef_strings.collection(lst) == ['a', '', 'ü']
+    assert cef_string_list_ctor(['b'], lst) == lst
+    assert cef_strings.collection(lst) == ['a', '', 'ü', 'b']
+    header.cef_string_list_free(lst)
+
+
+def test_map_ctor_and_view(cef_strings):
+    m = cef_string_map_ctor({'a': '1', 'b': '2'})
+    view = CefStringMapView(m)
+    assert len(view) == 2 and list(view) == ['a', 'b']
+    assert view['b'] == '2' and view.get('c') is None and dict(view) == {'a': '1', 'b': '2'}
+    del view
+    assert not cef_strings.buffers  # The scratch strings are cleared.
+    header.cef_string_map_free(m)
+
+
+def test_multimap(cef_strings):
+    headers = {'Set-Cookie': ['a=1', 'b=2'], 'Content-Type': ['text/html']}
+    mm = cef_string_multimap_ctor(headers)
+    assert decode_cef_string_multimap(mm) == headers
+    assert not cef_strings.buffers
+    view = CefStringMultimapView(mm)
+    assert len(view) == 2 and list(view) == ['Set-Cookie', 'Content-Type']
+    assert view['Set-Cookie'] == ['a=1', 'b=2'] and 'Vary' not in view
+    del view
+    assert not cef_strings.buffers
+    header.cef_string_multimap_free(mm)
@@ -0,0 +1,76 @@
+from concurrent.futures import Future
+from cef_capi.supervisor import Supervisor, _Job, _Worker
+
+
+class FakeProcess:
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+class FakeConn:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def crash(w: _Worker):
+    w.process = FakeProcess()
+    w.conn = FakeConn()
+
+
+def supervisor(workers: int) -> Supervisor:
+    s = Supervisor(workers=workers, restart_backoff=1., max_restart_backoff=3., max_restarts=3, restart_window=60.)
+    s._workers = [_Worker(i, f'worker-{i}') for i in range(workers)]
+    s._accepting = True
+    return s
+
+
+def test_restart_backoff_and_retire():
+    s = supervisor(2)
+    w = s._workers[0]
+    delays = []
+    for _ in range(3):
+        crash(w)
+        s._restart(w, 'crashed', [])
+        assert w.process is None and not w.retired
+        delays.append(w.respawn_at - w.restart_times[-1])
+    assert delays == [1., 2., 3.]
+    crash(w)
+    w.respawn_at = None
+    s._restart(w, 'crashed', [])
+    assert w.retired and w.respawn_at is None and w.restarts == 3
+    assert s._accepting  # The other worker still runs.
+
+
+def test_restart_window_resets_backoff():
+    s = supervisor(1)
+    w = s._workers[0]
+    for _ in range(3):
+        crash(w)
+        s._restart(w, 'hung', [])
+    w.restart_times = type(w.restart_times)(t - 61. for t in w.restart_times)
+    crash(w)
+    s._restart(w, 'hung', [])
+    assert not w.retired and w.respawn_at - w.restart_times[-1] == 1.
+
+
+def test_all_retired_fails_backlog():
+    s = supervisor(1)
+    s.max_restarts = 0
+    w = s._workers[0]
+    queued = _Job('https://example.com/a', Future())
+    in_flight = _Job('https://example.com/b', Future())
+    in_flight.attempts = 1
+    s._backlog.append(queued)
+    w.in_flight[0] = in_flight
+    resolved: list = []
+    crash(w)
+    s._restart(w, 'crashed', resolved)
+    assert w.retired and not s._accepting and not s._backlog
+    assert [(f, e) for f, _, e in resolved] == [
+        (in_flight.future, 'All workers retired: https://example.com/b'),
+        (queued.future, 'All workers retired: https://example.com/a')]
@@ -0,0 +1,248 @@
+import types
+import ctypes
+import pytest
+from cef_capi import struct, _decode_cef_string_at, _INT32_MIN, _INT32_MAX
+from cef_capi import v8value
+
+
+@pytest.fixture
+def functions(monkeypatch):
+    calls = []
+
+    def create_array_buffer(buf, length, release_callback):
+        calls.append(('zero-copy', ctypes.string_at(buf, length), release_callback))
+        return 0x1000
+
+    def create_array_buffer_with_copy(buf, length):
+        calls.append(('copy', ctypes.string_at(buf, length) if length else b''))
+        return 0x2000
+
+    monkeypatch.setattr(v8value, '_FUNCTIONS', types.SimpleNamespace(
+        create_array_buffer=create_array_buffer, create_array_buffer_with_copy=create_array_buffer_with_copy))
+    return calls
+
+
+def address(p) -> int:
+    return ctypes.cast(p, ctypes.c_void_p).value
+
+
+def test_read_only_buffers_are_copied(functions):
+    data = bytearray(b'abc')
+    with memoryview(data) as m, m.toreadonly() as read_only:
+        for o in (b'abc', read_only):
+            assert address(v8value.array_buffer_ctor(o)) == 0x2000
+    assert functions == [('copy', b'abc'), ('copy', b'abc')]
+    assert v8value.pinned_array_buffers() == 0
+    data.append(0)  # Not exported any more.
+
+
+def test_writable_buffer_is_pinned_until_released(functions):
+    data = bytearray(b'xyz')
+    assert address(v8value.array_buffer_ctor(data)) == 0x1000
+    (kind, content, key), = functions
+    assert (kind, content) == ('zero-copy', b'xyz')
+    assert v8value.pinned_array_buffers() == 1
+    with pytest.raises(BufferError):
+        data.append(0)
+    release_callback = struct.cef_v8array_buffer_release_callback_t.from_address(key)
+    release_callback.release_buffer(ctypes.pointer(release_callback), None)
+    assert v8value.pinned_array_buffers() == 0
+    data.append(0)
+
+
+def test_copy_and_empty(functions):
+    assert address(v8value.array_buffer_ctor(bytearray(b'ab'), copy=True)) == 0x2000
+    assert address(v8value.array_buffer_ctor(bytearray())) == 0x2000
+    assert [c[0] for c in functions] == ['copy', 'copy']
+
+
+class FakeV8:
+    '''
+    V8 values of `cef_v8value_t` structs calling back here, by the raw prototypes of `v8value`.
+    Each value has one ref on creation. `set_value_by*()` takes it over, `get_value_by*()` adds one.
+    '''
+    def __init__(self, cef_strings):
+        self.cef_strings = cef_strings
+        self.values: dict[int, types.SimpleNamespace] = {}
+        self.gets = 0
+        self.releases = 0
+        self.callbacks = {name: proto(getattr(self, name)) for name, proto in v8value._METHOD_PROTOTYPES.items()}
+        self.release_callback = v8value._RELEASE_PROTOTYPE(self.release)
+        self.is_valid_callback = v8value._raw_prototype(dict(struct.cef_v8value_t._fields_)['is_valid'])(
+            lambda addr: addr in self.values)
+
+    def functions(self) -> types.SimpleNamespace:
+        cef_strings = self.cef_strings
+        return types.SimpleNamespace(
+            create_undefined=lambda: self.new('undefined', None),
+            create_null=lambda: self.new('null', None),
+            create_bool=lambda b: self.new('bool', bool(b)),
+            create_int=lambda i: self.new('int', i),
+            create_uint=lambda i: self.new('uint', i),
+            create_double=lambda d: self.new('double', d),
+            create_string=lambda s: self.new('string', _decode_cef_string_at(s) or ''),
+            create_object=lambda accessor, interceptor: self.new('object', {}),
+            create_array=lambda length: self.new('array', [None] * length),
+            create_array_buffer_with_copy=lambda buf, length: self.new(
+                'array_buffer', ctypes.create_string_buffer(ctypes.string_at(buf, length) if length else b'', length)),
+            string_userfree_free=cef_strings.userfree_free,
+            string_list_alloc=cef_strings.alloc,
+            string_list_size=cef_strings.size,
+            string_list_value=cef_strings.list_value,
+            string_list_clear=lambda lst: cef_strings.collections[lst].clear(),
+            string_list_free=cef_strings.free,
+            string_clear=cef_strings.clear)
+
+    def new(self, kind: str, payload) -> int:
+        v = struct.cef_v8value_t()
+        addr = ctypes.addressof(v)
+        for name, offset in v8value._METHOD_OFFSETS:
+            ctypes.c_void_p.from_address(addr + offset).value = address(self.callbacks[name])
+        ctypes.c_void_p.from_address(addr + v8value._RELEASE_OFFSET).value = address(self.release_callback)
+        ctypes.c_void_p.from_address(addr + v8value._VTABLE_KEY_OFFSET).value = address(self.is_valid_callback)
+        self.values[addr] = types.SimpleNamespace(struct=v, kind=kind, payload=payload, refs=1)
+        return addr
+
+    def kind(self, addr: int) -> str:
+        return self.values[addr].kind
+
+    def refs(self) -> set[int]:
+        return {v.refs for v in self.values.values()}
+
+    def release(self, addr: int) -> int:
+        v = self.values[addr]
+        assert v.refs > 0
+        v.refs -= 1
+        self.releases += 1
+        return int(v.refs == 0)
+
+    def _is(kind: str):
+        return lambda self, addr: int(self.values[addr].kind == kind)
+
+    is_undefined = _is('undefined')
+    is_null = _is('null')
+    is_bool = _is('bool')
+    is_string = _is('string')
+    is_object = _is('object')
+    is_array = _is('array')
+    is_array_buffer = _is('array_buffer')
+
+    def is_double(self, addr: int) -> int:
+        return int(self.values[addr].kind in ('int', 'uint', 'double'))
+
+    def get_bool_value(self, addr: int) -> int:
+        return int(self.values[addr].payload)
+
+    def get_double_value(self, addr: int) -> float:
+        return float(self.values[addr].payload)
+
+    def get_string_value(self, addr: int) -> int:
+        s = self.values[addr].payload
+        return self.cef_strings.new_userfree(s) if s else 0  # NULL for an empty string.
+
+    def get_keys(self, addr: int, lst: int) -> int:
+        self.cef_strings.collections[lst].extend(self.values[addr].payload)
+        return 1
+
+    def _get(self, child: int) -> int:
+        self.values[child].refs += 1
+        self.gets += 1
+        return child
+
+    def get_value_bykey(self, addr: int, key: int) -> int:
+        return self._get(self.values[addr].payload[_decode_cef_string_at(key)])
+
+    def get_value_byindex(self, addr: int, index: int) -> int:
+        return self._get(self.values[addr].payload[index])
+
+    def set_value_bykey(self, addr: int, key: int, value: int, attribute: int) -> int:
+        self.values[addr].payload[_decode_cef_string_at(key) or ''] = value
+        return 1
+
+    def set_value_byindex(self, addr: int, index: int, value: int) -> int:
+        self.values[addr].payload[index] = value
+        return 1
+
+    def get_array_length(self, addr: int) -> int:
+        return len(self.values[addr].payload)
+
+    def get_array_buffer_byte_length(self, addr: int) -> int:
+        return len(self.values[addr].payload)
+
+    def get_array_buffer_data(self, addr: int) -> int:
+        return ctypes.addressof(self.values[addr].payload)
+
+
+@pytest.fixture
+def v8(monkeypatch, cef_strings) -> FakeV8:
+    fake = FakeV8(cef_strings)
+    monkeypatch.setattr(v8value, '_FUNCTIONS', fake.functions())
+    monkeypatch.setattr(v8value, '_VTABLES', {})
+    return fake
+
+
+def assert_released(v8: FakeV8):
+    '''
+    Every value got by `get_value_by*()` was released once, and no string or scratch is left.
+    '''
+    assert v8.refs() == {1} and v8.releases == v8.gets
+    assert v8.cef_strings.userfree == {} and v8.cef_strings.buffers == {} and v8.cef_strings.collections == {}
+
+
+def test_nested_round_trip(v8):
+    rows = [{'id': i, 'name': f'row {i}', 'tags': ['a', None, True]} for i in range(3)]
+    o = {'rows': rows, 'total': 2.5, 'empty': {}, 'nested': [[1, [2, []]], ()], 'ok': False, 'none': None,
+         's': '', 'unicode': 'h\u00e9llo \U0001f389', 'bytes': b'\x00\x01', 7: 'key'}
+    p = v8value.v8value_ctor(o)
+    assert v8.kind(address(p)) == 'object'
+    assert v8.kind(v8.values[address(p)].payload['nested']) == 'array'
+    expected = dict(o, nested=[[1, [2, []]], []])
+    del expected[7]
+    expected['7'] = 'key'  # As `JSON.stringify()` does.
+    assert v8value.decode_v8value(p) == expected
+    assert v8.gets == 10 + 3 * (1 + 3 + 3) + 6  # Keys, rows, nested.
+    assert_released(v8)
+
+
+@pytest.mark.parametrize('i, kind, decoded', [
+    (0, 'int', 0),
+    (_INT32_MAX, 'int', _INT32_MAX),
+    (_INT32_MIN, 'int', _INT32_MIN),
+    (_INT32_MAX + 1, 'uint', _INT32_MAX + 1),
+    (2 ** 32 - 1, 'uint', 2 ** 32 - 1),
+    (2 ** 32, 'double', 2 ** 32),
+    (_INT32_MIN - 1, 'double', _INT32_MIN - 1),
+    (2. ** 53, 'double', 2 ** 53),
+    (2., 'double', 2),  # Integral numbers decode to int.
+    (-.5, 'double', -.5),
+])
+def test_numbers(v8, i, kind, decoded):
+    p = v8value.v8value_ctor(i)
+    assert v8.kind(address(p)) == kind
+    ret = v8value.decode_v8value(p)
+    assert ret == decoded and type(ret) is type(decoded)
+
+
+@pytest.mark.parametrize('o, kind', [
+    (None, 'null'), (True, 'bool'), (False, 'bool'), ('', 'string'), ('abc', 'string'), ('\U0001f389', 'string')])
+def test_scalars(v8, o, kind):
+    p = v8value.v8value_ctor(o)
+    assert v8.kind(address(p)) == kind
+    ret = v8value.decode_v8value(p)
+    assert ret == o and type(ret) is type(o)
+    assert_released(v8)
+
+
+def test_arguments_and_undefined(v8):
+    f = v8value._FUNCTIONS
+    args = (ctypes.c_void_p * 4)(f.create_undefined(), address(v8value.v8value_ctor({'a': [1, {'b': 'c'}]})), None,
+                                 address(v8value.v8value_ctor([])))
+    assert v8value.decode_v8_arguments(4, args) == [None, {'a': [1, {'b': 'c'}]}, None, []]
+    assert v8value.decode_v8_arguments(0, None) == []
+    assert v8.gets == 4
+    assert_released(v8)
+
+
+def test_unknown_type(v8):
+    with pytest.raises(Exception, match='Cannot convert object to V8 value.'):
+        v8value.v8value_ctor([1, object()])